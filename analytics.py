@@ -0,0 +1,220 @@
+import argparse # For the report's options
+import csv # For writing the results
+import os # For the output directory
+
+import numpy as np # For vectorized aggregation (pip install numpy)
+
+import archive # Including archived appointments
+import booking # WAL-mode connections
+import migrations # Versioned schema upgrades
+
+#------------------Utilization and no-show analytics----------------------
+#   python analytics.py --from 2025-01-01 --to 2025-12-31 --csv reports/
+#
+# Reads admin_schedules and appointments for a date range in chunks of
+# CHUNK_SIZE rows, one NumPy array per column, and computes every metric with
+# array operations (bincount, histogram, percentile) instead of Python loops:
+#
+#   utilization_by_hour   booked seats vs capacity per weekday and start hour
+#   utilization_by_day    the same per calendar day
+#   no_show_by_type       completed, no-show and cancelled counts per appointment type;
+#                         the no-show rate is NO-SHOW / (COMPLETED + NO-SHOW)
+#   lead_time             how many days ahead appointments were booked, bucketed,
+#                         with percentiles per appointment type
+#
+# Utilization uses booked_count, the seats held right now. Lead times need
+# booked_at, so appointments booked before it was recorded are left out of them.
+
+CHUNK_SIZE = 100000
+DAY = 86400
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+# Upper bounds of the lead-time buckets, in days
+LEAD_TIME_EDGES = (0, 1, 2, 3, 7, 14, 30, 60, 90, np.inf)
+PERCENTILES = (50, 90, 99)
+
+# Report -> column names of its rows
+COLUMNS = {
+    "utilization_by_hour": ("weekday", "hour", "schedules", "capacity", "booked", "utilization"),
+    "utilization_by_day": ("date", "schedules", "capacity", "booked", "utilization"),
+    "no_show_by_type": ("appointment_type", "appointments", "completed", "no_show", "cancelled", "no_show_rate"),
+    "lead_time": ("appointment_type", "bucket_days", "appointments", "share", "mean_days",
+                  "p50_days", "p90_days", "p99_days"),
+}
+
+
+#------------------Columnar reads----------------------
+# Runs sql and returns one array per selected column; None in a float column becomes NaN
+def fetch_columns(con, sql, params, dtypes):
+    cursor = con.execute(sql, params)
+    chunks = [[] for _ in dtypes]
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        for column, values, dtype in zip(chunks, zip(*rows), dtypes):
+            column.append(np.array(values, dtype=dtype))
+    return [np.concatenate(column) if column else np.empty(0, dtype=dtype)
+            for column, dtype in zip(chunks, dtypes)]
+
+
+# idx_admin_schedules_slot covers the date range
+SCHEDULES_SQL = """
+    SELECT schedule_id, starts_at, capacity, booked_count FROM admin_schedules
+    WHERE schedule_date >= ? AND schedule_date <= ? AND starts_at IS NOT NULL"""
+# {source} is appointments, or the all_appointments view over the archive too
+APPOINTMENTS_SQL = """
+    SELECT schedule_id, COALESCE(appointment_type, ''), COALESCE(status, ''), booked_at FROM {source}
+    WHERE appointment_date >= ? AND appointment_date <= ?"""
+
+
+def load_schedules(con, date_from, date_to):
+    schedule_ids, starts_at, capacity, booked = fetch_columns(con, SCHEDULES_SQL, (date_from, date_to),
+                                                              (np.int64, np.int64, np.int64, np.int64))
+    order = np.argsort(schedule_ids)
+    return {"schedule_id": schedule_ids[order], "starts_at": starts_at[order],
+            "capacity": capacity[order], "booked": booked[order]}
+
+
+def load_appointments(con, date_from, date_to, archived=False):
+    source = "all_appointments" if archived and archive.attach(con, create=False) else "appointments"
+    # schedule_id is float so an imported row without a schedule (NULL) loads as NaN;
+    # it still counts toward no-shows, and lead_time leaves it out
+    schedule_ids, types, statuses, booked_at = fetch_columns(con, APPOINTMENTS_SQL.format(source=source), (date_from, date_to),
+                                                             (np.float64, object, object, np.float64))
+    return {"schedule_id": schedule_ids, "type": types, "status": statuses, "booked_at": booked_at}
+
+
+#------------------Metrics----------------------
+def _rate(part, whole):
+    return np.divide(part, whole, out=np.zeros(len(part)), where=whole > 0)
+
+
+def utilization_by_hour(schedules):
+    starts_at = schedules["starts_at"]
+    # 1970-01-01 was a Thursday, so day 0 is weekday 3
+    weekday = (starts_at // DAY + 3) % 7
+    hour = starts_at % DAY // 3600
+    cell = weekday * 24 + hour
+    count = np.bincount(cell, minlength=7 * 24)
+    capacity = np.bincount(cell, weights=schedules["capacity"], minlength=7 * 24)
+    booked = np.bincount(cell, weights=schedules["booked"], minlength=7 * 24)
+    utilization = _rate(booked, capacity)
+    return [(WEEKDAYS[index // 24], index % 24, int(count[index]), int(capacity[index]), int(booked[index]),
+             round(float(utilization[index]), 4))
+            for index in np.flatnonzero(count)]
+
+
+def utilization_by_day(schedules):
+    days, day_index = np.unique(schedules["starts_at"] // DAY, return_inverse=True)
+    count = np.bincount(day_index, minlength=len(days))
+    capacity = np.bincount(day_index, weights=schedules["capacity"], minlength=len(days))
+    booked = np.bincount(day_index, weights=schedules["booked"], minlength=len(days))
+    utilization = _rate(booked, capacity)
+    dates = (days * DAY).astype("datetime64[s]").astype("datetime64[D]").astype(str)
+    return [(dates[index], int(count[index]), int(capacity[index]), int(booked[index]),
+             round(float(utilization[index]), 4))
+            for index in range(len(days))]
+
+
+def no_show_by_type(appointments):
+    types, type_index = np.unique(appointments["type"], return_inverse=True)
+    status = appointments["status"]
+
+    def per_type(mask=None):
+        return np.bincount(type_index, weights=mask, minlength=len(types)).astype(np.int64)
+
+    total = per_type()
+    completed = per_type(status == "COMPLETED")
+    no_show = per_type(status == "NO-SHOW")
+    cancelled = per_type(status == "CANCELLED")
+    rate = _rate(no_show, completed + no_show)
+    return [(types[index], int(total[index]), int(completed[index]), int(no_show[index]), int(cancelled[index]),
+             round(float(rate[index]), 4))
+            for index in range(len(types))]
+
+
+def lead_time(appointments, schedules):
+    # Match each appointment to its schedule's start with one sorted search;
+    # a NaN schedule_id sorts past the end and never equals a real one
+    position = np.searchsorted(schedules["schedule_id"], appointments["schedule_id"])
+    position = np.minimum(position, max(len(schedules["schedule_id"]) - 1, 0))
+    known = ~np.isnan(appointments["booked_at"]) & ~np.isnan(appointments["schedule_id"])
+    if len(schedules["schedule_id"]):
+        known &= schedules["schedule_id"][position] == appointments["schedule_id"]
+    else:
+        known[:] = False
+    days = (schedules["starts_at"][position[known]] - appointments["booked_at"][known]) / DAY
+    types = appointments["type"][known]
+
+    rows = []
+    edges = np.array(LEAD_TIME_EDGES, dtype=np.float64)
+    for name in ["(all)"] + sorted(set(types.tolist())):
+        values = days if name == "(all)" else days[types == name]
+        if not len(values):
+            continue
+        # Bookings made after the start (walk-ins entered late) count as zero days ahead
+        counts, _ = np.histogram(np.clip(values, 0, None), bins=edges)
+        mean = round(float(values.mean()), 2)
+        percentiles = [round(float(value), 2) for value in np.percentile(values, PERCENTILES)]
+        for low, high, count in zip(edges[:-1], edges[1:], counts):
+            bucket = f"{low:g}+" if np.isinf(high) else f"{low:g}-{high:g}"
+            rows.append((name, bucket, int(count), round(count / len(values), 4), mean, *percentiles))
+    return rows
+
+
+#------------------Build and write the report----------------------
+# Returns {report name: rows}, in COLUMNS order; dates are inclusive YYYY-MM-DD
+def report(con, date_from="0000-01-01", date_to="9999-12-31", archived=False):
+    schedules = load_schedules(con, date_from, date_to)
+    appointments = load_appointments(con, date_from, date_to, archived)
+    return {
+        "utilization_by_hour": utilization_by_hour(schedules),
+        "utilization_by_day": utilization_by_day(schedules),
+        "no_show_by_type": no_show_by_type(appointments),
+        "lead_time": lead_time(appointments, schedules),
+    }
+
+
+# Writes one <report name>.csv per report into directory; returns the paths written
+def write_csv(results, directory):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, rows in results.items():
+        path = os.path.join(directory, name + ".csv")
+        with open(path, "w", newline="", encoding="utf-8") as stream:
+            writer = csv.writer(stream)
+            writer.writerow(COLUMNS[name])
+            writer.writerows(rows)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Utilization, no-show and lead-time analytics for CARe")
+    parser.add_argument("--db", default=booking.DB_PATH)
+    parser.add_argument("--from", dest="date_from", default="0000-01-01", help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", default="9999-12-31", help="last day (YYYY-MM-DD)")
+    parser.add_argument("--archived", action="store_true", help="include appointments moved to the archive")
+    parser.add_argument("--csv", help="write one CSV file per report into this directory")
+    args = parser.parse_args()
+
+    con = booking.connect(args.db)
+    migrations.migrate(con)
+    results = report(con, args.date_from, args.date_to, args.archived)
+    con.close()
+
+    if args.csv:
+        for path in write_csv(results, args.csv):
+            print(f"+++++ Wrote {path}. +++++")
+        return
+
+    for name, rows in results.items():
+        print(f"\n-------------------- {name.replace('_', ' ').upper()} --------------------")
+        print(",".join(COLUMNS[name]))
+        for row in rows:
+            print(",".join(str(value) for value in row))
+
+
+if __name__ == "__main__":
+    main()
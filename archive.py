@@ -0,0 +1,235 @@
+import argparse # For the job's options
+import datetime # For the retention cutoff
+import os # For the archive file's path
+import time # For pauses between batches
+
+import booking # WAL-mode connections
+import migrations # Versioned schema upgrades
+
+#------------------Archive of old appointments----------------------
+#   python archive.py --retention-days 365
+#
+# Moves appointments dated before the retention window out of the hot
+# appointments table into a separate SQLite file, HealthCARe.archive.db next to
+# the main one, ATTACHed as "archive". Only finished appointments (FINISHED) move;
+# an old Pending or Approved one stays until someone resolves it. Each batch is
+# copied in one transaction that only writes the archive, then deleted from the
+# main file in a second short one, so a live booking waits at most one small delete.
+#
+# The main file is in WAL mode, where SQLite doesn't commit a transaction across
+# attached files atomically, so the two steps stay separate and each is safe on
+# its own. Copies are INSERT OR REPLACE, and the delete only removes rows whose
+# archived copy still matches them column for column. A row cancelled or changed
+# in between stays in the hot table, and its stale copy is dropped, so the next
+# batch or run copies it again. A job killed halfway is safe to run again.
+#
+# The appointment_stats counts and patient totals cover the hot table only.
+# History views read archived rows on demand through the temp view
+# all_appointments, which is the UNION ALL of both tables with an `archived` flag.
+
+SCHEMA = "archive"
+DEFAULT_RETENTION_DAYS = 365
+BATCH_SIZE = 500
+PAUSE = 0.05            # seconds between batches, to let bookings in
+VACUUM_PAGES = 1000     # pages freed per incremental_vacuum step
+
+COLUMNS = "appointment_id, patient_id, schedule_id, appointment_type, appointment_date, appointment_time, status, booked_at"
+
+FINISHED = ("COMPLETED", "CANCELLED", "NO-SHOW")
+
+BATCH_SQL = f"""
+    SELECT appointment_id FROM main.appointments
+    WHERE appointment_date < ? AND appointment_date != '' AND status IN ({", ".join(f"'{status}'" for status in FINISHED)})
+    ORDER BY appointment_date
+    LIMIT ?"""
+# A hot row whose archived copy is identical, column for column
+COPIED = " AND ".join(f"c.{column} IS main.appointments.{column}" for column in COLUMNS.split(", "))
+PATIENT_APPOINTMENTS_SQL = f"""
+    SELECT a.appointment_id, a.appointment_type, s.schedule_date, s.schedule_time, a.status
+    FROM {SCHEMA}.appointments a
+    JOIN admin_schedules s ON a.schedule_id = s.schedule_id
+    WHERE a.patient_id = ?
+    ORDER BY s.starts_at"""
+DELETE_PATIENT_SQL = f"DELETE FROM {SCHEMA}.appointments WHERE patient_id = ?"
+
+
+# HealthCARe.db -> HealthCARe.archive.db; None for in-memory databases
+def archive_path(con):
+    for _, name, path in con.execute("PRAGMA database_list"):
+        if name == "main":
+            return os.path.splitext(path)[0] + ".archive.db" if path else None
+    return None
+
+
+def is_attached(con):
+    return any(row[1] == SCHEMA for row in con.execute("PRAGMA database_list"))
+
+
+#------------------Attach the archive and create the UNION view----------------------
+# Returns True if the archive is attached; with create=False a missing archive file is left alone
+def attach(con, path=None, create=True):
+    if is_attached(con):
+        return True
+    path = path or archive_path(con)
+    if path is None or (not create and not os.path.exists(path)):
+        return False
+
+    con.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (path,))
+    # Only takes effect while the archive file is still empty
+    con.execute(f"PRAGMA {SCHEMA}.auto_vacuum = INCREMENTAL")
+    con.execute(f'''
+    CREATE TABLE IF NOT EXISTS {SCHEMA}.appointments (
+            appointment_id INTEGER PRIMARY KEY,
+            patient_id INTEGER,
+            schedule_id INTEGER,
+            appointment_type TEXT,
+            appointment_date DATE,
+            appointment_time TEXT,
+            status TEXT,
+            archived_at TEXT,
+            booked_at INTEGER)
+    ''')
+    # Archives made before appointments had booked_at
+    if "booked_at" not in {row[1] for row in con.execute(f"PRAGMA {SCHEMA}.table_info(appointments)")}:
+        con.execute(f"ALTER TABLE {SCHEMA}.appointments ADD COLUMN booked_at INTEGER")
+    # The same lookups the hot table has indexes for
+    con.execute(f"CREATE INDEX IF NOT EXISTS {SCHEMA}.idx_archive_patient ON appointments (patient_id)")
+    con.execute(f"CREATE INDEX IF NOT EXISTS {SCHEMA}.idx_archive_date ON appointments (appointment_date)")
+    con.execute(f"CREATE INDEX IF NOT EXISTS {SCHEMA}.idx_archive_status ON appointments (status)")
+    con.execute(f"CREATE INDEX IF NOT EXISTS {SCHEMA}.idx_archive_type ON appointments (appointment_type)")
+    # Views in the main file can't see an attached one, so this one lives in temp, per connection
+    con.execute(f'''
+    CREATE TEMP VIEW IF NOT EXISTS all_appointments AS
+    SELECT {COLUMNS}, 0 AS archived FROM main.appointments
+    UNION ALL
+    SELECT {COLUMNS}, 1 AS archived FROM {SCHEMA}.appointments
+    ''')
+    con.commit()
+    return True
+
+
+#------------------Move one batch----------------------
+# Returns how many appointments left the hot table
+def archive_batch(con, cutoff, batch_size=BATCH_SIZE):
+    ids = [row[0] for row in con.execute(BATCH_SQL, (cutoff, batch_size))]
+    if not ids:
+        return 0
+    marks = ", ".join("?" * len(ids))
+
+    # A deferred transaction that only writes the archive never takes the main file's write lock.
+    # REPLACE refreshes a copy left behind by a batch whose row changed before its delete.
+    con.execute("BEGIN")
+    try:
+        con.execute(f'''
+        INSERT OR REPLACE INTO {SCHEMA}.appointments ({COLUMNS}, archived_at)
+        SELECT {COLUMNS}, ? FROM main.appointments WHERE appointment_id IN ({marks})
+        ''', [datetime.datetime.now().isoformat(timespec="seconds")] + ids)
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+
+    con.execute("BEGIN")
+    try:
+        moved = con.execute(f'''
+        DELETE FROM main.appointments
+        WHERE appointment_id IN ({marks})
+          AND EXISTS (SELECT 1 FROM {SCHEMA}.appointments c WHERE c.appointment_id = main.appointments.appointment_id AND {COPIED})
+        ''', ids).rowcount
+        # Rows changed since the copy stay hot; drop their stale copies so history shows them once
+        con.execute(f'''
+        DELETE FROM {SCHEMA}.appointments
+        WHERE appointment_id IN ({marks})
+          AND appointment_id IN (SELECT appointment_id FROM main.appointments WHERE appointment_id IN ({marks}))
+        ''', ids + ids)
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+    return moved
+
+
+# Moves every appointment dated before cutoff (YYYY-MM-DD); returns how many moved
+def archive_appointments(con, cutoff, batch_size=BATCH_SIZE, pause=PAUSE, path=None):
+    attach(con, path)
+    moved = 0
+    while True:
+        count = archive_batch(con, cutoff, batch_size)
+        if not count:
+            return moved
+        moved += count
+        time.sleep(pause)
+
+
+#------------------Give the freed pages back to the file system----------------------
+# Returns the pages freed; needs auto_vacuum = INCREMENTAL, which new databases have
+def incremental_vacuum(con, pages=VACUUM_PAGES, pause=PAUSE):
+    if con.execute("PRAGMA main.auto_vacuum").fetchone()[0] != 2:
+        return 0
+    freed = 0
+    while True:
+        free = con.execute("PRAGMA main.freelist_count").fetchone()[0]
+        if not free:
+            return freed
+        # Each step is its own short write, like an archive batch. executescript steps the
+        # pragma to completion; execute() would stop after the first freed page
+        con.executescript(f"PRAGMA main.incremental_vacuum({min(free, pages)})")
+        freed += min(free, pages)
+        time.sleep(pause)
+
+
+# Switches an existing database to incremental auto-vacuum; a full VACUUM that blocks writers while it runs
+def enable_incremental_vacuum(con):
+    con.execute("PRAGMA main.auto_vacuum = INCREMENTAL")
+    con.execute("VACUUM main")
+
+
+#------------------Reads and deletes that include the archive----------------------
+# Returns (appointment_id, appointment_type, schedule_date, schedule_time, status) rows from the archive
+def patient_appointments(con, patient_id):
+    if not attach(con, create=False):
+        return []
+    return con.execute(PATIENT_APPOINTMENTS_SQL, (patient_id,)).fetchall()
+
+
+# Returns True if there is an archive holding at least one appointment
+def has_appointments(con):
+    if not attach(con, create=False):
+        return False
+    return con.execute(f"SELECT EXISTS (SELECT 1 FROM {SCHEMA}.appointments)").fetchone()[0] == 1
+
+
+# Removes a deleted patient's archived appointments, if there is an archive
+def delete_patient(con, patient_id):
+    if attach(con, create=False):
+        con.execute(DELETE_PATIENT_SQL, (patient_id,))
+        con.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old CARe appointments into the archive database")
+    parser.add_argument("--db", default=booking.DB_PATH)
+    parser.add_argument("--archive", help="archive file (default: <db>.archive.db)")
+    parser.add_argument("--retention-days", type=int, default=DEFAULT_RETENTION_DAYS,
+                        help="keep appointments from this many days back in the hot table")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--setup-vacuum", action="store_true",
+                        help="switch an existing database to incremental vacuum first (runs a full VACUUM)")
+    args = parser.parse_args()
+
+    con = booking.connect(args.db)
+    migrations.migrate(con)
+    if args.setup_vacuum:
+        enable_incremental_vacuum(con)
+
+    cutoff = (datetime.date.today() - datetime.timedelta(days=args.retention_days)).isoformat()
+    moved = archive_appointments(con, cutoff, args.batch_size, path=args.archive)
+    freed = incremental_vacuum(con)
+    print(f"+++++ Archived {moved} appointments dated before {cutoff}; freed {freed} pages. +++++")
+    if con.execute("PRAGMA main.auto_vacuum").fetchone()[0] != 2:
+        print("Note: this database doesn't use incremental vacuum; run once with --setup-vacuum to reclaim space.")
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
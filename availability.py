@@ -0,0 +1,146 @@
+import bisect # For keeping the slots in date order
+import weakref # For finding every live cache when reporting stats
+
+#------------------Availability cache----------------------
+# Keeps the open-slot list that "Schedule Appointment" shows, sorted by start
+# time, on the connection that loaded it. The booking, cancellation and schedule
+# code adjusts it in place after each commit on that connection. Commits from any
+# other connection or process change PRAGMA data_version, which makes the next
+# read reload the list from the database.
+#
+# Only connections opened with booking.connect() carry a cache; any other
+# connection reads straight from the database. Anything that writes schedules or
+# appointments on a cached connection without going through these hooks must call
+# invalidate(con).
+
+AVAILABLE_SQL = "SELECT schedule_id, schedule_date, schedule_time, capacity - booked_count AS remaining, starts_at FROM admin_schedules WHERE booked_count < capacity ORDER BY starts_at"
+COLUMNS = ("schedule_id", "schedule_date", "schedule_time", "remaining")
+
+_caches = weakref.WeakSet()
+
+
+# Slots whose text never parsed have no starts_at and sort first, as they do in SQL
+def _key(schedule_id, starts_at):
+    return (starts_at is not None, starts_at or 0, schedule_id)
+
+
+class AvailabilityCache:
+    def __init__(self):
+        self.keys = None    # sorted (has starts_at, starts_at, schedule_id); None until loaded
+        self.slots = {}     # schedule_id -> [schedule_date, schedule_time, remaining, starts_at]
+        self.data_version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        _caches.add(self)
+
+    def _load(self, con):
+        self.slots = {row[0]: [row[1], row[2], row[3], row[4]] for row in con.execute(AVAILABLE_SQL)}
+        self.keys = sorted(_key(schedule_id, slot[3]) for schedule_id, slot in self.slots.items())
+
+    # Returns (schedule_id, schedule_date, schedule_time, remaining) tuples in start-time order
+    def open_slots(self, con):
+        # data_version only moves when another connection commits, so our own
+        # write-through updates don't throw the cache away
+        version = con.execute("PRAGMA data_version").fetchone()[0]
+        if self.keys is not None and version == self.data_version:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._load(con)
+            self.data_version = version
+        return [(key[2], *self.slots[key[2]][:3]) for key in self.keys]
+
+    def invalidate(self):
+        if self.keys is not None:
+            self.invalidations += 1
+        self.keys = None
+        self.slots = {}
+
+    def _remove(self, schedule_id):
+        slot = self.slots.pop(schedule_id)
+        index = bisect.bisect_left(self.keys, _key(schedule_id, slot[3]))
+        del self.keys[index]
+
+    def seat_taken(self, schedule_id):
+        slot = self.slots.get(schedule_id)
+        if slot is None:
+            return
+        slot[2] -= 1
+        if slot[2] <= 0:
+            self._remove(schedule_id)
+
+    def seat_released(self, schedule_id):
+        slot = self.slots.get(schedule_id)
+        if slot is not None:
+            slot[2] += 1
+        elif self.keys is not None:
+            # The slot was full, so we don't have its date and time; reload on the next read
+            self.invalidate()
+
+    def slot_added(self, schedule_id, schedule_date, schedule_time, remaining, starts_at):
+        if self.keys is None or remaining <= 0:
+            return
+        self.slots[schedule_id] = [schedule_date, schedule_time, remaining, starts_at]
+        bisect.insort(self.keys, _key(schedule_id, starts_at))
+
+    def slot_removed(self, schedule_id):
+        if schedule_id in self.slots:
+            self._remove(schedule_id)
+
+
+#------------------Per-connection helpers used by the core----------------------
+def cache_for(con):
+    cache = getattr(con, "availability_cache", None)
+    if cache is None and hasattr(con, "__dict__"):
+        cache = con.availability_cache = AvailabilityCache()
+    return cache
+
+
+def open_slots(con):
+    cache = cache_for(con)
+    if cache is None:
+        return [tuple(row)[:4] for row in con.execute(AVAILABLE_SQL)]
+    return cache.open_slots(con)
+
+
+def seat_taken(con, schedule_id):
+    cache = cache_for(con)
+    if cache is not None:
+        cache.seat_taken(schedule_id)
+
+
+def seat_released(con, schedule_id):
+    cache = cache_for(con)
+    if cache is not None:
+        cache.seat_released(schedule_id)
+
+
+def slot_added(con, schedule_id, schedule_date, schedule_time, remaining, starts_at):
+    cache = cache_for(con)
+    if cache is not None:
+        cache.slot_added(schedule_id, schedule_date, schedule_time, remaining, starts_at)
+
+
+def slot_removed(con, schedule_id):
+    cache = cache_for(con)
+    if cache is not None:
+        cache.slot_removed(schedule_id)
+
+
+def invalidate(con):
+    cache = cache_for(con)
+    if cache is not None:
+        cache.invalidate()
+
+
+#------------------Hit/miss counters across every cache in this process----------------------
+def stats():
+    caches = list(_caches)
+    return {
+        "caches": len(caches),
+        "hits": sum(cache.hits for cache in caches),
+        "misses": sum(cache.misses for cache in caches),
+        "invalidations": sum(cache.invalidations for cache in caches),
+        "open_slots": sum(len(cache.slots) for cache in caches),
+    }
@@ -0,0 +1,126 @@
+import argparse # For command-line options
+import datetime # For the slot calendar
+import multiprocessing # For firing bookings from several processes at once
+import os # For temporary file paths
+import random # For picking schedules at random
+import sqlite3 # For database operations
+import tempfile # For a scratch copy of the database
+import time # For timing bookings
+
+import booking
+import migrations
+import recurring
+
+#------------------Concurrent booking benchmark----------------------
+# Copies HealthCARe.db to a scratch file, adds a handful of schedules and lets
+# several processes race to book them. Fewer seats than bookings are offered on
+# purpose, so the run also proves that no schedule is ever overbooked.
+
+
+#------------------Prepare a scratch copy of HealthCARe.db----------------------
+def prepare_database(source, target, schedules, capacity):
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    src.backup(dst)
+    src.close()
+    migrations.migrate(dst)
+
+    cur = dst.cursor()
+    cur.execute("INSERT INTO patients (full_name, age, date_of_birth, address, phone_number, password) VALUES (?, ?, ?, ?, ?, ?)",
+                ("Benchmark Patient", 30, "1995-01-01", "Benchmark Street", "bench-%d" % os.getpid(), "bench"))
+    patient_id = cur.lastrowid
+    # One-minute slots from 2030-01-01 on, passing over any the copied database already has
+    schedule_ids = []
+    day = datetime.date(2030, 1, 1)
+    for schedule_date, schedule_time, starts_at in recurring.expand_slots(day, day + datetime.timedelta(days=365), set(range(7)),
+                                                                          datetime.time(0, 0), datetime.time(23, 59), 1):
+        if len(schedule_ids) == schedules:
+            break
+        cur.execute("INSERT OR IGNORE INTO admin_schedules (schedule_date, schedule_time, starts_at, capacity) VALUES (?, ?, ?, ?)",
+                    (schedule_date, schedule_time, starts_at, capacity))
+        if cur.rowcount == 1:
+            schedule_ids.append(cur.lastrowid)
+    dst.commit()
+    dst.close()
+    return patient_id, schedule_ids
+
+
+#------------------One worker process----------------------
+def worker(args):
+    path, patient_id, schedule_ids, count, seed = args
+    rng = random.Random(seed)
+    con = booking.connect(path)
+    latencies = []
+    booked = 0
+    for _ in range(count):
+        start = time.perf_counter()
+        if booking.book_appointment(con, patient_id, rng.choice(schedule_ids), "benchmark") is not None:
+            booked += 1
+        latencies.append(time.perf_counter() - start)
+    con.close()
+    return booked, latencies
+
+
+#------------------Check that no schedule went over capacity----------------------
+def check_capacity(path, schedule_ids, capacity):
+    con = sqlite3.connect(path)
+    problems = []
+    for schedule_id in schedule_ids:
+        booked_count = con.execute("SELECT booked_count FROM admin_schedules WHERE schedule_id = ?", (schedule_id,)).fetchone()[0]
+        taken = con.execute("SELECT COUNT(*) FROM appointments WHERE schedule_id = ?", (schedule_id,)).fetchone()[0]
+        if taken > capacity or taken != booked_count:
+            problems.append((schedule_id, taken, booked_count))
+    con.close()
+    return problems
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent booking benchmark for CARe")
+    parser.add_argument("--db", default=booking.DB_PATH, help="database to copy the schema from")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--bookings", type=int, default=4000, help="total booking attempts")
+    parser.add_argument("--schedules", type=int, default=10)
+    parser.add_argument("--capacity", type=int, default=300, help="seats per schedule")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="care-bench-") as workdir:
+        path = os.path.join(workdir, "HealthCARe.db")
+        patient_id, schedule_ids = prepare_database(args.db, path, args.schedules, args.capacity)
+        booking.connect(path).close()  # switch the copy to WAL before the workers start
+
+        per_worker = args.bookings // args.processes
+        jobs = [(path, patient_id, schedule_ids, per_worker, seed) for seed in range(args.processes)]
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.map(worker, jobs)
+        elapsed = time.perf_counter() - start
+
+        booked = sum(result[0] for result in results)
+        latencies = [latency for result in results for latency in result[1]]
+        problems = check_capacity(path, schedule_ids, args.capacity)
+
+    print("=============================================================")
+    print("|                 CONCURRENT BOOKING BENCHMARK              |")
+    print("=============================================================")
+    print(f"Processes        : {args.processes}")
+    print(f"Attempts         : {len(latencies)}")
+    print(f"Booked           : {booked} of {args.schedules * args.capacity} seats")
+    print(f"Bookings/sec     : {len(latencies) / elapsed:.0f}")
+    print(f"p50 latency (ms) : {percentile(latencies, 50) * 1000:.2f}")
+    print(f"p99 latency (ms) : {percentile(latencies, 99) * 1000:.2f}")
+    if problems:
+        print("\n***** OVERBOOKED SCHEDULES (schedule_id, appointments, booked_count) *****")
+        for problem in problems:
+            print(problem)
+        raise SystemExit(1)
+    print("\n+++++ No schedule went over capacity. +++++")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse # For command-line options
+import datetime # For the slot calendar
+import itertools # For taking the first N slots
+import os # For temporary file paths
+import random # For picking schedules at random
+import tempfile # For scratch databases
+import time # For timing bookings
+
+import booking
+import migrations
+import recurring
+
+#------------------Capacity tracking benchmark----------------------
+# Compares booking throughput of the old capacity model (decrement the seats left,
+# then sweep full schedules away with DELETE ... WHERE capacity <= 0 after every
+# booking) with the booked_count model, on identical schedules and booking sequences.
+# The old model runs on the schema as it was before migrations (user_version 0:
+# the original tables and no indexes), so every sweep reads the whole schedule table.
+
+LEGACY_VERSION = 0  # the original tables, before the first migration
+
+
+#------------------Build a scratch database at a given schema version----------------------
+def build_database(path, version, schedules, capacity):
+    con = booking.connect(path)
+    cur = con.cursor()
+    # Version 0 still has the original tables, which version 1 creates as they were
+    for migration in migrations.MIGRATIONS[:max(version, 1)]:
+        migration(cur)
+    cur.execute(f"PRAGMA user_version = {version}")
+    cur.execute("INSERT INTO patients (full_name, age, date_of_birth, address, phone_number, password) VALUES ('Benchmark Patient', 30, '1995-01-01', 'Benchmark Street', 'bench', 'bench')")
+    # One-minute slots around the clock, so every schedule has its own date and time
+    start = datetime.date(2030, 1, 1)
+    slot_times = itertools.islice(recurring.expand_slots(start, start + datetime.timedelta(days=schedules // 1439 + 1), set(range(7)),
+                                                         datetime.time(0, 0), datetime.time(23, 59), 1), schedules)
+    if version >= 6:
+        cur.executemany("INSERT INTO admin_schedules (schedule_date, schedule_time, starts_at, capacity) VALUES (?, ?, ?, ?)",
+                        [(schedule_date, schedule_time, starts_at, capacity) for schedule_date, schedule_time, starts_at in slot_times])
+    else:
+        # starts_at arrived in version 6
+        cur.executemany("INSERT INTO admin_schedules (schedule_date, schedule_time, capacity) VALUES (?, ?, ?)",
+                        [(schedule_date, schedule_time, capacity) for schedule_date, schedule_time, _ in slot_times])
+    con.commit()
+    return con
+
+
+#------------------The booking path before booked_count----------------------
+def legacy_book(con, patient_id, schedule_id, appointment_type):
+    con.execute("BEGIN IMMEDIATE")
+    claimed = con.execute("UPDATE admin_schedules SET capacity = capacity - 1 WHERE schedule_id = ? AND capacity > 0", (schedule_id,)).rowcount
+    if claimed != 1:
+        con.rollback()
+        return None
+    schedule_date, schedule_time = con.execute("SELECT schedule_date, schedule_time FROM admin_schedules WHERE schedule_id = ?", (schedule_id,)).fetchone()
+    appointment_id = con.execute(
+        "INSERT INTO appointments (patient_id, schedule_id, appointment_type, appointment_date, appointment_time) VALUES (?, ?, ?, ?, ?)",
+        (patient_id, schedule_id, appointment_type, schedule_date, schedule_time)
+    ).lastrowid
+    con.commit()
+    con.execute("DELETE FROM admin_schedules WHERE capacity <= 0")
+    con.commit()
+    return appointment_id
+
+
+def run(con, book, picks):
+    booked = 0
+    start = time.perf_counter()
+    for schedule_id in picks:
+        if book(con, 1, schedule_id, "benchmark") is not None:
+            booked += 1
+    return booked, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capacity tracking benchmark for CARe")
+    parser.add_argument("--schedules", type=int, default=20000)
+    parser.add_argument("--capacity", type=int, default=3, help="seats per schedule")
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    picks = [rng.randint(1, args.schedules) for _ in range(args.bookings)]
+    with tempfile.TemporaryDirectory(prefix="care-bench-") as workdir:
+        legacy = build_database(os.path.join(workdir, "legacy.db"), LEGACY_VERSION, args.schedules, args.capacity)
+        legacy_booked, legacy_elapsed = run(legacy, legacy_book, picks)
+        legacy.close()
+
+        current = build_database(os.path.join(workdir, "current.db"), migrations.LATEST_VERSION, args.schedules, args.capacity)
+        current_booked, current_elapsed = run(current, booking.book_appointment, picks)
+        current.close()
+
+    print("=============================================================")
+    print("|                CAPACITY TRACKING BENCHMARK                |")
+    print("=============================================================")
+    print(f"Schedules        : {args.schedules} x {args.capacity} seats")
+    print(f"Attempts         : {args.bookings}")
+    print(f"Delete sweep     : {legacy_booked} booked, {args.bookings / legacy_elapsed:.0f} bookings/sec")
+    print(f"booked_count     : {current_booked} booked, {args.bookings / current_elapsed:.0f} bookings/sec")
+    print(f"Speed-up         : {legacy_elapsed / current_elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse # For command-line options
+import os # For temporary file paths
+import sqlite3 # For database operations
+import tempfile # For a scratch database
+import threading # For the concurrent clients
+import time # For timing logins
+
+import booking
+import core
+import migrations
+import passwords
+
+#------------------Login throughput benchmark----------------------
+# Fills a scratch database with patients whose passwords are hashed at the
+# chosen iteration count, then lets several client threads log in at once,
+# each hashing on the bounded pool the HTTP service uses. Prints logins per
+# second for the pool size and cost parameters, so both can be tuned together.
+
+
+#------------------Create a scratch database of hashed patients----------------------
+def prepare_database(path, patients, iterations):
+    con = sqlite3.connect(path)
+    migrations.migrate(con)
+    # One hash for everyone keeps setup fast; every login still runs the full PBKDF2
+    password_hash = passwords.hash_password("bench", iterations)
+    con.executemany(
+        "INSERT INTO patients (full_name, age, date_of_birth, address, phone_number, password) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"Benchmark Patient {idx}", 30, "1995-01-01", "Benchmark Street", f"bench-{idx}", password_hash)
+         for idx in range(patients)]
+    )
+    con.commit()
+    con.close()
+
+
+#------------------One client: look up, then verify on the hashing pool----------------------
+def client(path, phone_numbers, iterations, latencies, failures):
+    con = booking.connect(path)
+    for phone_number in phone_numbers:
+        start = time.perf_counter()
+        patient = core.credentials(con, phone_number)
+        matches, _ = passwords.submit(passwords.verify_password, "bench", patient[2], iterations).result()
+        latencies.append(time.perf_counter() - start)
+        if not matches:
+            failures.append(phone_number)
+    con.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput benchmark for CARe")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client threads")
+    parser.add_argument("--logins", type=int, default=64, help="total logins")
+    parser.add_argument("--workers", type=int, default=passwords.HASH_WORKERS, help="hashing pool size")
+    parser.add_argument("--iterations", type=int, default=passwords.ITERATIONS, help="PBKDF2 iterations")
+    args = parser.parse_args()
+
+    passwords.HASH_WORKERS = args.workers
+    with tempfile.TemporaryDirectory(prefix="care-bench-") as workdir:
+        path = os.path.join(workdir, "HealthCARe.db")
+        prepare_database(path, args.logins, args.iterations)
+
+        phone_numbers = [f"bench-{idx}" for idx in range(args.logins)]
+        latencies = []
+        failures = []
+        threads = [
+            threading.Thread(target=client, args=(path, phone_numbers[idx::args.clients], args.iterations, latencies, failures))
+            for idx in range(args.clients)
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    print("=============================================================")
+    print("|                 LOGIN THROUGHPUT BENCHMARK                |")
+    print("=============================================================")
+    print(f"Clients          : {args.clients}")
+    print(f"Hashing workers  : {args.workers}")
+    print(f"PBKDF2 iterations: {args.iterations}")
+    print(f"Logins           : {len(latencies)}")
+    print(f"Logins/sec       : {len(latencies) / elapsed:.1f}")
+    print(f"p50 latency (ms) : {percentile(latencies, 50) * 1000:.1f}")
+    print(f"p99 latency (ms) : {percentile(latencies, 99) * 1000:.1f}")
+    if failures:
+        print(f"\n***** {len(failures)} logins were rejected *****")
+        raise SystemExit(1)
+    print("\n+++++ Every login was accepted. +++++")
+
+
+if __name__ == "__main__":
+    main()
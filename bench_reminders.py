@@ -0,0 +1,80 @@
+import argparse # For command-line options
+import datetime # For schedules starting within the reminder lead
+import os # For temporary file paths
+import random # For the flaky sender
+import tempfile # For a scratch database
+import time # For timing dispatches
+
+import booking
+import core
+import migrations
+import reminders
+
+#------------------Reminder dispatch benchmark----------------------
+# Books --reminders appointments on schedules starting in the next few hours,
+# so every reminder is due at once, then times the dispatcher draining the
+# outbox through FileSender. With --fail-rate some sends fail, to include the
+# retry bookkeeping. The target is 100k reminders an hour, about 28 a second.
+
+TARGET_PER_HOUR = 100000
+
+
+def prepare(path, count, capacity):
+    con = booking.connect(path)
+    migrations.migrate(con)
+    patient_id = core.add_patient(con, "Benchmark Patient", 30, "1995-01-01", "Benchmark Street", "bench", "bench")
+    start = datetime.datetime.now() + datetime.timedelta(hours=2)
+    schedule_ids = []
+    for index in range(-(-count // capacity)):
+        moment = start + datetime.timedelta(minutes=index)
+        schedule_ids.append(core.add_schedule(con, moment.strftime("%Y-%m-%d"), moment.strftime("%I:%M %p"), capacity))
+    # Straight inserts rather than core.book_appointment; the trigger queues the reminders either way
+    con.executemany(
+        "INSERT INTO appointments (patient_id, schedule_id, appointment_type, appointment_date, appointment_time) VALUES (?, ?, 'checkup', '', '')",
+        ((patient_id, schedule_ids[index // capacity]) for index in range(count)))
+    con.commit()
+    return con
+
+
+def flaky(sender, fail_rate, rng):
+    def send(batch):
+        errors = sender(batch)
+        return [error if rng.random() >= fail_rate else "simulated failure" for error in errors]
+    return send
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reminder dispatch benchmark for CARe")
+    parser.add_argument("--reminders", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=reminders.BATCH_SIZE)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of sends that fail")
+    parser.add_argument("--capacity", type=int, default=1000, help="appointments per schedule")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="care-reminders-") as workdir:
+        con = prepare(os.path.join(workdir, "bench.db"), args.reminders, args.capacity)
+        sender = flaky(reminders.FileSender(os.path.join(workdir, "outbox.jsonl")), args.fail_rate, random.Random(args.seed))
+
+        totals = {"sent": 0, "retried": 0, "failed": 0, "expired": 0}
+        start = time.perf_counter()
+        while True:
+            counts = reminders.dispatch(con, sender, args.batch_size)
+            for name, count in counts.items():
+                totals[name] += count
+            if sum(counts.values()) < args.batch_size:
+                break
+        elapsed = time.perf_counter() - start
+        con.close()
+
+    handled = sum(totals.values())
+    print("=============================================================")
+    print("|               REMINDER DISPATCH BENCHMARK                 |")
+    print("=============================================================")
+    print(f"Sent {totals['sent']}, retrying {totals['retried']}, failed {totals['failed']}, expired {totals['expired']}")
+    print(f"{handled} reminders in {elapsed:.2f}s: {handled / elapsed:.0f}/sec, {handled / elapsed * 3600:,.0f}/hour "
+          f"({handled / elapsed * 3600 / TARGET_PER_HOUR:.0f}x the {TARGET_PER_HOUR:,}/hour target)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse # For command-line options
+import multiprocessing # For booking from several processes at once
+import os # For temporary file paths
+import random # For picking schedules at random
+import tempfile # For scratch site databases
+import time # For timing bookings
+
+import core
+import sites
+
+#------------------Multi-site booking benchmark----------------------
+# Books from several processes at once, first with every process writing to one
+# site and then with the processes spread over more and more sites, each with
+# its own database file. Bookings/sec should grow with the number of sites,
+# since each file has its own write lock.
+
+
+#------------------Prepare the sites----------------------
+def prepare_sites(directory, count, schedules, capacity):
+    router = sites.Router(directory)
+    for index in range(count):
+        site = f"site{index + 1}"
+        router.add_site(site, os.path.join(os.path.dirname(directory), site + ".db"))
+        router.signup(site, "Benchmark Patient", 30, "1995-01-01", "Benchmark Street", f"bench-{index}", "bench")
+        for slot in range(schedules):
+            router.run(site, core.add_schedule, "2030-01-07", f"{slot % 12 + 1}:{slot // 12:02d} AM", capacity)
+    router.close()
+
+
+#------------------One worker process----------------------
+def worker(args):
+    directory, site, count, seed = args
+    rng = random.Random(seed)
+    router = sites.Router(directory)
+    patient_id = router.find_patient(f"bench-{int(site[4:]) - 1}")[1]
+    schedule_ids = [row[0] for row in router.run(site, core.all_schedules)]
+    booked = 0
+    for _ in range(count):
+        if router.run(site, core.book_appointment, patient_id, rng.choice(schedule_ids), "benchmark") is not None:
+            booked += 1
+    router.close()
+    return booked
+
+
+def run(processes, bookings, site_count, schedules, capacity):
+    with tempfile.TemporaryDirectory(prefix="care-sites-") as workdir:
+        directory = os.path.join(workdir, sites.DIRECTORY_PATH)
+        prepare_sites(directory, site_count, schedules, capacity)
+
+        per_worker = bookings // processes
+        jobs = [(directory, f"site{index % site_count + 1}", per_worker, index) for index in range(processes)]
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes) as pool:
+            booked = sum(pool.map(worker, jobs))
+        return per_worker * processes / (time.perf_counter() - start), booked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-site booking benchmark for CARe")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--bookings", type=int, default=4000, help="total booking attempts per run")
+    parser.add_argument("--sites", type=int, nargs="+", default=[1, 2, 4, 8], help="site counts to compare")
+    parser.add_argument("--schedules", type=int, default=10, help="schedules per site")
+    parser.add_argument("--capacity", type=int, default=1000, help="seats per schedule")
+    args = parser.parse_args()
+
+    print("=============================================================")
+    print("|                MULTI-SITE BOOKING BENCHMARK               |")
+    print("=============================================================")
+    print(f"{'Sites':>6}{'Processes':>11}{'Booked':>9}{'Bookings/sec':>15}")
+    for site_count in args.sites:
+        rate, booked = run(args.processes, args.bookings, site_count, args.schedules, args.capacity)
+        print(f"{site_count:>6}{args.processes:>11}{booked:>9}{rate:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
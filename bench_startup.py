@@ -0,0 +1,121 @@
+import argparse # For command-line options
+import os # For temporary file paths
+import random # For picking query inputs
+import statistics # For medians
+import subprocess # For timing imports in a fresh interpreter
+import sys # For the interpreter path
+import tempfile # For a scratch working directory
+import time # For timing
+
+import booking
+import core
+import migrations
+
+#------------------Startup and per-query benchmark----------------------
+#   python synthetic.py bench.db --patients 100000 --appointments 1000000
+#   python bench_startup.py bench.db
+#
+# Startup: imports healthCARe in a fresh interpreter several times, from an
+# empty directory, and checks that the import created no files; then times
+# opening and migrating a connection to an up-to-date database.
+#
+# Per query: runs the same fixed queries the menu runs most (login lookup, a
+# patient's appointments, the first listing page) on one connection with
+# sqlite3's statement cache turned off and then with CACHED_STATEMENTS, and
+# reports microseconds per call. Without the cache every call parses and plans
+# its SQL again.
+
+
+#------------------Startup----------------------
+def import_times(runs):
+    code = ("import sys, time; sys.path.insert(0, sys.argv[1]); start = time.perf_counter(); "
+            "import healthCARe; print(time.perf_counter() - start)")
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(prefix="care-import-") as workdir:
+        times = [float(subprocess.check_output([sys.executable, "-c", code, here], cwd=workdir))
+                 for _ in range(runs)]
+        return times, os.listdir(workdir)
+
+
+def connect_times(path, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        con = booking.connect(path)
+        migrations.migrate(con)
+        times.append(time.perf_counter() - start)
+        con.close()
+    return times
+
+
+#------------------Per query----------------------
+def sample_inputs(con, count, seed):
+    rng = random.Random(seed)
+    top = con.execute("SELECT MAX(patient_id) FROM patients").fetchone()[0] or 0
+    patients = []
+    for _ in range(count):
+        row = con.execute("SELECT patient_id, phone_number FROM patients WHERE patient_id >= ? LIMIT 1",
+                          (rng.randint(1, max(top, 1)),)).fetchone()
+        if row:
+            patients.append(row)
+    return patients
+
+
+QUERIES = {
+    "credentials": lambda con, patient: core.credentials(con, patient[1]),
+    "get_patient": lambda con, patient: core.get_patient(con, patient[0]),
+    "patient_appointments": lambda con, patient: core.patient_appointments(con, patient[0]),
+    "appointment_page": lambda con, patient: core.appointment_page(con, {"status": "Pending"}),
+}
+
+
+def query_times(path, cached_statements, patients):
+    con = booking.connect(path, cached_statements=cached_statements)
+    results = {}
+    for name, query in QUERIES.items():
+        # One pass to warm the page cache, so both runs read from memory
+        for patient in patients:
+            query(con, patient)
+        start = time.perf_counter()
+        for patient in patients:
+            query(con, patient)
+        results[name] = (time.perf_counter() - start) / len(patients)
+    con.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup and per-query benchmark for CARe")
+    parser.add_argument("db", help="database made by synthetic.py")
+    parser.add_argument("--imports", type=int, default=10, help="fresh-interpreter imports to time")
+    parser.add_argument("--connects", type=int, default=50, help="connect + migrate rounds to time")
+    parser.add_argument("--queries", type=int, default=5000, help="calls per query and cache setting")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    con = booking.connect(args.db)
+    migrations.migrate(con)
+    patients = sample_inputs(con, args.queries, args.seed)
+    con.close()
+    if not patients:
+        parser.error(f"{args.db} has no patients; fill it with synthetic.py first")
+
+    print("=============================================================")
+    print("|               STARTUP AND PER-QUERY BENCHMARK             |")
+    print("=============================================================")
+    times, created = import_times(args.imports)
+    print(f"import healthCARe     {statistics.median(times) * 1000:8.1f} ms median of {args.imports}")
+    print(f"files created         {', '.join(created) if created else 'none'}")
+    times = connect_times(args.db, args.connects)
+    print(f"connect + migrate     {statistics.median(times) * 1000:8.2f} ms median of {args.connects}")
+
+    uncached = query_times(args.db, 0, patients)
+    cached = query_times(args.db, booking.CACHED_STATEMENTS, patients)
+    print(f"\n{'Query':<22}{'No cache us':>12}{'Cached us':>12}{'Speedup':>10}")
+    for name in QUERIES:
+        print(f"{name:<22}{uncached[name] * 1e6:>12.1f}{cached[name] * 1e6:>12.1f}"
+              f"{uncached[name] / cached[name]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse # For command-line options
+import json # For baseline files
+import os # For temporary file paths
+import random # For seeded operation inputs
+import resource # For peak RSS
+import shutil # For removing the scratch copy
+import sqlite3 # For the scratch copy
+import sys # For the exit status
+import tempfile # For a scratch copy of the database
+import time # For timing operations
+from concurrent.futures import ProcessPoolExecutor # For running each operation in a fresh process
+
+import booking
+import core
+import synthetic
+
+#------------------Benchmark suite----------------------
+#   python synthetic.py bench.db --patients 1000000 --appointments 10000000
+#   python bench_suite.py bench.db --save baseline.json
+#   python bench_suite.py bench.db --baseline baseline.json
+#
+# Drives each menu operation through the core, the same entry point the terminal
+# menu and the HTTP service use, against a scratch copy of a database made by
+# synthetic.py. Each operation runs in its own process, so its peak RSS is its
+# own. Reports throughput, latency percentiles and peak RSS. With --baseline it
+# compares against a saved run and exits with status 1 if any operation got
+# slower or bigger by more than --tolerance.
+
+FAR_FUTURE = "2099-01-01"   # update_schedule adds and removes slots here, clear of the synthetic calendar
+
+
+#------------------One run of each operation----------------------
+def schedule_appointment(con, rng, state):
+    schedules = core.available_schedules(con)
+    if schedules:
+        patient_id = rng.randint(1, state["patients"])
+        core.book_appointment(con, patient_id, rng.choice(schedules)[0], "checkup")
+
+
+def view_appointments(con, rng, state):
+    # Same skew as the generator: low patient_ids have the most appointments
+    patient_id = int(state["patients"] * rng.random() ** 2) + 1
+    core.patient_appointments(con, patient_id)
+    core.patient_appointment_count(con, patient_id)
+
+
+def view_all_appointments(con, rng, state):
+    core.status_counts(con)
+    filters = rng.choice([{}, {"status": "Pending"}, {"status": "COMPLETED"}, {"type": "urgent care"}])
+    appointments, _, has_next = core.appointment_page(con, filters)
+    # Page forward twice, as an admin looking through the list would
+    for _ in range(2):
+        if not has_next:
+            break
+        appointments, _, has_next = core.appointment_page(con, filters, after_id=appointments[-1][0])
+
+
+def delete_account(con, rng, state):
+    # Each run deletes a different patient, counting down from the highest id
+    core.delete_account(con, state["next_deleted"], synthetic.PASSWORD)
+    state["next_deleted"] -= 1
+
+
+def update_schedule(con, rng, state):
+    core.all_schedules(con)
+    schedule_id = core.add_schedule(con, FAR_FUTURE, f"{rng.randint(1, 12)}:{rng.randint(0, 59):02d} PM", 10)
+    if schedule_id is not None:
+        core.delete_schedule(con, schedule_id)
+
+
+# Operation -> (function, default number of runs)
+OPERATIONS = {
+    "schedule_appointment": (schedule_appointment, 200),
+    "view_appointments": (view_appointments, 1000),
+    "view_all_appointments": (view_all_appointments, 300),
+    "delete_account": (delete_account, 5),   # each run checks a PBKDF2 hash
+    "update_schedule": (update_schedule, 20),
+}
+
+# Metrics compared against a baseline; True means bigger is better
+METRICS = {"ops_per_sec": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+#------------------Run one operation in this process and measure it----------------------
+def run_operation(path, name, runs, seed):
+    func, _ = OPERATIONS[name]
+    con = booking.connect(path)
+    patients = con.execute("SELECT MAX(patient_id) FROM patients").fetchone()[0] or 1
+    state = {"patients": patients, "next_deleted": patients}
+    rng = random.Random(seed)
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(runs):
+        began = time.perf_counter()
+        func(con, rng, state)
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - started
+    con.close()
+
+    return {
+        "runs": runs,
+        "ops_per_sec": runs / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+#------------------Compare with a saved run----------------------
+# Returns [(operation, metric, baseline, current)] for every metric worse than the tolerance allows
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for metric, bigger_is_better in METRICS.items():
+            if bigger_is_better:
+                worse = result[metric] < before[metric] * (1 - tolerance)
+            else:
+                worse = result[metric] > before[metric] * (1 + tolerance)
+            if worse:
+                found.append((name, metric, before[metric], result[metric]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every CARe operation against a synthetic database")
+    parser.add_argument("db", help="database made by synthetic.py")
+    parser.add_argument("--only", nargs="+", choices=sorted(OPERATIONS), help="operations to run (default: all)")
+    parser.add_argument("--runs", type=int, help="runs per operation (default: per-operation)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--in-place", action="store_true", help="run against the database itself instead of a copy")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a regression, as a fraction")
+    args = parser.parse_args()
+
+    path = args.db
+    workdir = None
+    if not args.in_place:
+        # Operations book, delete and add rows, so work on a copy to keep runs reproducible
+        workdir = tempfile.mkdtemp(prefix="care-bench-")
+        path = os.path.join(workdir, "HealthCARe.db")
+        src = sqlite3.connect(args.db)
+        dst = sqlite3.connect(path)
+        src.backup(dst)
+        src.close()
+        dst.close()
+
+    results = {}
+    try:
+        for name in args.only or OPERATIONS:
+            runs = args.runs or OPERATIONS[name][1]
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results[name] = executor.submit(run_operation, path, name, runs, args.seed).result()
+    finally:
+        if workdir is not None:
+            shutil.rmtree(workdir)
+
+    print("=================================================================================")
+    print("|                            CARe BENCHMARK SUITE                               |")
+    print("=================================================================================")
+    print(f"{'Operation':<22}{'Runs':>6}{'Ops/sec':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>10}")
+    for name, result in results.items():
+        print(f"{name:<22}{result['runs']:>6}{result['ops_per_sec']:>10.1f}{result['p50_ms']:>10.2f}"
+              f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['peak_rss_mb']:>10.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as stream:
+            json.dump({"db": args.db, "seed": args.seed, "results": results}, stream, indent=2)
+        print(f"\n+++++ Results saved to {args.save}. +++++")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as stream:
+            baseline = json.load(stream)["results"]
+        found = regressions(results, baseline, args.tolerance)
+        for name, metric, before, after in found:
+            print(f"***** {name} {metric}: {before:.2f} -> {after:.2f} *****")
+        if found:
+            sys.exit(1)
+        print(f"\n+++++ No regressions beyond {args.tolerance:.0%} of {args.baseline}. +++++")
+
+
+if __name__ == "__main__":
+    main()
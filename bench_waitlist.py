@@ -0,0 +1,112 @@
+import argparse # For command-line options
+import os # For temporary file paths
+import random # For priorities and cancellation order
+import sqlite3 # For database operations
+import tempfile # For a scratch database
+import time # For timing cancellations
+
+import booking
+import core
+import migrations
+import waitlist
+
+#------------------Cancel-and-promote benchmark----------------------
+# Builds a full schedule with a long waitlist of mixed urgent and routine
+# waiters, then cancels booked appointments one at a time. Every cancel promotes
+# the next waiter in the same transaction. Prints cancels per second and checks
+# that waiters were promoted strictly in priority, then first-come, order.
+
+
+#------------------Create a scratch database with a full schedule and its queue----------------------
+def prepare_database(path, capacity, waiters, urgent_share, seed):
+    rng = random.Random(seed)
+    con = sqlite3.connect(path)
+    migrations.migrate(con)
+    cur = con.cursor()
+    schedule_id = core.add_schedule(con, "2030-01-07", "9:00 AM", capacity)
+    cur.execute("UPDATE admin_schedules SET booked_count = capacity WHERE schedule_id = ?", (schedule_id,))
+    cur.executemany(
+        "INSERT INTO appointments (patient_id, schedule_id, appointment_type, appointment_date, appointment_time) VALUES (?, ?, 'checkup', '2030-01-07', '09:00 AM')",
+        [(patient_id, schedule_id) for patient_id in range(1, capacity + 1)]
+    )
+    cur.executemany(
+        "INSERT INTO waitlist (schedule_id, patient_id, appointment_type, priority) VALUES (?, ?, ?, ?)",
+        [(schedule_id, capacity + idx + 1, appointment_type, waitlist.priority_for(appointment_type))
+         for idx, appointment_type in enumerate(
+             "urgent care" if rng.random() < urgent_share else "checkup" for _ in range(waiters))]
+    )
+    con.commit()
+    con.close()
+    return schedule_id
+
+
+#------------------Check the schedule's seats and the promotion order----------------------
+def check_results(con, schedule_id, before):
+    problems = []
+    capacity, booked_count = con.execute(
+        "SELECT capacity, booked_count FROM admin_schedules WHERE schedule_id = ?", (schedule_id,)).fetchone()
+    taken = con.execute("SELECT COUNT(*) FROM appointments WHERE schedule_id = ?", (schedule_id,)).fetchone()[0]
+    after = {row[0] for row in con.execute("SELECT waitlist_id FROM waitlist WHERE schedule_id = ?", (schedule_id,))}
+    # A seat may only stay free once nobody is left waiting
+    if taken != booked_count or (taken < capacity and after):
+        problems.append(f"capacity {capacity}, booked_count {booked_count}, appointments {taken}, still waiting {len(after)}")
+
+    promoted = [key for key in before if key[1] not in after]
+    waiting = [key for key in before if key[1] in after]
+    if promoted and waiting and max(promoted) > min(waiting):
+        problems.append("a waiter was promoted ahead of someone with a better place in the queue")
+    return problems
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Waitlist cancel-and-promote benchmark for CARe")
+    parser.add_argument("--capacity", type=int, default=2000, help="seats on the full schedule")
+    parser.add_argument("--waiters", type=int, default=50000)
+    parser.add_argument("--cancels", type=int, default=2000)
+    parser.add_argument("--urgent-share", type=float, default=0.2, help="fraction of waiters needing urgent care")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="care-bench-") as workdir:
+        path = os.path.join(workdir, "HealthCARe.db")
+        schedule_id = prepare_database(path, args.capacity, args.waiters, args.urgent_share, args.seed)
+
+        con = booking.connect(path)
+        before = sorted(con.execute("SELECT priority, waitlist_id FROM waitlist WHERE schedule_id = ?", (schedule_id,)))
+        rng = random.Random(args.seed)
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(args.cancels):
+            patient_id, appointment_id = rng.choice(con.execute(
+                "SELECT patient_id, appointment_id FROM appointments WHERE schedule_id = ? LIMIT 64", (schedule_id,)).fetchall())
+            began = time.perf_counter()
+            core.cancel_appointment(con, patient_id, appointment_id)
+            latencies.append(time.perf_counter() - began)
+        elapsed = time.perf_counter() - start
+        problems = check_results(con, schedule_id, before)
+        con.close()
+
+    print("=============================================================")
+    print("|              CANCEL-AND-PROMOTE BENCHMARK                 |")
+    print("=============================================================")
+    print(f"Seats            : {args.capacity}")
+    print(f"Waiters          : {args.waiters}")
+    print(f"Cancels          : {len(latencies)}")
+    print(f"Cancels/sec      : {len(latencies) / elapsed:.0f}")
+    print(f"p50 latency (ms) : {percentile(latencies, 50) * 1000:.2f}")
+    print(f"p99 latency (ms) : {percentile(latencies, 99) * 1000:.2f}")
+    if problems:
+        print("\n***** PROBLEMS *****")
+        for problem in problems:
+            print(problem)
+        raise SystemExit(1)
+    print("\n+++++ Every cancel promoted the next waiter in order. +++++")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import random # For jittered backoff between retries
+import sqlite3 # For database operations
+import time # For backoff sleeps
+
+import instrument # Opt-in statement timing
+import slots # Booking timestamps
+
+#------------------Booking engine settings----------------------
+DB_PATH = 'HealthCARe.db'
+BUSY_TIMEOUT = 5.0     # seconds SQLite itself waits on a locked database
+MAX_RETRIES = 8        # extra attempts after SQLite gives up waiting
+BACKOFF_BASE = 0.005   # first backoff window, in seconds
+BACKOFF_CAP = 0.25     # never sleep longer than this between attempts
+
+#------------------Connection settings----------------------
+SYNCHRONOUS = "FULL"          # fsync on every commit; NORMAL is faster in WAL but can lose the last commits on power loss
+CACHE_SIZE = -16000           # page cache per connection; negative means KiB, so 16 MB
+MMAP_SIZE = 256 * 1024 * 1024 # bytes of the file read through memory mapping instead of read() calls
+CACHED_STATEMENTS = 256       # prepared statements kept per connection (sqlite3's default is 128)
+
+
+# A plain sqlite3.Connection can't carry attributes; this one can hold
+# per-connection state such as the availability cache. It also times each
+# statement while instrumentation is on.
+class CareConnection(sqlite3.Connection):
+    def execute(self, sql, parameters=()):
+        if instrument.registry is None:
+            return super().execute(sql, parameters)
+        return instrument.time_statement(self, super().execute, sql, parameters)
+
+    def executemany(self, sql, parameters):
+        if instrument.registry is None:
+            return super().executemany(sql, parameters)
+        return instrument.time_statement(self, super().executemany, sql, parameters, many=True)
+
+
+#------------------Open a WAL-mode connection----------------------
+# Every CARe query is a fixed SQL string, so with a big enough statement cache each
+# one is parsed once per connection and reused from then on.
+def connect(path=DB_PATH, timeout=BUSY_TIMEOUT, wal=True, synchronous=SYNCHRONOUS, cache_size=CACHE_SIZE,
+            mmap_size=MMAP_SIZE, cached_statements=CACHED_STATEMENTS):
+    con = sqlite3.connect(path, timeout=timeout, factory=CareConnection, cached_statements=cached_statements)
+    if wal:
+        # WAL lets the other terminals keep reading while one of them is booking
+        con.execute("PRAGMA journal_mode=WAL")
+    # PRAGMA doesn't take bound parameters; int() and the name check keep these literal
+    if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        raise ValueError(f"synchronous must be OFF, NORMAL, FULL or EXTRA, not {synchronous!r}")
+    con.execute(f"PRAGMA synchronous = {synchronous.upper()}")
+    con.execute(f"PRAGMA cache_size = {int(cache_size)}")
+    con.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    return con
+
+
+def _is_lock_error(exc):
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+#------------------Claim one seat and record the appointment in one transaction----------------------
+# Conditional increment: only matches while the slot still has a seat
+CLAIM_SEAT_SQL = "UPDATE admin_schedules SET booked_count = booked_count + 1 WHERE schedule_id = ? AND booked_count < capacity"
+
+
+def _claim_seat(con, patient_id, schedule_id, appointment_type):
+    # BEGIN IMMEDIATE takes the write lock up front so no other terminal can
+    # claim the same seat between our increment and our insert
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        claimed = con.execute(CLAIM_SEAT_SQL, (schedule_id,)).rowcount
+
+        if claimed != 1:
+            # The slot filled up (or was removed) since the patient saw it
+            con.rollback()
+            return None
+
+        schedule_date, schedule_time = con.execute(
+            "SELECT schedule_date, schedule_time FROM admin_schedules WHERE schedule_id = ?",
+            (schedule_id,)
+        ).fetchone()
+        appointment_id = con.execute(
+            "INSERT INTO appointments (patient_id, schedule_id, appointment_type, appointment_date, appointment_time, booked_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (patient_id, schedule_id, appointment_type, schedule_date, schedule_time, slots.now_timestamp())
+        ).lastrowid
+        con.commit()
+        return appointment_id
+    except BaseException:
+        con.rollback()
+        raise
+
+
+#------------------Book an appointment, retrying on lock contention----------------------
+# Returns the new appointment_id, or None if the schedule has no seats left.
+def book_appointment(con, patient_id, schedule_id, appointment_type, retries=MAX_RETRIES):
+    for attempt in range(retries + 1):
+        try:
+            return _claim_seat(con, patient_id, schedule_id, appointment_type)
+        except sqlite3.OperationalError as exc:
+            if not _is_lock_error(exc) or attempt == retries:
+                raise
+            # Exponential backoff with full jitter so competing terminals don't retry in lockstep
+            time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
@@ -0,0 +1,142 @@
+import sqlite3 # For database operations
+import sys # For the exit status
+
+import archive
+import availability
+import booking
+import core
+import migrations
+import reminders
+import search
+import slots
+import stats
+import waitlist
+
+try:
+    import analytics # Needs numpy
+except ImportError:
+    analytics = None
+
+#------------------Query plan check----------------------
+# Runs EXPLAIN QUERY PLAN on every lookup the CARe core issues and fails if
+# any of them falls back to a full SCAN of a table. Walking a covering index
+# end to end (the GROUP BY status summary) is allowed; reading the raw table is not.
+# The full schedule listing in update_schedule reads every row by design and is left out.
+#
+# Each entry uses the constant (or query builder) the code itself runs, so a
+# changed query is checked as it now is. The trigger bodies are the exception:
+# shipped migrations never change, so the statements below copy them.
+
+
+# Returns (sql, params) for update_statuses' UPDATE with the given selection
+def bulk_update(**selection):
+    where, params = core.status_filter("COMPLETED", **selection)
+    return core.STATUS_UPDATE_SQL.format(where=where), ["COMPLETED"] + params
+
+
+# Returns (sql, params) for the seats update_statuses gives back when cancelling
+def released_seats(**selection):
+    where, params = core.status_filter("CANCELLED", **selection)
+    return core.RELEASED_SEATS_SQL.format(where=where), params
+
+
+HOT_QUERIES = [
+    ("patient login", core.CREDENTIALS_SQL, ("",)),
+    ("upgrade password hash", core.UPGRADE_PASSWORD_SQL, ("", 0, "")),
+    ("patient password", core.STORED_PASSWORD_SQL, (0,)),
+    ("open schedules", availability.AVAILABLE_SQL, ()),
+    ("next open slots", slots.NEXT_OPEN_SQL, (0, 5)),
+    ("next open slots for a type", slots.NEXT_OPEN_FOR_TYPE_SQL, ("", 0, 5, 0, 5, 5)),
+    ("claim seat", booking.CLAIM_SEAT_SQL, (0,)),
+    ("release seat", core.RELEASE_SEAT_SQL, (0,)),
+    ("patient appointments", core.PATIENT_APPOINTMENTS_SQL, (0,)),
+    ("cancelled appointment's schedule", core.OWN_APPOINTMENT_SQL, (0, 0)),
+    ("delete appointment", core.DELETE_OWN_APPOINTMENT_SQL, (0, 0)),
+    ("account schedules", core.ACCOUNT_SCHEDULES_SQL, (0,)),
+    ("release account seats", core.RELEASE_ACCOUNT_SEATS_SQL, (0, 0)),
+    ("account appointments", core.ACCOUNT_APPOINTMENTS_SQL, (0,)),
+    ("delete account appointments", core.DELETE_ACCOUNT_APPOINTMENTS_SQL, (0,)),
+    ("delete patient", core.DELETE_PATIENT_SQL, (0,)),
+    ("delete account waitlist", core.DELETE_ACCOUNT_WAITLIST_SQL, (0,)),
+    ("appointment page", *core.appointment_page_query({})),
+    ("appointment page by status", *core.appointment_page_query({"status": ""}, before_id=0)),
+    ("appointment page by date and type", *core.appointment_page_query({"date": "", "type": ""})),
+    ("appointment page with archive", *core.appointment_page_query({"status": ""}, source="all_appointments")),
+    ("status summary", stats.COUNTS_SQL, ("status",)),
+    ("appointment count", stats.COUNT_SQL, ("patient", 0)),
+    ("mark completed", core.MARK_COMPLETED_SQL, (0,)),
+    ("full schedules", core.FULL_SCHEDULES_SQL, ()),
+    ("join waitlist", waitlist.FULL_SCHEDULE_SQL, (0,)),
+    ("next waiter", waitlist.NEXT_WAITER_SQL, (0,)),
+    ("promote waiter", waitlist.PROMOTED_SQL, (0,)),
+    ("leave waitlist", waitlist.LEAVE_SQL, (0, 0)),
+    ("patient waitlist", waitlist.PATIENT_ENTRIES_SQL, (0,)),
+    ("delete schedule waitlist", core.DELETE_SCHEDULE_WAITLIST_SQL, (0,)),
+    ("deleted schedule's reminders", core.DELETE_SCHEDULE_REMINDERS_SQL, (0,)),
+    ("delete schedule", core.DELETE_SCHEDULE_SQL, (0,)),
+    ("bulk status by IDs", *bulk_update(appointment_ids=[1])),
+    ("bulk status by date range", *bulk_update(date_from="2030-01-01", date_to="2030-01-31")),
+    ("bulk status by schedule", *bulk_update(schedule_id=0)),
+    ("bulk cancel seats by schedule", *released_seats(schedule_id=0)),
+    ("release cancelled seats", core.RELEASE_SEATS_SQL, (0, 0)),
+    ("search patients", search.PATIENTS_SQL, ('"maria"*', 20)),
+    ("search patients by phone fragment",
+     search.PHONE_SQL.format(conditions=search.WORD_CONDITION), ('"4567"', "%maria%", 20)),
+    ("search appointments", search.APPOINTMENTS_SQL, ('"checkup"*', 20)),
+    ("archive batch", archive.BATCH_SQL, ("", 500)),
+    ("archived patient appointments", archive.PATIENT_APPOINTMENTS_SQL, (0,)),
+    ("delete archived account appointments", archive.DELETE_PATIENT_SQL, (0,)),
+    ("due reminders", reminders.DUE_SQL, (0, 500)),
+    ("expire reminder", reminders.EXPIRE_SQL, (0,)),
+    ("claim reminders", reminders.CLAIM_SQL, (0, "[]")),
+    ("sent reminder", reminders.SENT_SQL, (0, 0)),
+    ("retry reminder", reminders.RETRY_SQL, (0, "", 0)),
+    ("failed reminder", reminders.FAILED_SQL, ("", 0)),
+    ("reminder attempt", reminders.ATTEMPT_SQL, (0, "", 0)),
+    ("due reminder count", reminders.DUE_COUNT_SQL, (0,)),
+    # Trigger bodies from migration 11
+    ("cancelled appointment's reminder",
+     "DELETE FROM reminders WHERE appointment_id = ? AND status = 'PENDING'", (0,)),
+    ("deleted reminder's attempts",
+     "DELETE FROM reminder_attempts WHERE reminder_id = ?", (0,)),
+]
+
+if analytics is not None:
+    HOT_QUERIES += [
+        ("analytics schedules", analytics.SCHEDULES_SQL, ("", "")),
+        ("analytics appointments", analytics.APPOINTMENTS_SQL.format(source="appointments"), ("", "")),
+    ]
+
+
+def is_table_scan(detail):
+    # "SCAN appointments" or "SCAN a" reads the table itself;
+    # "SCAN appointments USING COVERING INDEX ..." only reads an index, and
+    # "SCAN (subquery-1)" reads the few rows a LIMITed subquery already found, and
+    # "SCAN json_each VIRTUAL TABLE" walks an ID list passed as a parameter
+    return (detail.startswith("SCAN ") and " USING " not in detail and not detail.startswith("SCAN (")
+            and " VIRTUAL TABLE" not in detail)
+
+
+#------------------Return (name, plan line) for every query that scans a table----------------------
+def check_query_plans(con, queries=HOT_QUERIES):
+    failures = []
+    for name, sql, params in queries:
+        for row in con.execute("EXPLAIN QUERY PLAN " + sql, params):
+            detail = row[-1]
+            if is_table_scan(detail):
+                failures.append((name, detail))
+    return failures
+
+
+if __name__ == "__main__":
+    # Check against an in-memory database built from the migrations by default
+    con = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else ":memory:")
+    migrations.migrate(con)
+    # The archive queries need an archive; an empty in-memory one has the same indexes
+    archive.attach(con, ":memory:")
+    failures = check_query_plans(con)
+    for name, detail in failures:
+        print(f"***** {name}: {detail} *****")
+    if failures:
+        sys.exit(1)
+    print(f"+++++ All {len(HOT_QUERIES)} queries use an index. +++++")
@@ -0,0 +1,468 @@
+import json # For ID lists passed as one parameter
+import sqlite3 # For database operations
+
+import archive # Cold storage for old appointments
+import availability # In-process cache of the open slots
+import booking # Race-free booking engine
+import instrument # Opt-in per-operation timing
+import passwords # Salted password hashes
+import search # Full-text search over patients and appointments
+import slots # Normalized slot times and the next-open-slot search
+import stats # Appointment counts kept by triggers
+import waitlist # Priority queues for full schedules
+
+#------------------CARe core----------------------
+# The booking logic with no input(), getpass() or print(). Every function takes
+# the connection to work on as its first argument, so the terminal menu, the
+# HTTP service and batch jobs can each bring their own connection.
+
+ADMIN_PASSWORD = "admin123"  # Replace with secure handling
+
+
+def check_admin_password(password):
+    return password == ADMIN_PASSWORD
+
+
+#------------------Patients----------------------
+# login, signup and delete_account hash on the calling thread. The HTTP service
+# calls the lookup and write halves below itself and hashes on passwords' pool,
+# so slow hashes never hold a database thread.
+
+CREDENTIALS_SQL = "SELECT patient_id, full_name, password FROM patients WHERE phone_number = ?"
+UPGRADE_PASSWORD_SQL = "UPDATE patients SET password = ? WHERE patient_id = ? AND password = ?"
+STORED_PASSWORD_SQL = "SELECT password FROM patients WHERE patient_id = ?"
+
+
+# Returns (patient_id, full_name, password) for the phone number, or None
+@instrument.operation
+def credentials(con, phone_number):
+    return con.execute(CREDENTIALS_SQL, (phone_number,)).fetchone()
+
+
+# Replaces a plain or outdated stored password with new_hash, unless it changed since it was read
+@instrument.operation
+def upgrade_password(con, patient_id, old_password, new_hash):
+    con.execute(UPGRADE_PASSWORD_SQL, (new_hash, patient_id, old_password))
+    con.commit()
+
+
+# Returns (patient_id, full_name), or None if the credentials don't match
+@instrument.operation
+def login(con, phone_number, password):
+    patient = credentials(con, phone_number)
+    matches, needs_rehash = passwords.verify_password(password, patient[2] if patient else None)
+    if not matches:
+        return None
+    if needs_rehash:
+        upgrade_password(con, patient[0], patient[2], passwords.hash_password(password))
+    return patient[0], patient[1]
+
+
+# Returns the new patient_id, or None if the phone number is already registered
+@instrument.operation
+def signup(con, full_name, age, date_of_birth, address, phone_number, password):
+    return add_patient(con, full_name, age, date_of_birth, address, phone_number, passwords.hash_password(password))
+
+
+# Like signup, with the password already hashed
+@instrument.operation
+def add_patient(con, full_name, age, date_of_birth, address, phone_number, password_hash):
+    try:
+        patient_id = con.execute(
+            "INSERT INTO patients (full_name, age, date_of_birth, address, phone_number, password) VALUES (?, ?, ?, ?, ?, ?)",
+            (full_name, age, date_of_birth, address, phone_number, password_hash)
+        ).lastrowid
+    except sqlite3.IntegrityError:
+        # phone_number is UNIQUE, so the database settles races between two sign-ups
+        con.rollback()
+        return None
+    con.commit()
+    return patient_id
+
+
+@instrument.operation
+def get_patient(con, patient_id):
+    return con.execute("SELECT * FROM patients WHERE patient_id = ?", (patient_id,)).fetchone()
+
+
+# Returns the stored password of the patient, or None if there is no such patient
+@instrument.operation
+def stored_password(con, patient_id):
+    row = con.execute(STORED_PASSWORD_SQL, (patient_id,)).fetchone()
+    return row[0] if row else None
+
+
+# Deletes the patient and their appointments if the password matches; returns True on success
+@instrument.operation
+def delete_account(con, patient_id, password):
+    patient = get_patient(con, patient_id)
+    if not patient or not passwords.verify_password(password, patient[6])[0]:
+        return False
+    remove_patient(con, patient_id)
+    return True
+
+
+ACCOUNT_SCHEDULES_SQL = "SELECT DISTINCT schedule_id FROM appointments WHERE patient_id = ?"
+RELEASE_ACCOUNT_SEATS_SQL = """
+    UPDATE admin_schedules
+    SET booked_count = MAX(booked_count - (SELECT COUNT(*) FROM appointments a
+                                           WHERE a.schedule_id = admin_schedules.schedule_id AND a.patient_id = ?
+                                             AND a.status IS NOT 'CANCELLED'), 0)
+    WHERE schedule_id IN (SELECT schedule_id FROM appointments WHERE patient_id = ?)"""
+DELETE_PATIENT_SQL = "DELETE FROM patients WHERE patient_id = ?"
+DELETE_ACCOUNT_APPOINTMENTS_SQL = "DELETE FROM appointments WHERE patient_id = ?"
+DELETE_ACCOUNT_WAITLIST_SQL = "DELETE FROM waitlist WHERE patient_id = ?"
+
+
+# Deletes the patient, their appointments and waitlist entries without checking a password
+@instrument.operation
+def remove_patient(con, patient_id):
+    schedule_ids = [row[0] for row in con.execute(ACCOUNT_SCHEDULES_SQL, (patient_id,))]
+    # Give back every seat the patient held, in the same transaction as the deletes
+    con.execute(RELEASE_ACCOUNT_SEATS_SQL, (patient_id, patient_id))
+    con.execute(DELETE_PATIENT_SQL, (patient_id,))
+    con.execute(DELETE_ACCOUNT_APPOINTMENTS_SQL, (patient_id,))
+    con.execute(DELETE_ACCOUNT_WAITLIST_SQL, (patient_id,))
+    # Waiters take the freed seats before anyone else can see them
+    for schedule_id in schedule_ids:
+        waitlist.fill_seats(con, schedule_id)
+    con.commit()
+    # Several schedules may have reopened; reload the open slots on the next read
+    availability.invalidate(con)
+    archive.delete_patient(con, patient_id)
+
+
+#------------------Schedules----------------------
+# Returns (schedule_id, schedule_date, schedule_time, remaining) for schedules with a free seat, in start-time order
+@instrument.operation
+def available_schedules(con):
+    return availability.open_slots(con)
+
+
+# Returns up to count (schedule_id, schedule_date, schedule_time, remaining, appointment_type, starts_at)
+# rows for the open slots starting after `after`, optionally only those an appointment type can use
+@instrument.operation
+def next_open_slots(con, after, count=5, appointment_type=None):
+    return slots.next_open_slots(con, after, count, appointment_type)
+
+
+# Returns (schedule_id, schedule_date, schedule_time, capacity, booked_count) for every schedule, in start-time order
+@instrument.operation
+def all_schedules(con):
+    return con.execute(
+        "SELECT schedule_id, schedule_date, schedule_time, capacity, booked_count FROM admin_schedules ORDER BY starts_at, schedule_id"
+    ).fetchall()
+
+
+# Returns the new schedule_id, or None if there is already a schedule at that date and time.
+# Raises ValueError if the date or time can't be parsed.
+@instrument.operation
+def add_schedule(con, schedule_date, schedule_time, capacity, duration_minutes=slots.DEFAULT_DURATION, appointment_type=None):
+    if duration_minutes <= 0:
+        raise ValueError("slot length must be at least 1 minute")
+    starts_at, schedule_date, schedule_time = slots.normalize(schedule_date, schedule_time)
+    try:
+        schedule_id = con.execute(
+            "INSERT INTO admin_schedules (schedule_date, schedule_time, starts_at, duration_minutes, appointment_type, capacity) VALUES (?, ?, ?, ?, ?, ?)",
+            (schedule_date, schedule_time, starts_at, duration_minutes, appointment_type or None, capacity)
+        ).lastrowid
+    except sqlite3.IntegrityError:
+        con.rollback()
+        return None
+    con.commit()
+    availability.slot_added(con, schedule_id, schedule_date, schedule_time, capacity, starts_at)
+    return schedule_id
+
+
+FULL_SCHEDULES_SQL = """
+    SELECT s.schedule_id, s.schedule_date, s.schedule_time,
+           (SELECT COUNT(*) FROM waitlist w WHERE w.schedule_id = s.schedule_id) AS waiting
+    FROM admin_schedules s
+    WHERE s.booked_count >= s.capacity
+    ORDER BY s.starts_at"""
+
+
+# Returns (schedule_id, schedule_date, schedule_time, waiting) for schedules with no seats left, in start-time order
+@instrument.operation
+def full_schedules(con):
+    return con.execute(FULL_SCHEDULES_SQL).fetchall()
+
+
+DELETE_SCHEDULE_WAITLIST_SQL = "DELETE FROM waitlist WHERE schedule_id = ?"
+DELETE_SCHEDULE_REMINDERS_SQL = """
+    DELETE FROM reminders
+    WHERE status = 'PENDING' AND appointment_id IN (SELECT appointment_id FROM appointments WHERE schedule_id = ?)"""
+DELETE_SCHEDULE_SQL = "DELETE FROM admin_schedules WHERE schedule_id = ?"
+
+
+# Returns True if a schedule was deleted
+@instrument.operation
+def delete_schedule(con, schedule_id):
+    con.execute(DELETE_SCHEDULE_WAITLIST_SQL, (schedule_id,))
+    # The slot is gone, so nobody should be reminded about it
+    con.execute(DELETE_SCHEDULE_REMINDERS_SQL, (schedule_id,))
+    deleted = con.execute(DELETE_SCHEDULE_SQL, (schedule_id,)).rowcount
+    con.commit()
+    availability.slot_removed(con, schedule_id)
+    return deleted == 1
+
+
+#------------------Appointments----------------------
+# Returns the new appointment_id, or None if the schedule has no seats left
+@instrument.operation
+def book_appointment(con, patient_id, schedule_id, appointment_type):
+    appointment_id = booking.book_appointment(con, patient_id, schedule_id, appointment_type)
+    if appointment_id is not None:
+        availability.seat_taken(con, schedule_id)
+    return appointment_id
+
+
+PATIENT_APPOINTMENTS_SQL = """
+    SELECT a.appointment_id, a.appointment_type, s.schedule_date, s.schedule_time, a.status
+    FROM appointments a
+    JOIN admin_schedules s ON a.schedule_id = s.schedule_id
+    WHERE a.patient_id = ?
+    ORDER BY s.starts_at"""
+
+
+# Returns (appointment_id, appointment_type, schedule_date, schedule_time, status) rows
+@instrument.operation
+def patient_appointments(con, patient_id):
+    return con.execute(PATIENT_APPOINTMENTS_SQL, (patient_id,)).fetchall()
+
+
+# The same rows for appointments already moved to the archive; empty when there is no archive
+@instrument.operation
+def archived_appointments(con, patient_id):
+    return archive.patient_appointments(con, patient_id)
+
+
+# True if an archive exists and holds any appointment
+@instrument.operation
+def has_archived_appointments(con):
+    return archive.has_appointments(con)
+
+
+@instrument.operation
+def patient_appointment_count(con, patient_id):
+    return stats.count(con, "patient", patient_id)
+
+
+ACCOUNT_APPOINTMENTS_SQL = "SELECT * FROM appointments WHERE patient_id = ?"
+
+
+@instrument.operation
+def account_appointments(con, patient_id):
+    return con.execute(ACCOUNT_APPOINTMENTS_SQL, (patient_id,)).fetchall()
+
+
+OWN_APPOINTMENT_SQL = "SELECT schedule_id, status FROM appointments WHERE appointment_id = ? AND patient_id = ?"
+DELETE_OWN_APPOINTMENT_SQL = "DELETE FROM appointments WHERE appointment_id = ? AND patient_id = ?"
+RELEASE_SEAT_SQL = "UPDATE admin_schedules SET booked_count = booked_count - 1 WHERE schedule_id = ? AND booked_count > 0"
+
+
+# Cancels one of the patient's own appointments and gives its seat back; returns True if it existed
+@instrument.operation
+def cancel_appointment(con, patient_id, appointment_id):
+    # Read the status under the write lock, so an admin cancelling the same
+    # appointment in between can't make both of us give the seat back
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        appointment = con.execute(OWN_APPOINTMENT_SQL, (appointment_id, patient_id)).fetchone()
+        if not appointment:
+            con.rollback()
+            return False
+
+        con.execute(DELETE_OWN_APPOINTMENT_SQL, (appointment_id, patient_id))
+        # An admin cancellation (status CANCELLED) already gave the seat back
+        released = appointment[1] != "CANCELLED"
+        promoted = []
+        if released:
+            con.execute(RELEASE_SEAT_SQL, (appointment[0],))
+            # The next waiter takes the seat in the same transaction that released it
+            promoted = waitlist.fill_seats(con, appointment[0])
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+    if released and not promoted:
+        availability.seat_released(con, appointment[0])
+    return True
+
+
+#------------------Waitlist----------------------
+# Returns the new waitlist_id, or None if the schedule has a free seat, doesn't exist or the patient is already waiting
+@instrument.operation
+def join_waitlist(con, patient_id, schedule_id, appointment_type):
+    return waitlist.join(con, patient_id, schedule_id, appointment_type)
+
+
+# Returns True if the patient's waitlist entry existed and was removed
+@instrument.operation
+def leave_waitlist(con, patient_id, waitlist_id):
+    return waitlist.leave(con, patient_id, waitlist_id)
+
+
+# Returns (waitlist_id, schedule_id, schedule_date, schedule_time, appointment_type, position) rows
+@instrument.operation
+def patient_waitlist(con, patient_id):
+    return waitlist.patient_entries(con, patient_id)
+
+
+@instrument.operation
+def status_counts(con):
+    return stats.counts(con, "status")
+
+
+# appointment_date is stored as YYYY-MM-DD text
+@instrument.operation
+def date_appointment_count(con, appointment_date):
+    return stats.count(con, "date", appointment_date)
+
+
+@instrument.operation
+def schedule_appointment_count(con, schedule_id):
+    return stats.count(con, "schedule", schedule_id)
+
+
+MARK_COMPLETED_SQL = "UPDATE appointments SET status = 'COMPLETED' WHERE appointment_id = ? AND status IS NOT 'CANCELLED'"
+
+
+# Returns True if the appointment exists and was marked as completed. A cancelled
+# appointment already gave its seat back, so it stays cancelled.
+@instrument.operation
+def mark_completed(con, appointment_id):
+    updated = con.execute(MARK_COMPLETED_SQL, (appointment_id,)).rowcount
+    con.commit()
+    return updated == 1
+
+
+#------------------Bulk status updates----------------------
+# Status names the admin can type, mapped to what is stored
+STATUSES = {
+    "completed": "COMPLETED",
+    "no-show": "NO-SHOW",
+    "cancelled": "CANCELLED",
+}
+
+
+RELEASED_SEATS_SQL = "SELECT schedule_id, COUNT(*) FROM appointments WHERE {where} GROUP BY schedule_id"
+RELEASE_SEATS_SQL = "UPDATE admin_schedules SET booked_count = MAX(booked_count - ?, 0) WHERE schedule_id = ?"
+STATUS_UPDATE_SQL = "UPDATE appointments SET status = ? WHERE {where}"
+
+
+# Returns (where, params) selecting the appointments to move to the stored status,
+# by ID list, date range and/or schedule, leaving out those already CANCELLED or there
+def status_filter(stored, appointment_ids=None, date_from=None, date_to=None, schedule_id=None):
+    conditions, params = [], []
+    if appointment_ids is not None:
+        # One JSON parameter instead of one placeholder per ID, however long the list
+        conditions.append("appointment_id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps([int(appointment_id) for appointment_id in appointment_ids]))
+    if date_from:
+        conditions.append("appointment_date >= ?")
+        params.append(slots.parse_date(date_from).strftime(slots.DATE_FORMAT))
+    if date_to:
+        conditions.append("appointment_date <= ?")
+        params.append(slots.parse_date(date_to).strftime(slots.DATE_FORMAT))
+    if schedule_id is not None:
+        conditions.append("schedule_id = ?")
+        params.append(int(schedule_id))
+    if not conditions:
+        raise ValueError("choose appointments by ID, date range or schedule")
+    conditions.append("status IS NOT 'CANCELLED' AND status IS NOT ?")
+    params.append(stored)
+    return " AND ".join(conditions), params
+
+
+# Sets the status of every selected appointment in one UPDATE and one transaction; returns the rows changed.
+# Selectors combine with AND; dates are inclusive YYYY-MM-DD. Appointments already CANCELLED stay
+# that way. Cancelling gives the seats back to the open-slot list but promotes nobody from the
+# waitlist: a bulk cancel usually means the slot itself is off, so waiters stay queued.
+@instrument.operation
+def update_statuses(con, status, appointment_ids=None, date_from=None, date_to=None, schedule_id=None):
+    stored = STATUSES.get(status.strip().lower()) if isinstance(status, str) else None
+    if stored is None:
+        raise ValueError(f"status must be one of: {', '.join(STATUSES.values())}")
+    where, params = status_filter(stored, appointment_ids, date_from, date_to, schedule_id)
+
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        released = []
+        if stored == "CANCELLED":
+            released = con.execute(RELEASED_SEATS_SQL.format(where=where), params).fetchall()
+            con.executemany(RELEASE_SEATS_SQL, [(count, released_id) for released_id, count in released])
+        updated = con.execute(STATUS_UPDATE_SQL.format(where=where), [stored] + params).rowcount
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+    if released:
+        availability.invalidate(con)
+    return updated
+
+
+#------------------Front-desk search----------------------
+# Returns (patient_id, full_name, phone_number, address) rows matching names, address words or phone digits
+@instrument.operation
+def search_patients(con, text, limit=search.DEFAULT_LIMIT):
+    return search.patients(con, text, limit)
+
+
+# Returns (appointment_id, full_name, appointment_type, appointment_date, appointment_time, status) rows by type
+@instrument.operation
+def search_appointments(con, text, limit=search.DEFAULT_LIMIT):
+    return search.appointments(con, text, limit)
+
+
+#------------------Fetch one page of appointments (keyset pagination)----------------------
+PAGE_SIZE = 20
+
+# Filters the admin can push down into SQL, mapped to their columns
+LISTING_FILTERS = {
+    "date": "a.appointment_date",
+    "status": "a.status",
+    "type": "a.appointment_type",
+}
+
+
+# Returns (sql, params) fetching one page, plus one extra row, from source
+# (appointments, or the all_appointments view over the archive too)
+def appointment_page_query(filters, after_id=0, before_id=None, page_size=PAGE_SIZE, source="appointments"):
+    conditions = [f"{LISTING_FILTERS[name]} = ?" for name in filters]
+    params = list(filters.values())
+
+    # Seek past the last row we showed instead of using OFFSET, so every page costs the same
+    if before_id is not None:
+        conditions.append("a.appointment_id < ?")
+        params.append(before_id)
+        order = "DESC"
+    else:
+        conditions.append("a.appointment_id > ?")
+        params.append(after_id)
+        order = "ASC"
+
+    # Ask for one extra row to find out whether there is another page in this direction
+    sql = f"""
+    SELECT a.appointment_id, p.full_name, a.appointment_type, a.appointment_date, a.appointment_time, a.status
+    FROM {source} a
+    JOIN patients p ON a.patient_id = p.patient_id
+    WHERE {" AND ".join(conditions)}
+    ORDER BY a.appointment_id {order}
+    LIMIT ?"""
+    return sql, params + [page_size + 1]
+
+
+# Returns (appointments, has_prev, has_next)
+@instrument.operation
+def appointment_page(con, filters, after_id=0, before_id=None, page_size=PAGE_SIZE, archived=False):
+    # With archived=True, page through the archive too, via the UNION view
+    source = "all_appointments" if archived and archive.attach(con, create=False) else "appointments"
+    appointments = con.execute(*appointment_page_query(filters, after_id, before_id, page_size, source)).fetchall()
+
+    more = len(appointments) > page_size
+    appointments = appointments[:page_size]
+    if before_id is not None:
+        appointments.reverse()
+        return appointments, more, True
+    return appointments, after_id > 0, more
@@ -1,48 +1,42 @@
-import sqlite3 # For database operations
+import datetime # For today's appointment count
 from getpass import getpass # For secure password input
 
+import booking # Race-free booking engine
+import core # Booking logic shared with the HTTP service
+import instrument # Opt-in timing, switched on by CARE_METRICS
+import migrations # Versioned schema upgrades
+import recurring # Bulk recurring schedule generation
+import slots # Date and time parsing
+
 #------------------Database Connection----------------------
-# Connect to the SQLite database
-con = sqlite3.connect('HealthCARe.db')
-cur = con.cursor()
+# Opened on first use, so importing this module touches no files; configure()
+# picks a different database or connection settings before that.
+_settings = {"path": booking.DB_PATH}
+_con = None
+
+
+# Sets the database path and any booking.connect() option (wal, synchronous, cache_size, mmap_size, ...)
+def configure(path=booking.DB_PATH, **options):
+    global _con
+    if _con is not None:
+        _con.close()
+        _con = None
+    _settings.clear()
+    _settings.update(options, path=path)
+
+
+# Returns the connection, opening it (WAL mode, waits on other terminals' locks) on the first call
+def connection():
+    global _con
+    if _con is None:
+        _con = booking.connect(**_settings)
+    return _con
+
 
-#------------------Creates database tables if they don't exists----------------------
+#------------------Creates database tables and upgrades older databases----------------------
 def tables(): 
-    # Create the `patients` table to store patient information
-    cur.execute('''
-    CREATE TABLE IF NOT EXISTS patients (
-            patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            full_name TEXT,
-            age INTEGER,
-            date_of_birth DATE,
-            address TEXT,
-            phone_number TEXT UNIQUE,
-            password TEXT)
-    ''')
-
-    # Create the `appointments` table to store patient appointment details
-    cur.execute('''
-    CREATE TABLE IF NOT EXISTS appointments (
-            appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            patient_id INTEGER,
-            schedule_id INTEGER,
-            appointment_type TEXT,
-            appointment_date DATE,
-            appointment_time TEXT,
-            status TEXT DEFAULT 'Pending',
-            FOREIGN KEY (patient_id) REFERENCES patients(patient_id)
-            FOREIGN KEY (schedule_id) REFERENCES admin_schedules(schedule_id))
-    ''')
-
-    # Create the `admin_schedules` table to store admin-managed schedules
-    cur.execute('''
-    CREATE TABLE IF NOT EXISTS admin_schedules (
-            schedule_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            schedule_date DATE,
-            schedule_time TEXT,
-            capacity INTEGER)
-    ''')
-    con.commit()
+    # Create the tables on a new database, or apply any schema migrations an existing one is missing
+    migrations.migrate(connection())
 
 #--------------------------------------handles patient login---------------------------------------------------
 def patient_access():
@@ -69,8 +63,7 @@ def patient_access():
                 continue 
 
             # Validate login credentials
-            cur.execute("SELECT patient_id, full_name FROM patients WHERE phone_number = ? AND password = ?", (phone_number, password))
-            patient = cur.fetchone()
+            patient = core.login(connection(), phone_number, password)
             print("\n+++++ Login successfully! +++++")
 
             if patient:
@@ -121,17 +114,10 @@ def patient_signup():
         else:
             print("\n***** Passwords do not match! Please try again. *****\n")
     
-    # Check if the phone number already exists in the database
-    cur.execute("SELECT patient_id FROM patients WHERE phone_number = ?", (phone_number,))
-    existing_user = cur.fetchone()
-
-    if existing_user:
+    # Insert new patient into the database (fails if the phone number already exists)
+    if core.signup(connection(), full_name, age, date_of_birth, address, phone_number, password) is None:
         print("\n***** [ERROR] Phone number already exists. *****\n")
     else:
-        # Insert new patient into the database
-        cur.execute("INSERT INTO patients (full_name, age, date_of_birth, address, phone_number, password) VALUES (?, ?, ?, ?, ?, ?)",
-                    (full_name, age, date_of_birth, address, phone_number, password))
-        con.commit()
         print("\n+++++ Account created successfully! +++++")
         patient_access()
 
@@ -144,8 +130,9 @@ def patient_menu(patient_id, patient_name):
         print("=============================================================")
         print("[1] Schedule Appointment")
         print("[2] View Appointments")
-        print("[3] Delete Account")
-        print("[4] Logout")
+        print("[3] Join a Waitlist")
+        print("[4] Delete Account")
+        print("[5] Logout")
         print("-------------------------------------------------------------")
         
         choice = input("Enter your choice: ")
@@ -155,9 +142,11 @@ def patient_menu(patient_id, patient_name):
         elif choice == "2":
             view_appointments(patient_id)
         elif choice == "3":
+            join_waitlist(patient_id)
+        elif choice == "4":
             if delete_account(patient_id):
                 return
-        elif choice == "4":
+        elif choice == "5":
             print("\nLOGGING OUT...")
             break
         else:
@@ -166,8 +155,7 @@ def patient_menu(patient_id, patient_name):
 #------------------------------Allow patients to schedule an appointment-------------------------------------
 def schedule_appointment(patient_id):
     # Fetch only schedules with capacity > 0
-    cur.execute("SELECT * FROM admin_schedules WHERE capacity > 0")
-    schedules = cur.fetchall()
+    schedules = core.available_schedules(connection())
     
     if not schedules:
         print("\n             ***** NO AVAILABLE SCHEDULES. *****")
@@ -175,8 +163,8 @@ def schedule_appointment(patient_id):
 
     # Display available schedules
     print("\n==================== AVAILABLE SCHEDULES ====================")
-    for idx, (schedule_id, schedule_date, schedule_time, capacity) in enumerate(schedules):
-        print(f"[{idx + 1}] {schedule_date} at {schedule_time} (Remaining slots: {capacity})")
+    for idx, (schedule_id, schedule_date, schedule_time, remaining) in enumerate(schedules):
+        print(f"[{idx + 1}] {schedule_date} at {schedule_time} (Remaining slots: {remaining})")
 
     while True:
         choice = input("Choose a schedule: ")
@@ -194,55 +182,91 @@ def schedule_appointment(patient_id):
     schedule_id = schedule[0]  # Get the schedule_id
     appointment_type = input("Enter appointment type (e.g., vaccination, checkup, urgent care): ")
 
-    # Insert the appointment and reduce schedule capacity
-    cur.execute(
-        "INSERT INTO appointments (patient_id, schedule_id, appointment_type, appointment_date, appointment_time) VALUES (?, ?, ?, ?, ?)",
-    (patient_id, schedule_id, appointment_type, schedule[1], schedule[2])
-    )
-    cur.execute(
-        "UPDATE admin_schedules SET capacity = capacity - 1 WHERE schedule_id = ?",
-        (schedule[0],)
-    )
-    con.commit()
-
-    # Automatically remove schedules with no remaining capacity
-    cur.execute("DELETE FROM admin_schedules WHERE capacity <= 0")
-    con.commit()
+    # Claim a seat and insert the appointment in one transaction
+    if core.book_appointment(connection(), patient_id, schedule_id, appointment_type) is None:
+        print("\n***** Sorry, that schedule just filled up. *****\n")
+        if input("Do you want to join its waitlist? (yes/no): ").lower() == "yes":
+            if core.join_waitlist(connection(), patient_id, schedule_id, appointment_type) is None:
+                print("\n***** Could not join the waitlist. Please choose another schedule. *****\n")
+            else:
+                print("\n+++++ You're on the waitlist! You'll be booked when a seat frees up. +++++\n")
+        return
 
     print("\n+++++ Appointment scheduled successfully! +++++\n")
 
 
+#--------------------Let patients queue for a full schedule---------------------------------
+def join_waitlist(patient_id):
+    # Show where the patient already stands
+    entries = core.patient_waitlist(connection(), patient_id)
+    if entries:
+        print("\n======================= YOUR WAITLIST =======================")
+        for waitlist_id, schedule_id, schedule_date, schedule_time, appointment_type, position in entries:
+            print(f"{appointment_type} on {schedule_date} at {schedule_time} - position {position}")
+
+    schedules = core.full_schedules(connection())
+
+    if not schedules:
+        print("\n             ***** NO FULL SCHEDULES TO WAIT FOR. *****")
+        return
+
+    print("\n======================= FULL SCHEDULES ======================")
+    for idx, (schedule_id, schedule_date, schedule_time, waiting) in enumerate(schedules):
+        print(f"[{idx + 1}] {schedule_date} at {schedule_time} (Waiting: {waiting})")
+
+    choice = input("Choose a schedule to wait for (blank to go back): ").strip()
+    if not choice:
+        return
+    if not choice.isdigit() or not 1 <= int(choice) <= len(schedules):
+        print("\n***** Invalid choice! *****\n")
+        return
+
+    schedule_id = schedules[int(choice) - 1][0]
+    appointment_type = input("Enter appointment type (e.g., vaccination, checkup, urgent care): ")
+
+    if core.join_waitlist(connection(), patient_id, schedule_id, appointment_type) is None:
+        print("\n***** You're already waiting for that schedule, or a seat just opened. Try Schedule Appointment. *****\n")
+    else:
+        print("\n+++++ You're on the waitlist! You'll be booked when a seat frees up. +++++\n")
+
+
 #--------------------Allow patients to view and manage their appointments---------------------------------
 def view_appointments(patient_id):
     print("\n=============================================================")
     print("|                      YOUR APPOINTMENTS                    |")
     print("=============================================================")
 
-    # Fetch appointments for the patient
-    cur.execute("""
-    SELECT a.appointment_id, a.appointment_type, s.schedule_date, s.schedule_time, a.status 
-    FROM appointments a
-    JOIN admin_schedules s ON a.schedule_id = s.schedule_id
-    WHERE a.patient_id = ?
-    """, (patient_id,))
-    appointments = cur.fetchall()
+    # Fetch appointments for the patient, and any moved to the archive
+    appointments = core.patient_appointments(connection(), patient_id)
+    archived = core.archived_appointments(connection(), patient_id)
 
-    if not appointments:
+    if not appointments and not archived:
         print("             ***** NO APPOINTMENTS FOUND *****")
         return
 
-    # Count total number of appointments for the patient
-    cur.execute("SELECT COUNT(*) FROM appointments WHERE patient_id = ?", (patient_id,))
-    total_appointments = cur.fetchone()[0]
+    if appointments:
+        # Count total number of appointments for the patient
+        total_appointments = core.patient_appointment_count(connection(), patient_id)
 
-    # Display appointments
-    print("\n-------------------------------------------------------------")
-    for idx, (appointment_id, appointment_type, schedule_date, schedule_time, status) in enumerate(appointments):
-        print(f"[{idx + 1}] {appointment_type} on {schedule_date} at {schedule_time} - {status}")
-    print("-------------------------------------------------------------")
+        # Display appointments
+        print("\n-------------------------------------------------------------")
+        for idx, (appointment_id, appointment_type, schedule_date, schedule_time, status) in enumerate(appointments):
+            print(f"[{idx + 1}] {appointment_type} on {schedule_date} at {schedule_time} - {status}")
+        print("-------------------------------------------------------------")
 
-    # Display total count
-    print(f"\nTotal Appointments: {total_appointments}\n")
+        # Display total count
+        print(f"\nTotal Appointments: {total_appointments}\n")
+
+    # Appointments moved to the archive are shown, but can't be deleted from here
+    if archived:
+        print("----------------------- PAST (ARCHIVED) ---------------------")
+        for appointment_id, appointment_type, schedule_date, schedule_time, status in archived:
+            print(f"    {appointment_type} on {schedule_date} at {schedule_time} - {status}")
+        print("-------------------------------------------------------------\n")
+
+    # Only appointments still in the main table can be deleted
+    if not appointments:
+        return
 
     delete_app = input("Do you want to delete an appointment? (yes/no): ").lower()
 
@@ -254,8 +278,7 @@ def view_appointments(patient_id):
             
             if 1 <= appointment_idx <= len(appointments):
                 appointment_id = appointments[appointment_idx - 1][0]
-                cur.execute("DELETE FROM appointments WHERE appointment_id = ?", (appointment_id,))
-                con.commit()
+                core.cancel_appointment(connection(), patient_id, appointment_id)
                 print("\n+++++ Appointment deleted successfully! +++++\n")
             else:
                 print("\n***** Invalid appointment number. *****\n")
@@ -271,8 +294,7 @@ def view_appointments(patient_id):
 
 #-----------------------------Allow patients to delete their account------------------------------------
 def delete_account(patient_id):
-    cur.execute("SELECT * FROM patients WHERE patient_id = ?", (patient_id,))
-    patient = cur.fetchone() # Fetch the patient's record from the patients table
+    patient = core.get_patient(connection(), patient_id) # Fetch the patient's record from the patients table
     
     if not patient:
         print("\n***** Account not found. *****\n")
@@ -288,8 +310,7 @@ def delete_account(patient_id):
     print("======================================================")
 
     # Fetch and display the patient's appointments
-    cur.execute("SELECT * FROM appointments WHERE patient_id = ?", (patient_id,))
-    appointments = cur.fetchall()
+    appointments = core.account_appointments(connection(), patient_id)
     
     if appointments:
         print("\n=================== YOUR APPOINTMENTS ===================")
@@ -308,11 +329,8 @@ def delete_account(patient_id):
         password = getpass("Enter your password: ")
         confirm_password = getpass("Confirm your password: ")
 
-        if password == confirm_password and password == patient[6]:
-            # Delete the patient's account and their appointments
-            cur.execute("DELETE FROM patients WHERE patient_id = ?", (patient_id,))
-            cur.execute("DELETE FROM appointments WHERE patient_id = ?", (patient_id,))
-            con.commit()
+        # Delete the patient's account and their appointments
+        if password == confirm_password and core.delete_account(connection(), patient_id, password):
             print("\n+++++ Account deleted successfully! +++++\n")
             return True  
         
@@ -331,7 +349,7 @@ def admin_access():
     while True:
         admin_password = getpass("Enter admin password: ")
         
-        if admin_password == "admin123":  # Replace with secure handling
+        if core.check_admin_password(admin_password):
             break
         else:
             print("\n***** Invalid password! Please try again. *****\n")
@@ -342,7 +360,8 @@ def admin_access():
         print("=============================================================")
         print("[1] View All Patient Appointments")
         print("[2] Update Available Schedules")
-        print("[3] Logout")
+        print("[3] Search Patients and Appointments")
+        print("[4] Logout")
         print("-------------------------------------------------------------")
         
         choice = input("Enter your choice: ")
@@ -352,75 +371,167 @@ def admin_access():
         elif choice == "2":
             update_schedule()
         elif choice == "3":
+            search_records()
+        elif choice == "4":
             print("\nLOGGING OUT...")
             break
         else:
             print("\n***** Invalid choice! *****\n")
 
 
+#-----------------------Search patients and appointments-----------------------------------------------
+def search_records():
+    text = input("Search by name, address, phone digits or appointment type: ").strip()
+    if not text:
+        print("\n***** Please enter something to search for. *****\n")
+        return
+
+    patients = core.search_patients(connection(), text)
+    appointments = core.search_appointments(connection(), text)
+    if not patients and not appointments:
+        print("\n             ***** NO MATCHES FOUND *****")
+        return
+
+    if patients:
+        print("\n-------------------------- PATIENTS -------------------------")
+        for patient_id, full_name, phone_number, address in patients:
+            print(f"[{patient_id}] {full_name} - {phone_number} - {address}")
+    if appointments:
+        print("\n------------------------ APPOINTMENTS -----------------------")
+        for appointment_id, full_name, appointment_type, schedule_date, schedule_time, status in appointments:
+            print(f"[{appointment_id}] {full_name}: {appointment_type} on {schedule_date} at {schedule_time} - {status}")
+    print("-------------------------------------------------------------")
+
+
 #-----------------------View all patient appointments-----------------------------------------------
 def view_all_appointments():
     print("\n=============================================================")
     print("|                  ALL PATIENT APPOINTMENTS                 |")
     print("=============================================================")
 
-    # Fetch all appointments with patient details
-    cur.execute("""
-    SELECT a.appointment_id, p.full_name, a.appointment_type, a.appointment_date, a.appointment_time, a.status 
-    FROM appointments a 
-    JOIN patients p ON a.patient_id = p.patient_id
-    """)
-    appointments = cur.fetchall()
+    # Count appointments by status
+    status_counts = core.status_counts(connection())
 
-    if not appointments:
+    # The counts only cover the main table; archived appointments can still be listed
+    if not status_counts and not core.has_archived_appointments(connection()):
         print("             ***** NO APPOINTMENTS FOUND *****")
         return
 
-    # Count appointments by status
-    cur.execute("SELECT status, COUNT(*) FROM appointments GROUP BY status")
-    status_counts = cur.fetchall()
-
-    print("Appointments:")
-    for appointment in appointments:
-        print("---------------------------------------")
-        print(f"|   ID   | {appointment[0]}")
-        print(f"|  Name  | {appointment[1]}")
-        print(f"|  Type  | {appointment[2]}")
-        print(f"|  Date  | {appointment[3]}")
-        print(f"|  Time  | {appointment[4]}")
-        print(f"| Status | {appointment[5]}")
-        print("---------------------------------------")
-
     # Display totals
     print("\n-------------------- APPOINTMENT SUMMARY --------------------")
     for status, count in status_counts:
         print(f"Total {status}: {count}")
+    print(f"Scheduled for today: {core.date_appointment_count(connection(), datetime.date.today().isoformat())}")
     print("-------------------------------------------------------------")
 
-    choice = input("Do you want to mark an appointment as completed? (yes/no): ").lower()
+    # Optional filters; leave blank to list everything
+    filters = {}
+    date = input("Filter by date (YYYY-MM-DD, blank for all): ").strip()
+    status = input("Filter by status (e.g., Pending, COMPLETED, blank for all): ").strip()
+    appointment_type = input("Filter by appointment type (blank for all): ").strip()
+    archived = input("Include archived appointments? (yes/no): ").strip().lower() == "yes"
+    if date:
+        filters["date"] = date
+    if status:
+        filters["status"] = status
+    if appointment_type:
+        filters["type"] = appointment_type
+
+    appointments, has_prev, has_next = core.appointment_page(connection(), filters, archived=archived)
 
-    if choice == "yes":
-        app_id = input("Enter the appointment ID: ")
+    if not appointments:
+        print("\n             ***** NO APPOINTMENTS FOUND *****")
+        return
 
-        if app_id.isdigit():
-            app_id = int(app_id)
-            cur.execute("SELECT * FROM appointments WHERE appointment_id = ?", (app_id,))
-            appointment = cur.fetchone()
+    while True:
+        print("\nAppointments:")
+        for appointment in appointments:
+            print("---------------------------------------")
+            print(f"|   ID   | {appointment[0]}")
+            print(f"|  Name  | {appointment[1]}")
+            print(f"|  Type  | {appointment[2]}")
+            print(f"|  Date  | {appointment[3]}")
+            print(f"|  Time  | {appointment[4]}")
+            print(f"| Status | {appointment[5]}")
+            print("---------------------------------------")
+
+        print("\n-------------------------------------------------------------")
+        if has_next:
+            print("[N] Next Page")
+        if has_prev:
+            print("[P] Previous Page")
+        print("[C] Mark an Appointment as Completed")
+        print("[B] Bulk Status Update")
+        print("[R] Return to Admin Menu")
+        print("-------------------------------------------------------------")
 
-            if appointment:
-                # Update the appointment status to "Completed"
-                cur.execute("UPDATE appointments SET status = 'COMPLETED' WHERE appointment_id = ?", (app_id,))
-                con.commit()
-                print("\n+++++ Appointment status updated successfully! +++++\n")
-            else:
-                print("\n***** No appointment found with the given ID. *****\n")
+        choice = input("Enter your choice: ").strip().lower()
+
+        if choice == "n" and has_next:
+            appointments, has_prev, has_next = core.appointment_page(connection(), filters, after_id=appointments[-1][0], archived=archived)
+        elif choice == "p" and has_prev:
+            appointments, has_prev, has_next = core.appointment_page(connection(), filters, before_id=appointments[0][0], archived=archived)
+        elif choice == "c":
+            mark_appointment_completed()
+        elif choice == "b":
+            bulk_update_statuses()
+        elif choice == "r":
+            print("\nRETURNING TO ADMIN MENU...")
+            return
         else:
-            print("\n***** Invalid input! Please enter a valid appointment ID. *****\n")
+            print("\n***** Invalid choice! Please try again. *****\n")
 
-    elif choice == "no":
-        print("\nRETURNING TO ADMIN MENU...")
+
+#-----------------------Mark a single appointment as completed-----------------------------------------------
+def mark_appointment_completed():
+    app_id = input("Enter the appointment ID: ")
+
+    if app_id.isdigit():
+        app_id = int(app_id)
+        # Update the appointment status to "Completed"
+        if core.mark_completed(connection(), app_id):
+            print("\n+++++ Appointment status updated successfully! +++++\n")
+        else:
+            print("\n***** No open appointment found with the given ID (cancelled ones stay cancelled). *****\n")
     else:
-        print("\n***** Invalid choice! Returning to Admin Menu... *****\n")
+        print("\n***** Invalid input! Please enter a valid appointment ID. *****\n")
+
+
+#-----------------------Set the status of many appointments at once-----------------------------------------------
+def bulk_update_statuses():
+    status = input("New status (Completed, No-show, Cancelled): ").strip()
+    print("\nSelect appointments by:")
+    print("[1] Appointment IDs")
+    print("[2] Date Range")
+    print("[3] Schedule ID")
+    choice = input("Enter your choice: ").strip()
+
+    selection = {}
+    if choice == "1":
+        ids = [value.strip() for value in input("Enter appointment IDs, separated by commas: ").split(",") if value.strip()]
+        if not ids or not all(value.isdigit() for value in ids):
+            print("\n***** Invalid input! Please enter numbers separated by commas. *****\n")
+            return
+        selection["appointment_ids"] = [int(value) for value in ids]
+    elif choice == "2":
+        selection["date_from"] = input("From date (YYYY-MM-DD): ").strip()
+        selection["date_to"] = input("To date (YYYY-MM-DD): ").strip()
+    elif choice == "3":
+        schedule_id = input("Enter the schedule ID: ").strip()
+        if not schedule_id.isdigit():
+            print("\n***** Invalid input! Please enter a valid schedule ID. *****\n")
+            return
+        selection["schedule_id"] = int(schedule_id)
+    else:
+        print("\n***** Invalid choice! *****\n")
+        return
+
+    try:
+        updated = core.update_statuses(connection(), status, **selection)
+    except ValueError as exc:
+        print(f"\n***** {exc} *****\n")
+        return
+    print(f"\n+++++ {updated} appointment(s) updated. +++++\n")
 
 #---------------------------Update the schedule for appointments--------------------------------------
 def update_schedule():
@@ -429,20 +540,20 @@ def update_schedule():
     print("=============================================================")
     
     # Display all admin schedules
-    cur.execute("SELECT * FROM admin_schedules")
-    schedules = cur.fetchall()
+    schedules = core.all_schedules(connection())
 
     if schedules:
         print("\n===================== EXISTING SCHEDULES =====================")
-        for idx, (schedule_id, schedule_date, schedule_time, capacity) in enumerate(schedules):
-            print(f"[{idx + 1}] {schedule_date} at {schedule_time} (Remaining slots: {capacity})")
+        for idx, (schedule_id, schedule_date, schedule_time, capacity, booked_count) in enumerate(schedules):
+            print(f"[{idx + 1}] {schedule_date} at {schedule_time} (Remaining slots: {capacity - booked_count} of {capacity})")
     else:
         print("             ***** NO SCHEDULES AVAILABLE *****")
 
     print("\n---------------------- UPDATE SCHEDULE ----------------------")
     print("[1] Add a New Schedule")
     print("[2] Delete a Schedule")
-    print("[3] Return to Admin Menu")
+    print("[3] Add Recurring Schedules")
+    print("[4] Return to Admin Menu")
     print("-------------------------------------------------------------")
 
     choice = input("Enter your choice: ")
@@ -457,11 +568,24 @@ def update_schedule():
         except ValueError:
             print("\n***** Invalid input for capacity! Please enter a number. *****\n")
             return
+
+        if capacity <= 0:
+            print("\n***** Capacity must be at least 1! *****\n")
+            return
+
+        appointment_type = input("Reserve for appointment type (blank for any): ").strip()
         
         # Insert the new schedule into the database
-        cur.execute("INSERT INTO admin_schedules (schedule_date, schedule_time, capacity) VALUES (?, ?, ?)", (date, time, capacity))
-        con.commit()
-        print("\n+++++ New schedule added successfully! +++++\n")
+        try:
+            schedule_id = core.add_schedule(connection(), date, time, capacity, appointment_type=appointment_type)
+        except ValueError as error:
+            print(f"\n***** Invalid input! {error} *****\n")
+            return
+
+        if schedule_id is None:
+            print("\n***** A schedule already exists at that date and time! *****\n")
+        else:
+            print("\n+++++ New schedule added successfully! +++++\n")
 
     elif choice == "2":
         if not schedules:
@@ -474,8 +598,7 @@ def update_schedule():
             if 1 <= delete_choice <= len(schedules):
                 schedule_id = schedules[delete_choice - 1][0]
                 # Delete the selected schedule from the database
-                cur.execute("DELETE FROM admin_schedules WHERE schedule_id = ?", (schedule_id,))
-                con.commit()
+                core.delete_schedule(connection(), schedule_id)
                 print("\n+++++ Schedule deleted successfully! +++++\n")
             else:
                 print("\n***** Invalid schedule number. *****\n")
@@ -484,15 +607,36 @@ def update_schedule():
             print("\n***** Invalid input! Please enter a valid number. *****\n")
 
     elif choice == "3":
+        add_recurring_schedules()
+
+    elif choice == "4":
         print("\nRETURNING TO ADMIN MENU...")
         return
     
     else:
         print("\n***** Invalid choice! *****\n")
 
-    # Automatically remove schedules with zero remaining capacity
-    cur.execute("DELETE FROM admin_schedules WHERE capacity <= 0")
-    con.commit()
+
+#---------------------------Generate schedules from a recurring pattern--------------------------------------
+def add_recurring_schedules():
+    print("\n+++++++++++++++++ ADD RECURRING SCHEDULES ++++++++++++++++++")
+    try:
+        start_date = slots.parse_date(input("Enter start date (YYYY-MM-DD): "))
+        end_date = slots.parse_date(input("Enter end date (YYYY-MM-DD): "))
+        weekdays = recurring.parse_weekdays(input("Enter weekdays (e.g., Mon,Wed,Fri; blank for Mon-Fri): "))
+        start_time = slots.parse_time(input("Enter first slot time (e.g., 9:00 AM or 14:00): "))
+        end_time = slots.parse_time(input("Enter closing time (e.g., 5:00 PM or 17:00): "))
+        slot_minutes = int(input("Enter slot length in minutes: "))
+        capacity = int(input("Enter the maximum number of appointments per slot: "))
+        holidays = recurring.parse_holidays(input("Enter holidays to skip (YYYY-MM-DD, comma-separated, blank for none): "))
+
+        slot_times = recurring.expand_slots(start_date, end_date, weekdays, start_time, end_time, slot_minutes, holidays)
+        inserted, skipped = recurring.generate_schedules(connection(), slot_times, capacity, slot_minutes)
+    except ValueError as error:
+        print(f"\n***** Invalid input! {error} *****\n")
+        return
+
+    print(f"\n+++++ {inserted} schedules added, {skipped} already existed. +++++\n")
 
 
 #------------------------------------------------Main program loop-----------------------------------------
@@ -530,5 +674,12 @@ def healthCARe_main():
         else:
             print("\n*****Invalid choice! Please try again.*****\n")
 
-tables()
-healthCARe_main()
\ No newline at end of file
+def main():
+    # Instrumentation only if CARE_METRICS is set
+    instrument.enable_from_env()
+    tables()
+    healthCARe_main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import atexit # For a final metrics dump
+import functools # For operation wrappers
+import json # For the JSON dump and the slow-query log
+import os # For environment settings and atomic file replaces
+import sqlite3 # For EXPLAIN QUERY PLAN without the timing wrapper
+import threading # For the shared registry and the dump thread
+import time # For timing
+
+#------------------Opt-in instrumentation----------------------
+# Off unless enable() is called, for example by enable_from_env() when
+# CARE_METRICS is set. While it is off, each core call pays one global lookup
+# and each statement one attribute check.
+#
+# Once on, it records
+#   - a latency histogram per core operation (book_appointment, appointment_page, ...)
+#   - a latency histogram per SQL statement run through a booking.connect() connection
+#   - every statement slower than slow_ms, with its EXPLAIN QUERY PLAN, as one JSON
+#     line in the slow-query log (parameters are never logged; they hold passwords)
+# and writes the histograms every `interval` seconds to a Prometheus text file
+# (.prom or .txt) or a JSON file (anything else).
+#
+# Statement timings cover running the statement up to its first row; rows a
+# caller fetches afterwards count toward the operation, not the statement.
+#
+#   CARE_METRICS=metrics.prom   where to write the histograms
+#   CARE_SLOW_MS=100            slow-query threshold in milliseconds
+#   CARE_SLOW_LOG=slow.jsonl    slow-query log (default: next to the metrics file)
+#   CARE_METRICS_INTERVAL=15    seconds between dumps
+
+# Upper bounds in seconds, Prometheus style; the last bucket is +Inf
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+DEFAULT_SLOW_MS = 100
+DEFAULT_INTERVAL = 15
+
+registry = None   # the active Registry, or None while instrumentation is off
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    # Cumulative counts per upper bound, as Prometheus expects
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    def __init__(self, path, slow_ms, slow_log, interval):
+        self.path = path
+        self.slow_seconds = slow_ms / 1000
+        self.slow_log = slow_log
+        self.interval = interval
+        self.operations = {}
+        self.statements = {}
+        self.slow_count = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def observe_operation(self, name, seconds):
+        with self.lock:
+            self.operations.setdefault(name, Histogram()).observe(seconds)
+
+    # params is None for executemany, whose parameters are already used up
+    def observe_statement(self, con, sql, params, seconds):
+        key = " ".join(sql.split())
+        with self.lock:
+            self.statements.setdefault(key, Histogram()).observe(seconds)
+        if seconds >= self.slow_seconds:
+            self.log_slow(con, key, params, seconds)
+
+    def log_slow(self, con, sql, params, seconds):
+        try:
+            # Straight to sqlite3 so EXPLAIN doesn't time itself
+            plan = [row[-1] for row in sqlite3.Connection.execute(con, "EXPLAIN QUERY PLAN " + sql, params or ())]
+        except Exception as exc:
+            # Some statements (PRAGMA, BEGIN, ...) have no plan
+            plan = [f"no plan: {exc}"]
+        entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "ms": round(seconds * 1000, 3), "sql": sql, "plan": plan}
+        with self.lock:
+            self.slow_count += 1
+            if self.slow_log:
+                with open(self.slow_log, "a", encoding="utf-8") as stream:
+                    stream.write(json.dumps(entry) + "\n")
+
+    #------------------Snapshots and dumps----------------------
+    def snapshot(self):
+        def histograms(table):
+            return {name: {"count": histogram.count, "sum_seconds": histogram.sum,
+                           "buckets": {str(bound): total for bound, total in histogram.cumulative()}}
+                    for name, histogram in table.items()}
+        with self.lock:
+            return {"operations": histograms(self.operations), "statements": histograms(self.statements),
+                    "slow_statements": self.slow_count}
+
+    def prometheus(self):
+        lines = []
+        with self.lock:
+            for metric, label, table in (("care_operation_seconds", "operation", self.operations),
+                                         ("care_statement_seconds", "sql", self.statements)):
+                lines.append(f"# TYPE {metric} histogram")
+                for name, histogram in sorted(table.items()):
+                    value = _label(name)
+                    for bound, total in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{metric}_bucket{{{label}="{value}",le="{le}"}} {total}')
+                    lines.append(f'{metric}_sum{{{label}="{value}"}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{{label}="{value}"}} {histogram.count}')
+            lines.append("# TYPE care_slow_statements_total counter")
+            lines.append(f"care_slow_statements_total {self.slow_count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self):
+        if not self.path:
+            return
+        if self.path.endswith((".prom", ".txt")):
+            text = self.prometheus()
+        else:
+            text = json.dumps(self.snapshot(), indent=2)
+        # Write beside the target and rename, so a scraper never reads half a file
+        partial = self.path + ".tmp"
+        with open(partial, "w", encoding="utf-8") as stream:
+            stream.write(text)
+        os.replace(partial, self.path)
+
+    def run_dumps(self):
+        while not self.stopped.wait(self.interval):
+            self.dump()
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+#------------------Turning it on----------------------
+def enable(path=None, slow_ms=DEFAULT_SLOW_MS, slow_log=None, interval=DEFAULT_INTERVAL):
+    global registry
+    if registry is not None:
+        return registry
+    if slow_log is None and path:
+        slow_log = os.path.splitext(path)[0] + ".slow.jsonl"
+    registry = Registry(path, slow_ms, slow_log, interval)
+    if path:
+        threading.Thread(target=registry.run_dumps, name="care-metrics", daemon=True).start()
+        atexit.register(registry.dump)
+    return registry
+
+
+def enable_from_env():
+    path = os.environ.get("CARE_METRICS")
+    if not path:
+        return None
+    return enable(
+        path,
+        float(os.environ.get("CARE_SLOW_MS", DEFAULT_SLOW_MS)),
+        os.environ.get("CARE_SLOW_LOG"),
+        float(os.environ.get("CARE_METRICS_INTERVAL", DEFAULT_INTERVAL)),
+    )
+
+
+# Returns the current metrics as a dict, or None while instrumentation is off
+def snapshot():
+    return registry.snapshot() if registry is not None else None
+
+
+#------------------Hooks----------------------
+# Wraps a core function so each call lands in its operation histogram
+def operation(func):
+    name = func.__name__
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        active = registry
+        if active is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            active.observe_operation(name, time.perf_counter() - started)
+    return timed
+
+
+# Called by booking.CareConnection for every execute/executemany while instrumentation is on
+def time_statement(con, run, sql, params, many=False):
+    active = registry
+    started = time.perf_counter()
+    try:
+        return run(sql, params)
+    finally:
+        active.observe_statement(con, sql, None if many else params, time.perf_counter() - started)
@@ -0,0 +1,431 @@
+import sqlite3 # For database operations
+
+import slots # Parsing slot dates and times
+
+#------------------Versioned schema migrations----------------------
+# Each migration brings the database from version N-1 to version N, where N is
+# its position in MIGRATIONS. The applied version is stored in PRAGMA user_version,
+# so existing HealthCARe.db files are upgraded in place the next time they open.
+# Never edit a migration that has shipped; append a new one instead.
+
+
+#------------------Version 1: the original tables----------------------
+def _v1_base_tables(cur):
+    # Create the `patients` table to store patient information
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS patients (
+            patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            full_name TEXT,
+            age INTEGER,
+            date_of_birth DATE,
+            address TEXT,
+            phone_number TEXT UNIQUE,
+            password TEXT)
+    ''')
+
+    # Create the `appointments` table to store patient appointment details
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS appointments (
+            appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id INTEGER,
+            schedule_id INTEGER,
+            appointment_type TEXT,
+            appointment_date DATE,
+            appointment_time TEXT,
+            status TEXT DEFAULT 'Pending',
+            FOREIGN KEY (patient_id) REFERENCES patients(patient_id)
+            FOREIGN KEY (schedule_id) REFERENCES admin_schedules(schedule_id))
+    ''')
+
+    # Create the `admin_schedules` table to store admin-managed schedules
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS admin_schedules (
+            schedule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            schedule_date DATE,
+            schedule_time TEXT,
+            capacity INTEGER)
+    ''')
+
+
+#------------------Version 2: indexes for the hot queries----------------------
+def _v2_hot_query_indexes(cur):
+    # Covers view_appointments (type, schedule, status by patient) and the per-patient COUNT(*)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_appointments_patient ON appointments (patient_id, schedule_id, appointment_type, status)")
+    # Finds the appointments booked on a schedule
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_appointments_schedule ON appointments (schedule_id)")
+    # Lets GROUP BY status walk a small index instead of the whole table
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments (status)")
+    # Covers the open-slot listing (capacity > 0) and the zero-capacity cleanup
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_admin_schedules_capacity ON admin_schedules (capacity, schedule_date, schedule_time)")
+    # Looks up a slot by date and time
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_admin_schedules_slot ON admin_schedules (schedule_date, schedule_time)")
+
+
+#------------------Version 3: filters for the paginated admin listing----------------------
+def _v3_listing_filter_indexes(cur):
+    # Each index carries the rowid, so "filter = ? AND appointment_id > ?" is a single range seek
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments (appointment_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_appointments_type ON appointments (appointment_type)")
+
+
+#------------------Version 4: booked_count instead of deleting full schedules----------------------
+def _v4_booked_count(cur):
+    cur.execute("ALTER TABLE admin_schedules ADD COLUMN booked_count INTEGER NOT NULL DEFAULT 0")
+
+    # Bring back the schedule rows the old zero-capacity sweep deleted out from under
+    # their appointments, so patients can see those bookings again
+    cur.execute('''
+    INSERT INTO admin_schedules (schedule_id, schedule_date, schedule_time, capacity)
+    SELECT schedule_id, MIN(appointment_date), MIN(appointment_time), 0
+    FROM appointments
+    WHERE schedule_id IS NOT NULL AND schedule_id NOT IN (SELECT schedule_id FROM admin_schedules)
+    GROUP BY schedule_id
+    ''')
+
+    # capacity used to be the seats left; from now on it is the seats offered in total
+    cur.execute('''
+    UPDATE admin_schedules
+    SET booked_count = (SELECT COUNT(*) FROM appointments a WHERE a.schedule_id = admin_schedules.schedule_id)
+    ''')
+    cur.execute("UPDATE admin_schedules SET capacity = MAX(capacity, 0) + booked_count")
+
+    # "Available" is now a partial index over the open schedules rather than a capacity range
+    cur.execute("DROP INDEX IF EXISTS idx_admin_schedules_capacity")
+    cur.execute('''
+    CREATE INDEX IF NOT EXISTS idx_admin_schedules_open
+    ON admin_schedules (schedule_date, schedule_time, capacity, booked_count)
+    WHERE booked_count < capacity
+    ''')
+
+
+#------------------Version 5: one schedule per date and time----------------------
+def _v5_unique_slots(cur):
+    # Fold duplicate date/time rows into the lowest schedule_id, keeping their seats and bookings
+    duplicates = cur.execute('''
+    SELECT MIN(schedule_id), schedule_date, schedule_time, SUM(capacity), SUM(booked_count)
+    FROM admin_schedules
+    WHERE schedule_date IS NOT NULL AND schedule_time IS NOT NULL
+    GROUP BY schedule_date, schedule_time
+    HAVING COUNT(*) > 1
+    ''').fetchall()
+
+    for keep_id, schedule_date, schedule_time, capacity, booked_count in duplicates:
+        cur.execute('''
+        UPDATE appointments SET schedule_id = ?
+        WHERE schedule_id IN (SELECT schedule_id FROM admin_schedules
+                              WHERE schedule_date = ? AND schedule_time = ? AND schedule_id != ?)
+        ''', (keep_id, schedule_date, schedule_time, keep_id))
+        cur.execute("DELETE FROM admin_schedules WHERE schedule_date = ? AND schedule_time = ? AND schedule_id != ?",
+                    (schedule_date, schedule_time, keep_id))
+        cur.execute("UPDATE admin_schedules SET capacity = ?, booked_count = ? WHERE schedule_id = ?",
+                    (capacity, booked_count, keep_id))
+
+    # The slot index becomes the unique key the recurring generator relies on to skip duplicates
+    cur.execute("DROP INDEX IF EXISTS idx_admin_schedules_slot")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_admin_schedules_slot ON admin_schedules (schedule_date, schedule_time)")
+
+
+#------------------Version 6: integer start times and slot lengths----------------------
+def _v6_normalized_slots(cur):
+    cur.execute("ALTER TABLE admin_schedules ADD COLUMN starts_at INTEGER")
+    cur.execute(f"ALTER TABLE admin_schedules ADD COLUMN duration_minutes INTEGER NOT NULL DEFAULT {slots.DEFAULT_DURATION}")
+    # NULL means the slot is open to any appointment type
+    cur.execute("ALTER TABLE admin_schedules ADD COLUMN appointment_type TEXT")
+
+    # Parse every slot; "9:00 AM" and "09:00 am" are the same moment and land in one group
+    groups = {}
+    for schedule_id, schedule_date, schedule_time in cur.execute(
+            "SELECT schedule_id, schedule_date, schedule_time FROM admin_schedules ORDER BY schedule_id").fetchall():
+        slot = slots.try_normalize(schedule_date, schedule_time)
+        # Text that doesn't parse keeps a NULL starts_at and is left as it is
+        if slot is not None:
+            groups.setdefault(slot, []).append(schedule_id)
+
+    for (starts_at, schedule_date, schedule_time), (keep_id, *merged_ids) in groups.items():
+        # Fold other spellings of the same slot into the lowest schedule_id, as version 5 did
+        for merged_id in merged_ids:
+            cur.execute("UPDATE appointments SET schedule_id = ? WHERE schedule_id = ?", (keep_id, merged_id))
+            cur.execute('''
+            UPDATE admin_schedules
+            SET capacity = capacity + (SELECT capacity FROM admin_schedules WHERE schedule_id = ?),
+                booked_count = booked_count + (SELECT booked_count FROM admin_schedules WHERE schedule_id = ?)
+            WHERE schedule_id = ?
+            ''', (merged_id, merged_id, keep_id))
+            cur.execute("DELETE FROM admin_schedules WHERE schedule_id = ?", (merged_id,))
+        # Rewrite the text in the canonical format so the unique slot index agrees with starts_at
+        cur.execute("UPDATE admin_schedules SET starts_at = ?, schedule_date = ?, schedule_time = ? WHERE schedule_id = ?",
+                    (starts_at, schedule_date, schedule_time, keep_id))
+
+    # Appointments keep a display copy of their slot's date and time; bring it in line with the schedule
+    cur.execute('''
+    UPDATE appointments
+    SET appointment_date = (SELECT s.schedule_date FROM admin_schedules s WHERE s.schedule_id = appointments.schedule_id),
+        appointment_time = (SELECT s.schedule_time FROM admin_schedules s WHERE s.schedule_id = appointments.schedule_id)
+    WHERE schedule_id IN (SELECT schedule_id FROM admin_schedules WHERE starts_at IS NOT NULL)
+    ''')
+
+    # The open-slot index sorted by text, which put "10:00 AM" before "9:00 AM"; sort by starts_at instead
+    cur.execute("DROP INDEX IF EXISTS idx_admin_schedules_open")
+    cur.execute('''
+    CREATE INDEX IF NOT EXISTS idx_admin_schedules_open
+    ON admin_schedules (starts_at)
+    WHERE booked_count < capacity
+    ''')
+    # "Next open slots of type X after T" is a range seek on (appointment_type, starts_at)
+    cur.execute('''
+    CREATE INDEX IF NOT EXISTS idx_admin_schedules_type_open
+    ON admin_schedules (appointment_type, starts_at)
+    WHERE booked_count < capacity
+    ''')
+
+
+#------------------Version 7: waitlist for full schedules----------------------
+def _v7_waitlist(cur):
+    # waitlist_id only grows, so it doubles as the first-come-first-served order within a priority
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS waitlist (
+            waitlist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            schedule_id INTEGER NOT NULL,
+            patient_id INTEGER NOT NULL,
+            appointment_type TEXT,
+            priority INTEGER NOT NULL,
+            FOREIGN KEY (patient_id) REFERENCES patients(patient_id)
+            FOREIGN KEY (schedule_id) REFERENCES admin_schedules(schedule_id))
+    ''')
+    # The next waiter for a schedule is the first entry of this index, however long the queue
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_waitlist_next ON waitlist (schedule_id, priority, waitlist_id)")
+    # One place in each queue per patient; also finds a patient's entries
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_waitlist_patient ON waitlist (patient_id, schedule_id)")
+    # Lists the full schedules patients can queue for, in time order
+    cur.execute('''
+    CREATE INDEX IF NOT EXISTS idx_admin_schedules_full
+    ON admin_schedules (starts_at)
+    WHERE booked_count >= capacity
+    ''')
+
+
+#------------------Version 8: appointment counts kept up to date by triggers----------------------
+def _v8_appointment_stats(cur):
+    # One row per (dimension, bucket): ('status', 'Pending'), ('date', '2030-01-07'),
+    # ('schedule', 12) or ('patient', 7). bucket has no type so ids stay integers.
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS appointment_stats (
+            dimension TEXT NOT NULL,
+            bucket NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, bucket)) WITHOUT ROWID
+    ''')
+
+    # NULLs can't be part of the key, so they are counted under ''
+    buckets = {
+        "status": "COALESCE({row}.status, '')",
+        "date": "COALESCE({row}.appointment_date, '')",
+        "schedule": "COALESCE({row}.schedule_id, '')",
+        "patient": "COALESCE({row}.patient_id, '')",
+    }
+    columns = {"status": "status", "date": "appointment_date", "schedule": "schedule_id", "patient": "patient_id"}
+
+    def add(dimension, row):
+        return f'''
+        INSERT INTO appointment_stats (dimension, bucket, count) VALUES ('{dimension}', {buckets[dimension].format(row=row)}, 1)
+        ON CONFLICT (dimension, bucket) DO UPDATE SET count = count + 1;'''
+
+    def remove(dimension, row):
+        return f'''
+        UPDATE appointment_stats SET count = count - 1
+        WHERE dimension = '{dimension}' AND bucket = {buckets[dimension].format(row=row)};'''
+
+    cur.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS appointments_stats_insert AFTER INSERT ON appointments
+    BEGIN {"".join(add(dimension, "NEW") for dimension in buckets)}
+    END
+    ''')
+    cur.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS appointments_stats_delete AFTER DELETE ON appointments
+    BEGIN {"".join(remove(dimension, "OLD") for dimension in buckets)}
+    END
+    ''')
+    # One update trigger per column, so marking an appointment completed only touches the status counts
+    for dimension, column in columns.items():
+        cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS appointments_stats_update_{dimension} AFTER UPDATE OF {column} ON appointments
+        WHEN OLD.{column} IS NOT NEW.{column}
+        BEGIN {remove(dimension, "OLD")} {add(dimension, "NEW")}
+        END
+        ''')
+
+    # Count what is already there
+    for dimension in buckets:
+        bucket = buckets[dimension].format(row="appointments")
+        cur.execute(f'''
+        INSERT INTO appointment_stats (dimension, bucket, count)
+        SELECT '{dimension}', {bucket}, COUNT(*) FROM appointments GROUP BY {bucket}
+        ''')
+
+
+#------------------Version 9: when each appointment was booked----------------------
+def _v9_booked_at(cur):
+    # Same wall-clock seconds as admin_schedules.starts_at, so starts_at - booked_at
+    # is the lead time. Appointments booked before this version stay NULL.
+    cur.execute("ALTER TABLE appointments ADD COLUMN booked_at INTEGER")
+
+
+#------------------Version 10: full-text search for the front desk----------------------
+# External-content FTS5 tables: the text lives only in patients and appointments,
+# the indexes point back at them by rowid, and triggers keep them in step.
+SEARCH_INDEXES = {
+    # Names and addresses by word, with prefix indexes so "mar san" is a seek
+    "patients_fts": ("patients", "patient_id", ("full_name", "address", "phone_number"),
+                     "tokenize = 'unicode61', prefix = '2 3'"),
+    # Phone numbers by any fragment of three or more digits, e.g. the last four
+    "patients_phone_fts": ("patients", "patient_id", ("phone_number",), "tokenize = 'trigram'"),
+    "appointments_fts": ("appointments", "appointment_id", ("appointment_type",),
+                         "tokenize = 'unicode61', prefix = '2 3'"),
+}
+
+
+def _v10_search_index(cur):
+    for index, (table, key, columns, options) in SEARCH_INDEXES.items():
+        names = ", ".join(columns)
+        new = ", ".join(f"NEW.{column}" for column in columns)
+        old = ", ".join(f"OLD.{column}" for column in columns)
+        cur.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5({names}, content = '{table}', content_rowid = '{key}', {options})")
+        cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table}
+        BEGIN INSERT INTO {index} (rowid, {names}) VALUES (NEW.{key}, {new}); END
+        ''')
+        cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table}
+        BEGIN INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.{key}, {old}); END
+        ''')
+        # Only edits to indexed columns touch the index; status changes don't
+        cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {names} ON {table}
+        BEGIN
+            INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.{key}, {old});
+            INSERT INTO {index} (rowid, {names}) VALUES (NEW.{key}, {new});
+        END
+        ''')
+        # Index what is already there
+        cur.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+#------------------Version 11: appointment reminder outbox----------------------
+# Seconds before the start that a reminder becomes due
+REMINDER_LEAD = 24 * 3600
+
+
+def _v11_reminders(cur):
+    # One reminder per appointment. due_at is the next time a dispatcher may take it:
+    # first starts_at - REMINDER_LEAD, then the end of a claim's lease or a retry's backoff.
+    # status is PENDING until it is SENT, FAILED (out of attempts) or EXPIRED (the appointment started)
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS reminders (
+            reminder_id INTEGER PRIMARY KEY,
+            appointment_id INTEGER NOT NULL UNIQUE,
+            starts_at INTEGER NOT NULL,
+            due_at INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'PENDING',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            sent_at INTEGER)
+    ''')
+    # Due reminders are the first entries of this index; sent ones drop out of it
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders (due_at) WHERE status = 'PENDING'")
+    # Every delivery attempt; error is NULL when it went through
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS reminder_attempts (
+            reminder_id INTEGER NOT NULL,
+            attempted_at INTEGER NOT NULL,
+            error TEXT)
+    ''')
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reminder_attempts ON reminder_attempts (reminder_id, attempted_at)")
+
+    # Every booking path (menu, service, waitlist promotion, import) inserts a Pending appointment
+    cur.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS reminders_book AFTER INSERT ON appointments
+    WHEN NEW.status = 'Pending'
+    BEGIN
+        INSERT OR IGNORE INTO reminders (appointment_id, starts_at, due_at)
+        SELECT NEW.appointment_id, starts_at, starts_at - {REMINDER_LEAD} FROM admin_schedules
+        WHERE schedule_id = NEW.schedule_id AND starts_at IS NOT NULL;
+    END
+    ''')
+    # Cancelled, completed or no-show: nothing left to remind about
+    cur.execute('''
+    CREATE TRIGGER IF NOT EXISTS reminders_status AFTER UPDATE OF status ON appointments
+    WHEN NEW.status IS NOT 'Pending'
+    BEGIN DELETE FROM reminders WHERE appointment_id = NEW.appointment_id AND status = 'PENDING'; END
+    ''')
+    cur.execute('''
+    CREATE TRIGGER IF NOT EXISTS reminders_cancel AFTER DELETE ON appointments
+    BEGIN DELETE FROM reminders WHERE appointment_id = OLD.appointment_id; END
+    ''')
+    cur.execute('''
+    CREATE TRIGGER IF NOT EXISTS reminder_attempts_delete AFTER DELETE ON reminders
+    BEGIN DELETE FROM reminder_attempts WHERE reminder_id = OLD.reminder_id; END
+    ''')
+
+    # Queue reminders for the Pending appointments that haven't started yet
+    cur.execute('''
+    INSERT OR IGNORE INTO reminders (appointment_id, starts_at, due_at)
+    SELECT a.appointment_id, s.starts_at, s.starts_at - ?
+    FROM appointments a
+    JOIN admin_schedules s ON s.schedule_id = a.schedule_id
+    WHERE a.status = 'Pending' AND s.starts_at > ?
+    ''', (REMINDER_LEAD, slots.now_timestamp()))
+
+
+MIGRATIONS = [
+    _v1_base_tables,
+    _v2_hot_query_indexes,
+    _v3_listing_filter_indexes,
+    _v4_booked_count,
+    _v5_unique_slots,
+    _v6_normalized_slots,
+    _v7_waitlist,
+    _v8_appointment_stats,
+    _v9_booked_at,
+    _v10_search_index,
+    _v11_reminders,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def schema_version(con):
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+
+#------------------Apply every migration the database hasn't seen yet----------------------
+def migrate(con):
+    if schema_version(con) >= LATEST_VERSION:
+        return
+    if schema_version(con) == 0:
+        # Lets archive.py hand freed pages back with PRAGMA incremental_vacuum;
+        # only takes effect on a file that has no tables yet
+        con.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    # Take the write lock first so two processes starting together don't both migrate
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        cur = con.cursor()
+        version = schema_version(con)
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(cur)
+            # PRAGMA doesn't take bound parameters; number is always an int from enumerate
+            cur.execute(f"PRAGMA user_version = {number}")
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else 'HealthCARe.db'
+    con = sqlite3.connect(path)
+    before = schema_version(con)
+    migrate(con)
+    print(f"{path}: schema version {before} -> {schema_version(con)}")
+    con.close()
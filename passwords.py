@@ -0,0 +1,80 @@
+import hashlib # For PBKDF2
+import hmac # For constant-time comparisons
+import os # For salts and the CPU count
+import threading # For creating the pool once
+
+#------------------Password hashing----------------------
+# Passwords are stored as "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>".
+# Rows from before hashing still hold the plain password; verify_password
+# accepts those and reports that they need rehashing, so each one is upgraded
+# the first time its owner logs in.
+#
+# PBKDF2 is slow on purpose. hashlib releases the GIL while it runs, so the
+# hashing pool below runs several hashes at once on separate cores while
+# HASH_WORKERS caps how many a burst of logins can tie up.
+
+ALGORITHM = "pbkdf2_sha256"
+ITERATIONS = 600_000   # OWASP's recommendation for PBKDF2-HMAC-SHA256
+SALT_BYTES = 16
+HASH_WORKERS = os.cpu_count() or 2
+
+# Compared against when the phone number is unknown, so a miss takes as long as a wrong password
+_DUMMY_HASH = None
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _derive(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+
+def hash_password(password, iterations=ITERATIONS):
+    salt = os.urandom(SALT_BYTES)
+    return f"{ALGORITHM}${iterations}${salt.hex()}${_derive(password, salt, iterations).hex()}"
+
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith(ALGORITHM + "$")
+
+
+#------------------Check a password against what the database holds----------------------
+# Returns (matches, needs_rehash); needs_rehash is True for plain passwords and for
+# hashes made with fewer iterations than ITERATIONS
+def verify_password(password, stored, iterations=ITERATIONS):
+    global _DUMMY_HASH
+    if stored is None:
+        if _DUMMY_HASH is None:
+            _DUMMY_HASH = hash_password("", iterations)
+        verify_password(password, _DUMMY_HASH, iterations)
+        return False, False
+
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode("utf-8"), str(stored).encode("utf-8")), True
+
+    try:
+        _, rounds, salt, expected = stored.split("$")
+        rounds = int(rounds)
+        salt = bytes.fromhex(salt)
+        expected = bytes.fromhex(expected)
+    except ValueError:
+        return False, False
+    matches = hmac.compare_digest(_derive(password, salt, rounds), expected)
+    return matches, matches and rounds < iterations
+
+
+#------------------Bounded pool for hashing off the caller's thread----------------------
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Imported here: concurrent.futures (and the logging it pulls in) is
+            # the slowest part of importing CARe, and most imports never hash
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="care-hash")
+        return _executor
+
+
+# Runs func(*args) on the hashing pool; returns a concurrent.futures.Future
+def submit(func, *args):
+    return executor().submit(func, *args)
@@ -0,0 +1,82 @@
+import datetime # For walking the date range and slot times
+
+import availability # In-process cache of the open slots
+import slots # Integer start times
+
+#------------------Recurring schedule generator----------------------
+# Expands "every Mon-Fri from 8:00 AM to 5:00 PM in 15-minute slots between two
+# dates, except holidays" into admin_schedules rows and writes them with a single
+# executemany in one transaction. Slots that already exist are skipped by the
+# unique (schedule_date, schedule_time) index.
+
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+DEFAULT_WEEKDAYS = {0, 1, 2, 3, 4}  # Monday to Friday
+
+
+# "Mon, Wed, Fri" -> {0, 2, 4}; blank means Monday to Friday
+def parse_weekdays(text):
+    names = [name.strip().lower()[:3] for name in text.split(",") if name.strip()]
+    if not names:
+        return set(DEFAULT_WEEKDAYS)
+    unknown = [name for name in names if name not in WEEKDAYS]
+    if unknown:
+        raise ValueError("unknown weekday(s): " + ", ".join(unknown))
+    return {WEEKDAYS[name] for name in names}
+
+
+# "2030-12-25, 2030-12-26" -> {date(2030, 12, 25), date(2030, 12, 26)}
+def parse_holidays(text):
+    return {slots.parse_date(day) for day in text.split(",") if day.strip()}
+
+
+#------------------Yield (schedule_date, schedule_time, starts_at) for every slot in the pattern----------------------
+def expand_slots(start_date, end_date, weekdays, start_time, end_time, slot_minutes, holidays=()):
+    if slot_minutes <= 0:
+        raise ValueError("slot length must be at least 1 minute")
+    if end_date < start_date:
+        raise ValueError("end date is before start date")
+    if end_time <= start_time:
+        raise ValueError("end time must be after start time")
+
+    step = datetime.timedelta(minutes=slot_minutes)
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays and day not in holidays:
+            slot = datetime.datetime.combine(day, start_time)
+            closing = datetime.datetime.combine(day, end_time)
+            # Only whole slots that finish by the end time
+            while slot + step <= closing:
+                yield day.strftime(slots.DATE_FORMAT), slot.strftime(slots.TIME_FORMAT), slots.to_timestamp(slot)
+                slot += step
+        day += datetime.timedelta(days=1)
+
+
+#------------------Write the slots in one transaction----------------------
+# Returns (inserted, skipped); skipped slots already had a schedule
+def generate_schedules(con, slot_times, capacity, duration_minutes=slots.DEFAULT_DURATION):
+    if capacity <= 0:
+        raise ValueError("capacity must be at least 1")
+
+    total = 0
+
+    def rows():
+        nonlocal total
+        for schedule_date, schedule_time, starts_at in slot_times:
+            total += 1
+            yield schedule_date, schedule_time, starts_at, duration_minutes, capacity
+
+    before = con.total_changes
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        # executemany pulls rows straight from the generator, so memory stays flat however many slots there are
+        con.executemany(
+            "INSERT OR IGNORE INTO admin_schedules (schedule_date, schedule_time, starts_at, duration_minutes, capacity) VALUES (?, ?, ?, ?, ?)",
+            rows()
+        )
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+    availability.invalidate(con)
+    inserted = con.total_changes - before
+    return inserted, total - inserted
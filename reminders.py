@@ -0,0 +1,288 @@
+import argparse # For the dispatcher's options
+import collections # For reminder rows and totals
+import json # For the file outbox and ID lists
+import random # For backoff jitter
+import smtplib # For the SMTP sender
+import sqlite3 # For lock errors in the background loop
+import threading # For the background dispatcher
+from email.message import EmailMessage # For SMTP reminders
+
+import booking # WAL-mode connections
+import migrations # Versioned schema upgrades and REMINDER_LEAD
+import slots # Wall-clock timestamps
+
+#------------------Appointment reminders----------------------
+#   python reminders.py --outbox reminders.jsonl
+#   python reminders.py --smtp localhost:1025 --once
+#
+# Booking an appointment queues a reminder in the reminders outbox, due
+# REMINDER_LEAD before the appointment starts. A trigger from migration 11 does
+# it, so the menu, the service, waitlist promotions and imports are all covered.
+# Cancelling, completing or deleting the appointment takes the reminder out again.
+#
+# The dispatcher claims up to BATCH_SIZE due reminders in one short write
+# transaction, moving their due_at LEASE seconds ahead so no other dispatcher
+# takes them, and sends the batch outside any transaction. Then it records every
+# result in a second transaction. A failed reminder is retried after an exponential
+# backoff, up to MAX_ATTEMPTS times. If a dispatcher dies mid-batch, its reminders
+# are claimed again when the lease runs out, so delivery is at least once.
+#
+# A sender is any callable that takes a list of Reminder rows and returns one
+# error message, or None when delivered, per reminder. FileSender appends JSON
+# lines to a local file. SMTPSender mails a debugging SMTP server
+# (python -m aiosmtpd -n -l localhost:1025). A real SMS gateway plugs in the same way.
+
+BATCH_SIZE = 500
+LEASE = 300            # seconds a claimed batch is hidden from other dispatchers
+INTERVAL = 5.0         # seconds between polls while nothing is due
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 60      # seconds before the first retry
+BACKOFF_CAP = 3600     # never wait longer than this between attempts
+
+Reminder = collections.namedtuple("Reminder", ("reminder_id", "appointment_id", "attempts", "full_name", "phone_number",
+                                               "appointment_type", "appointment_date", "appointment_time"))
+
+# The outbox joins back to the appointment and patient for the message; left joins so
+# a reminder whose appointment disappeared is still found, and expired
+DUE_SQL = """
+SELECT r.reminder_id, r.appointment_id, r.attempts, r.starts_at, p.full_name, p.phone_number,
+       a.appointment_type, a.appointment_date, a.appointment_time
+FROM reminders r
+LEFT JOIN appointments a ON a.appointment_id = r.appointment_id
+LEFT JOIN patients p ON p.patient_id = a.patient_id
+WHERE r.status = 'PENDING' AND r.due_at <= ?
+ORDER BY r.due_at
+LIMIT ?
+"""
+EXPIRE_SQL = "UPDATE reminders SET status = 'EXPIRED' WHERE reminder_id = ?"
+# Hides the claimed batch from other dispatchers until the lease runs out
+CLAIM_SQL = "UPDATE reminders SET due_at = ?, attempts = attempts + 1 WHERE reminder_id IN (SELECT value FROM json_each(?))"
+# status = 'PENDING' skips reminders whose appointment was cancelled or completed while sending
+SENT_SQL = "UPDATE reminders SET status = 'SENT', sent_at = ?, last_error = NULL WHERE reminder_id = ? AND status = 'PENDING'"
+RETRY_SQL = "UPDATE reminders SET due_at = ?, last_error = ? WHERE reminder_id = ? AND status = 'PENDING'"
+FAILED_SQL = "UPDATE reminders SET status = 'FAILED', last_error = ? WHERE reminder_id = ? AND status = 'PENDING'"
+# Only for reminders that still exist; a deleted appointment took its reminder with it
+ATTEMPT_SQL = "INSERT INTO reminder_attempts (reminder_id, attempted_at, error) SELECT reminder_id, ?, ? FROM reminders WHERE reminder_id = ?"
+DUE_COUNT_SQL = "SELECT COUNT(*) FROM reminders WHERE status = 'PENDING' AND due_at <= ?"
+
+
+#------------------Claim a batch----------------------
+# Returns (reminders to send, how many expired); each reminder's attempts includes this one
+def claim(con, batch_size=BATCH_SIZE, lease=LEASE, now=None):
+    now = slots.now_timestamp() if now is None else now
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        rows = con.execute(DUE_SQL, (now, batch_size)).fetchall()
+        # Too late to remind about an appointment that has started or is gone
+        expired = [(row[0],) for row in rows if row[3] <= now or row[5] is None]
+        claimed = [Reminder(row[0], row[1], row[2] + 1, *row[4:]) for row in rows if row[3] > now and row[5] is not None]
+        con.executemany(EXPIRE_SQL, expired)
+        if claimed:
+            con.execute(CLAIM_SQL, (now + lease, json.dumps([reminder.reminder_id for reminder in claimed])))
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+    return claimed, len(expired)
+
+
+def backoff(attempts):
+    # Exponential, with jitter in the upper half so retries after an outage spread out
+    return int(min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0))
+
+
+#------------------Record the results----------------------
+# errors lines up with reminders: None for delivered, else the error message
+def record(con, reminders, errors, now=None):
+    now = slots.now_timestamp() if now is None else now
+    sent, retries, failed = [], [], []
+    for reminder, error in zip(reminders, errors):
+        if error is None:
+            sent.append((now, reminder.reminder_id))
+        elif reminder.attempts >= MAX_ATTEMPTS:
+            failed.append((error, reminder.reminder_id))
+        else:
+            retries.append((now + backoff(reminder.attempts), error, reminder.reminder_id))
+
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.executemany(SENT_SQL, sent)
+        con.executemany(RETRY_SQL, retries)
+        con.executemany(FAILED_SQL, failed)
+        con.executemany(ATTEMPT_SQL, ((now, error, reminder.reminder_id) for reminder, error in zip(reminders, errors)))
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+    return len(sent), len(retries), len(failed)
+
+
+#------------------Claim, send and record one batch----------------------
+# Returns {"sent", "retried", "failed", "expired"} counts; an empty batch means nothing is due
+def dispatch(con, sender, batch_size=BATCH_SIZE, lease=LEASE):
+    reminders, expired = claim(con, batch_size, lease)
+    sent = retried = failed = 0
+    if reminders:
+        try:
+            errors = sender(reminders)
+        except Exception as exc:
+            # The whole batch failed, e.g. the gateway is down; each reminder retries on its own schedule
+            errors = [f"{type(exc).__name__}: {exc}"] * len(reminders)
+        sent, retried, failed = record(con, reminders, errors)
+    return {"sent": sent, "retried": retried, "failed": failed, "expired": expired}
+
+
+# Returns how many reminders are due and not yet claimed
+def due_count(con, now=None):
+    return con.execute(DUE_COUNT_SQL, (slots.now_timestamp() if now is None else now,)).fetchone()[0]
+
+
+# Queues reminders for Pending appointments that haven't started and have none; returns how many.
+# For appointments loaded with the triggers off, as synthetic.py does.
+def refill(con, now=None):
+    added = con.execute("""
+    INSERT OR IGNORE INTO reminders (appointment_id, starts_at, due_at)
+    SELECT a.appointment_id, s.starts_at, s.starts_at - ?
+    FROM appointments a
+    JOIN admin_schedules s ON s.schedule_id = a.schedule_id
+    WHERE a.status = 'Pending' AND s.starts_at > ?
+    """, (migrations.REMINDER_LEAD, slots.now_timestamp() if now is None else now)).rowcount
+    con.commit()
+    return added
+
+
+#------------------Senders----------------------
+def message(reminder):
+    return (f"Hi {reminder.full_name}, this is a reminder of your {reminder.appointment_type or ''} appointment "
+            f"on {reminder.appointment_date} at {reminder.appointment_time}. - HealthCARe")
+
+
+# Appends one JSON line per reminder to a local file; stands in for a real gateway
+class FileSender:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, reminders):
+        lines = [json.dumps({"reminder_id": reminder.reminder_id, "to": reminder.phone_number, "text": message(reminder)}) + "\n"
+                 for reminder in reminders]
+        with self.lock, open(self.path, "a", encoding="utf-8") as stream:
+            stream.writelines(lines)
+        return [None] * len(reminders)
+
+
+# Mails each reminder to <phone number>@domain over one SMTP session per batch
+class SMTPSender:
+    def __init__(self, host="localhost", port=1025, sender="reminders@healthcare.localhost", domain="sms.localhost"):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.domain = domain
+
+    def __call__(self, reminders):
+        errors = []
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            for reminder in reminders:
+                mail = EmailMessage()
+                mail["From"] = self.sender
+                mail["To"] = f"{reminder.phone_number}@{self.domain}"
+                mail["Subject"] = "Appointment reminder"
+                mail.set_content(message(reminder))
+                try:
+                    smtp.send_message(mail)
+                    errors.append(None)
+                except smtplib.SMTPException as exc:
+                    errors.append(f"{type(exc).__name__}: {exc}")
+        return errors
+
+
+#------------------Background dispatcher----------------------
+class Dispatcher:
+    def __init__(self, path, sender, batch_size=BATCH_SIZE, interval=INTERVAL):
+        self.path = path
+        self.sender = sender
+        self.batch_size = batch_size
+        self.interval = interval
+        self.totals = collections.Counter()
+        self.last_error = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    # Dispatches until stop(); on its own connection, so call it from the thread that runs it
+    def run(self):
+        con = booking.connect(self.path)
+        try:
+            while not self.stopped.is_set():
+                try:
+                    counts = dispatch(con, self.sender, self.batch_size)
+                except sqlite3.OperationalError as exc:
+                    # Busy past the timeout; keep the loop alive and try again next poll
+                    self.last_error = str(exc)
+                    self.stopped.wait(self.interval)
+                    continue
+                self.totals.update(counts)
+                # A full batch means more are probably due already
+                if sum(counts.values()) < self.batch_size:
+                    self.stopped.wait(self.interval)
+        finally:
+            con.close()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="care-reminders", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send CARe appointment reminders")
+    parser.add_argument("--db", default=booking.DB_PATH)
+    parser.add_argument("--outbox", default="reminders.jsonl", help="file the stand-in sender appends reminders to")
+    parser.add_argument("--smtp", metavar="HOST:PORT", help="mail reminders to this SMTP server instead")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="seconds between polls while nothing is due")
+    parser.add_argument("--once", action="store_true", help="send everything due now, then exit")
+    parser.add_argument("--refill", action="store_true", help="queue reminders for upcoming appointments that have none")
+    args = parser.parse_args()
+
+    if args.smtp:
+        host, _, port = args.smtp.rpartition(":")
+        sender = SMTPSender(host or "localhost", int(port))
+    else:
+        sender = FileSender(args.outbox)
+
+    con = booking.connect(args.db)
+    migrations.migrate(con)
+    if args.refill:
+        print(f"+++++ Queued {refill(con)} reminders. +++++")
+
+    if args.once:
+        totals = collections.Counter()
+        while True:
+            counts = dispatch(con, sender, args.batch_size)
+            totals.update(counts)
+            if sum(counts.values()) < args.batch_size:
+                break
+        print(f"Sent {totals['sent']}, retrying {totals['retried']}, failed {totals['failed']}, expired {totals['expired']}")
+        print(f"Still due: {due_count(con)}")
+        con.close()
+        return
+    con.close()
+
+    print("+++++ Sending reminders; press Ctrl+C to stop. +++++")
+    dispatcher = Dispatcher(args.db, sender, args.batch_size, args.interval)
+    try:
+        dispatcher.run()
+    except KeyboardInterrupt:
+        pass
+    totals = dispatcher.totals
+    print(f"\nSent {totals['sent']}, retrying {totals['retried']}, failed {totals['failed']}, expired {totals['expired']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse # For the search and rebuild commands
+import re # For splitting search text into terms
+
+import booking # WAL-mode connections
+import migrations # Versioned schema upgrades and the search index definitions
+
+#------------------Front-desk search----------------------
+#   python search.py "maria san"
+#   python search.py 4567
+#   python search.py --rebuild
+#
+# Finds patients by any mix of name, address and phone words, and appointments
+# by type, through the FTS5 indexes from migration 10. Every term is a prefix,
+# so "mar san" finds Maria Santos. A term of three or more digits also matches
+# anywhere inside a phone number, so the last four digits are enough. Patients
+# are ranked by bm25 with the name weighted highest, or, when a phone fragment is
+# given, by how well their number matches it. Appointments come newest first.
+
+DEFAULT_LIMIT = 20
+
+# bm25 weights of full_name, address and phone_number
+PATIENT_WEIGHTS = (10.0, 2.0, 5.0)
+
+PATIENT_COLUMNS = ("patient_id", "full_name", "phone_number", "address")
+APPOINTMENT_COLUMNS = ("appointment_id", "full_name", "appointment_type", "appointment_date", "appointment_time", "status")
+
+PATIENTS_SQL = f"""
+    SELECT p.patient_id, p.full_name, p.phone_number, p.address
+    FROM patients_fts f
+    JOIN patients p ON p.patient_id = f.rowid
+    WHERE patients_fts MATCH ?
+    ORDER BY bm25(patients_fts, {", ".join(str(weight) for weight in PATIENT_WEIGHTS)})
+    LIMIT ?"""
+# {conditions} takes one WORD_CONDITION per word that isn't a phone fragment
+PHONE_SQL = """
+    SELECT p.patient_id, p.full_name, p.phone_number, p.address
+    FROM patients_phone_fts f
+    JOIN patients p ON p.patient_id = f.rowid
+    WHERE patients_phone_fts MATCH ?{conditions}
+    ORDER BY f.rank
+    LIMIT ?"""
+WORD_CONDITION = " AND (p.full_name || ' ' || p.address || ' ' || p.phone_number) LIKE ? ESCAPE '\\'"
+# FTS5 walks its index in rowid order, so newest-first with a LIMIT stops early
+APPOINTMENTS_SQL = """
+    SELECT a.appointment_id, p.full_name, a.appointment_type, a.appointment_date, a.appointment_time, a.status
+    FROM appointments_fts f
+    JOIN appointments a ON a.appointment_id = f.rowid
+    JOIN patients p ON p.patient_id = a.patient_id
+    WHERE appointments_fts MATCH ?
+    ORDER BY f.rowid DESC
+    LIMIT ?"""
+
+
+# Splits text into terms FTS5 can't misread as query syntax
+def terms(text):
+    return re.findall(r"\w+", text or "")
+
+
+def _prefix_query(words):
+    # Quoting keeps words like AND, OR and NEAR literal; * makes each a prefix
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _escape_like(word):
+    return word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+#------------------Patients----------------------
+# Returns up to limit (patient_id, full_name, phone_number, address) rows, best match first
+def patients(con, text, limit=DEFAULT_LIMIT):
+    words = terms(text)
+    fragments = [word for word in words if word.isdigit() and len(word) >= 3]
+    others = [word for word in words if word not in fragments]
+    if not words:
+        return []
+
+    if fragments:
+        # A phone fragment matches few patients, so start from those and check the
+        # other words on just those rows; joining two large FTS matches is much slower
+        return con.execute(PHONE_SQL.format(conditions=WORD_CONDITION * len(others)),
+                           [" ".join(f'"{fragment}"' for fragment in fragments)]
+                           + [f"%{_escape_like(word)}%" for word in others] + [limit]).fetchall()
+
+    return con.execute(PATIENTS_SQL, (_prefix_query(others), limit)).fetchall()
+
+
+#------------------Appointments----------------------
+# Returns up to limit (appointment_id, full_name, appointment_type, appointment_date, appointment_time, status)
+# rows whose type matches, newest first
+def appointments(con, text, limit=DEFAULT_LIMIT):
+    words = terms(text)
+    if not words:
+        return []
+    return con.execute(APPOINTMENTS_SQL, (_prefix_query(words), limit)).fetchall()
+
+
+#------------------Rebuild----------------------
+# Re-reads every patient and appointment into the search indexes, in one transaction
+def rebuild(con):
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        for index in migrations.SEARCH_INDEXES:
+            con.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search CARe patients and appointments")
+    parser.add_argument("text", nargs="?", help="name, address, phone fragment or appointment type")
+    parser.add_argument("--db", default=booking.DB_PATH)
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the search indexes from the tables")
+    args = parser.parse_args()
+    if not args.text and not args.rebuild:
+        parser.error("give search text or --rebuild")
+
+    con = booking.connect(args.db)
+    migrations.migrate(con)
+    if args.rebuild:
+        rebuild(con)
+        print("+++++ Search indexes rebuilt. +++++")
+    if args.text:
+        print("\n-------------------------- PATIENTS -------------------------")
+        for patient_id, full_name, phone_number, address in patients(con, args.text, args.limit):
+            print(f"[{patient_id}] {full_name} - {phone_number} - {address}")
+        print("\n------------------------ APPOINTMENTS -----------------------")
+        for appointment_id, full_name, appointment_type, date, time, status in appointments(con, args.text, args.limit):
+            print(f"[{appointment_id}] {full_name}: {appointment_type} on {date} at {time} - {status}")
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+import argparse # For command-line options
+import asyncio # For serving many clients from one process
+import datetime # For the default "after" of the next-slot search
+import json # For request and response bodies
+import re # For matching routes
+import secrets # For session tokens
+import sqlite3 # For database operations
+import threading # For per-thread connections
+from concurrent.futures import ThreadPoolExecutor # For running blocking SQLite calls off the event loop
+from http import HTTPStatus # For response status lines
+from urllib.parse import parse_qsl, urlsplit # For query strings
+
+import availability # Open-slot cache counters
+import booking # WAL-mode connections
+import core # Booking logic shared with the terminal menu
+import instrument # Opt-in latency histograms and slow-query log
+import migrations # Versioned schema upgrades
+import passwords # Password hashing on its own bounded pool
+import recurring # Bulk recurring schedule generation
+import reminders # Background reminder dispatcher
+import search # Search result columns
+import slots # Next-open-slot search
+import waitlist # Waitlist columns
+
+#------------------CARe HTTP/JSON service----------------------
+# Serves the core over HTTP so many patients and staff can use one process at once.
+# The event loop only parses requests; every SQLite call runs in a bounded thread
+# pool where each worker thread keeps its own connection. Password hashing runs
+# on a separate bounded pool, so a burst of logins can't starve the database threads.
+#
+#   POST   /signup                         {full_name, age, date_of_birth, address, phone_number, password}
+#   POST   /login                          {phone_number, password} -> {token, patient_id, full_name}
+#   POST   /logout
+#   GET    /schedules
+#   GET    /schedules/next                 ?after=YYYY-MM-DD[ HH:MM AM]&count=&type=
+#   GET    /schedules/full                 full schedules and how many are waiting for each
+#   GET    /appointments                   ?archived=1 also lists archived appointments
+#   POST   /appointments                   {schedule_id, appointment_type}
+#   DELETE /appointments/<id>
+#   GET    /waitlist
+#   POST   /waitlist                       {schedule_id, appointment_type}
+#   DELETE /waitlist/<id>
+#   DELETE /account                        {password}
+#   GET    /admin/appointments             ?date=&status=&type=&after_id=&before_id=&archived=1
+#   GET    /admin/summary
+#   GET    /admin/summary/<YYYY-MM-DD>     appointments on that day
+#   GET    /admin/search                   ?q=&limit= patients by name, address or phone digits,
+#                                           appointments by type
+#   GET    /admin/cache                    availability cache hit/miss counters
+#   GET    /admin/metrics                  latency histograms (needs --metrics or CARE_METRICS)
+#   POST   /admin/appointments/<id>/complete
+#   POST   /admin/appointments/status      {status, appointment_ids, date_from, date_to, schedule_id}
+#                                           -> {updated}
+#   GET    /admin/schedules
+#   POST   /admin/schedules                {schedule_date, schedule_time, capacity,
+#                                           duration_minutes, appointment_type}
+#   POST   /admin/schedules/recurring      {start_date, end_date, weekdays, start_time, end_time,
+#                                           slot_minutes, capacity, holidays}
+#   DELETE /admin/schedules/<id>
+#
+# Patient routes need "Authorization: Bearer <token>" from /login; admin routes
+# need the admin password in an "X-Admin-Password" header.
+#
+# With --reminders OUTBOX a background thread also sends due appointment
+# reminders (see reminders.py), appending them to that file.
+
+DEFAULT_WORKERS = 8
+MAX_BODY = 64 * 1024
+INT64 = range(-2**63, 2**63)  # what SQLite can store as an INTEGER
+
+
+#------------------Thread pool with one connection per worker thread----------------------
+class ConnectionPool:
+    def __init__(self, path, workers=DEFAULT_WORKERS):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="care-db")
+        self.local = threading.local()
+
+    def _connection(self):
+        con = getattr(self.local, "con", None)
+        if con is None:
+            # Opened on the worker's first call and reused for every call after that
+            con = booking.connect(self.path)
+            con.row_factory = sqlite3.Row
+            self.local.con = con
+        return con
+
+    def _call(self, func, args):
+        con = self._connection()
+        try:
+            return func(con, *args)
+        except BaseException:
+            # Never hand the next request a connection stuck in a transaction
+            if con.in_transaction:
+                con.rollback()
+            raise
+
+    # Runs func(connection, *args) on a worker thread without blocking the event loop
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._call, func, args)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# Runs a passwords function on the hashing pool without blocking the event loop
+async def _hashing(func, *args):
+    return await asyncio.wrap_future(passwords.submit(func, *args))
+
+
+def _rows(rows):
+    return [dict(row) for row in rows]
+
+
+def _require(body, *fields):
+    missing = [field for field in fields if field not in body]
+    if missing:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "missing field(s): " + ", ".join(missing))
+    return [body[field] for field in fields]
+
+
+# Raises 400 unless each named value is kind (str or int); None passes when optional.
+# bool is left out of int, since JSON true would otherwise count as 1, and so are
+# ints SQLite can't store, which would raise OverflowError inside sqlite3.
+def _check_types(kind, optional=False, **values):
+    wrong = [name for name, value in values.items()
+             if not (optional and value is None)
+             and (not isinstance(value, kind) or isinstance(value, bool) or (kind is int and value not in INT64))]
+    if wrong:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{', '.join(wrong)} must be {'text' if kind is str else 'a number'}")
+
+
+def _int_param(query, name, default):
+    try:
+        value = int(query.get(name, default))
+    except (TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a number")
+    if value not in INT64:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a number")
+    return value
+
+
+#------------------Request handlers----------------------
+class CareService:
+    def __init__(self, pool):
+        self.pool = pool
+        self.sessions = {}  # token -> patient_id, only touched from the event loop
+        # IDs in paths have at most 18 digits, so they always fit in SQLite's 64-bit INTEGER
+        self.routes = [
+            ("POST", r"/signup", self.signup),
+            ("POST", r"/login", self.login),
+            ("POST", r"/logout", self.logout),
+            ("GET", r"/schedules", self.schedules),
+            ("GET", r"/schedules/next", self.next_schedules),
+            ("GET", r"/appointments", self.appointments),
+            ("POST", r"/appointments", self.book),
+            ("DELETE", r"/appointments/(\d{1,18})", self.cancel),
+            ("GET", r"/schedules/full", self.full_schedules),
+            ("GET", r"/waitlist", self.waitlist),
+            ("POST", r"/waitlist", self.join_waitlist),
+            ("DELETE", r"/waitlist/(\d{1,18})", self.leave_waitlist),
+            ("DELETE", r"/account", self.delete_account),
+            ("GET", r"/admin/appointments", self.admin_appointments),
+            ("GET", r"/admin/summary", self.admin_summary),
+            ("GET", r"/admin/summary/(\d{4}-\d{2}-\d{2})", self.admin_day_summary),
+            ("GET", r"/admin/search", self.admin_search),
+            ("GET", r"/admin/cache", self.admin_cache),
+            ("GET", r"/admin/metrics", self.admin_metrics),
+            ("POST", r"/admin/appointments/(\d{1,18})/complete", self.admin_complete),
+            ("POST", r"/admin/appointments/status", self.admin_update_statuses),
+            ("GET", r"/admin/schedules", self.admin_schedules),
+            ("POST", r"/admin/schedules", self.admin_add_schedule),
+            ("POST", r"/admin/schedules/recurring", self.admin_recurring_schedules),
+            ("DELETE", r"/admin/schedules/(\d{1,18})", self.admin_delete_schedule),
+        ]
+
+    def _patient(self, headers):
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        patient_id = self.sessions.get(token) if scheme.lower() == "bearer" else None
+        if patient_id is None:
+            raise HTTPError(HTTPStatus.UNAUTHORIZED, "log in first")
+        return patient_id
+
+    def _admin(self, headers):
+        if not core.check_admin_password(headers.get("x-admin-password", "")):
+            raise HTTPError(HTTPStatus.UNAUTHORIZED, "invalid admin password")
+
+    async def signup(self, args, query, headers, body):
+        fields = _require(body, "full_name", "age", "date_of_birth", "address", "phone_number", "password")
+        if not isinstance(fields[1], int) or isinstance(fields[1], bool) or fields[1] <= 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "age must be a positive integer")
+        _check_types(str, full_name=fields[0], date_of_birth=fields[2], address=fields[3], phone_number=fields[4],
+                     password=fields[5])
+        password_hash = await _hashing(passwords.hash_password, fields[5])
+        patient_id = await self.pool.run(core.add_patient, *fields[:5], password_hash)
+        if patient_id is None:
+            raise HTTPError(HTTPStatus.CONFLICT, "phone number already exists")
+        return HTTPStatus.CREATED, {"patient_id": patient_id}
+
+    async def login(self, args, query, headers, body):
+        phone_number, password = _require(body, "phone_number", "password")
+        _check_types(str, phone_number=phone_number, password=password)
+        patient = await self.pool.run(core.credentials, phone_number)
+        stored = patient["password"] if patient else None
+        matches, needs_rehash = await _hashing(passwords.verify_password, password, stored)
+        if not matches:
+            raise HTTPError(HTTPStatus.UNAUTHORIZED, "invalid phone number or password")
+        if needs_rehash:
+            new_hash = await _hashing(passwords.hash_password, password)
+            await self.pool.run(core.upgrade_password, patient["patient_id"], stored, new_hash)
+        token = secrets.token_urlsafe(24)
+        self.sessions[token] = patient["patient_id"]
+        return HTTPStatus.OK, {"token": token, "patient_id": patient["patient_id"], "full_name": patient["full_name"]}
+
+    async def logout(self, args, query, headers, body):
+        self._patient(headers)
+        self.sessions.pop(headers["authorization"].partition(" ")[2], None)
+        return HTTPStatus.OK, {}
+
+    async def schedules(self, args, query, headers, body):
+        schedules = await self.pool.run(core.available_schedules)
+        return HTTPStatus.OK, [dict(zip(availability.COLUMNS, schedule)) for schedule in schedules]
+
+    async def next_schedules(self, args, query, headers, body):
+        try:
+            after = slots.parse_moment(query["after"]) if query.get("after") else datetime.datetime.now()
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc))
+        count = min(max(_int_param(query, "count", 5), 1), 100)
+        schedules = await self.pool.run(core.next_open_slots, after, count, query.get("type"))
+        return HTTPStatus.OK, [dict(zip(slots.NEXT_OPEN_COLUMNS, schedule)) for schedule in schedules]
+
+    async def appointments(self, args, query, headers, body):
+        patient_id = self._patient(headers)
+        appointments = await self.pool.run(core.patient_appointments, patient_id)
+        total = await self.pool.run(core.patient_appointment_count, patient_id)
+        result = {"appointments": _rows(appointments), "total": total}
+        # ?archived=1 also returns appointments moved to the archive
+        if query.get("archived") == "1":
+            result["archived"] = _rows(await self.pool.run(core.archived_appointments, patient_id))
+        return HTTPStatus.OK, result
+
+    async def book(self, args, query, headers, body):
+        patient_id = self._patient(headers)
+        schedule_id, appointment_type = _require(body, "schedule_id", "appointment_type")
+        _check_types(int, schedule_id=schedule_id)
+        _check_types(str, appointment_type=appointment_type)
+        appointment_id = await self.pool.run(core.book_appointment, patient_id, schedule_id, appointment_type)
+        if appointment_id is None:
+            raise HTTPError(HTTPStatus.CONFLICT, "schedule is full")
+        return HTTPStatus.CREATED, {"appointment_id": appointment_id}
+
+    async def cancel(self, args, query, headers, body):
+        patient_id = self._patient(headers)
+        if not await self.pool.run(core.cancel_appointment, patient_id, int(args[0])):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "no such appointment")
+        return HTTPStatus.OK, {}
+
+    async def full_schedules(self, args, query, headers, body):
+        return HTTPStatus.OK, _rows(await self.pool.run(core.full_schedules))
+
+    async def waitlist(self, args, query, headers, body):
+        patient_id = self._patient(headers)
+        entries = await self.pool.run(core.patient_waitlist, patient_id)
+        return HTTPStatus.OK, [dict(zip(waitlist.COLUMNS, entry)) for entry in entries]
+
+    async def join_waitlist(self, args, query, headers, body):
+        patient_id = self._patient(headers)
+        schedule_id, appointment_type = _require(body, "schedule_id", "appointment_type")
+        _check_types(int, schedule_id=schedule_id)
+        _check_types(str, appointment_type=appointment_type)
+        waitlist_id = await self.pool.run(core.join_waitlist, patient_id, schedule_id, appointment_type)
+        if waitlist_id is None:
+            raise HTTPError(HTTPStatus.CONFLICT, "schedule has free seats, doesn't exist, or you are already waiting for it")
+        return HTTPStatus.CREATED, {"waitlist_id": waitlist_id}
+
+    async def leave_waitlist(self, args, query, headers, body):
+        patient_id = self._patient(headers)
+        if not await self.pool.run(core.leave_waitlist, patient_id, int(args[0])):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "no such waitlist entry")
+        return HTTPStatus.OK, {}
+
+    async def delete_account(self, args, query, headers, body):
+        patient_id = self._patient(headers)
+        password, = _require(body, "password")
+        _check_types(str, password=password)
+        stored = await self.pool.run(core.stored_password, patient_id)
+        matches, _ = await _hashing(passwords.verify_password, password, stored)
+        if not matches:
+            raise HTTPError(HTTPStatus.FORBIDDEN, "incorrect password")
+        await self.pool.run(core.remove_patient, patient_id)
+        # Drop every session of the deleted patient
+        for token in [token for token, owner in self.sessions.items() if owner == patient_id]:
+            del self.sessions[token]
+        return HTTPStatus.OK, {}
+
+    async def admin_appointments(self, args, query, headers, body):
+        self._admin(headers)
+        filters = {name: query[name] for name in core.LISTING_FILTERS if query.get(name)}
+        before_id = _int_param(query, "before_id", None) if "before_id" in query else None
+        after_id = _int_param(query, "after_id", 0)
+        page_size = min(max(_int_param(query, "page_size", core.PAGE_SIZE), 1), 500)
+        archived = query.get("archived") == "1"
+        appointments, has_prev, has_next = await self.pool.run(core.appointment_page, filters, after_id, before_id, page_size, archived)
+        return HTTPStatus.OK, {"appointments": _rows(appointments), "has_prev": has_prev, "has_next": has_next}
+
+    async def admin_summary(self, args, query, headers, body):
+        self._admin(headers)
+        return HTTPStatus.OK, {status: count for status, count in await self.pool.run(core.status_counts)}
+
+    async def admin_day_summary(self, args, query, headers, body):
+        self._admin(headers)
+        return HTTPStatus.OK, {"date": args[0], "appointments": await self.pool.run(core.date_appointment_count, args[0])}
+
+    async def admin_search(self, args, query, headers, body):
+        self._admin(headers)
+        text = query.get("q", "")
+        limit = min(max(_int_param(query, "limit", search.DEFAULT_LIMIT), 1), 100)
+        patients = await self.pool.run(core.search_patients, text, limit)
+        appointments = await self.pool.run(core.search_appointments, text, limit)
+        return HTTPStatus.OK, {"patients": [dict(zip(search.PATIENT_COLUMNS, row)) for row in patients],
+                               "appointments": [dict(zip(search.APPOINTMENT_COLUMNS, row)) for row in appointments]}
+
+    async def admin_cache(self, args, query, headers, body):
+        self._admin(headers)
+        return HTTPStatus.OK, availability.stats()
+
+    async def admin_metrics(self, args, query, headers, body):
+        self._admin(headers)
+        metrics = instrument.snapshot()
+        if metrics is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "instrumentation is off; start with --metrics")
+        return HTTPStatus.OK, metrics
+
+    async def admin_complete(self, args, query, headers, body):
+        self._admin(headers)
+        if not await self.pool.run(core.mark_completed, int(args[0])):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "no such appointment, or it was cancelled")
+        return HTTPStatus.OK, {}
+
+    # Body: {"status": ..., and any of "appointment_ids": [...], "date_from", "date_to", "schedule_id"}
+    async def admin_update_statuses(self, args, query, headers, body):
+        self._admin(headers)
+        status, = _require(body, "status")
+        _check_types(str, status=status)
+        appointment_ids = body.get("appointment_ids")
+        if appointment_ids is not None and not (isinstance(appointment_ids, list)
+                                                and all(isinstance(value, int) and not isinstance(value, bool) and value in INT64
+                                                        for value in appointment_ids)):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "appointment_ids must be a list of numbers")
+        _check_types(str, optional=True, date_from=body.get("date_from"), date_to=body.get("date_to"))
+        _check_types(int, optional=True, schedule_id=body.get("schedule_id"))
+        try:
+            updated = await self.pool.run(core.update_statuses, status, appointment_ids, body.get("date_from"),
+                                          body.get("date_to"), body.get("schedule_id"))
+        except (TypeError, ValueError) as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc))
+        return HTTPStatus.OK, {"updated": updated}
+
+    async def admin_schedules(self, args, query, headers, body):
+        self._admin(headers)
+        return HTTPStatus.OK, _rows(await self.pool.run(core.all_schedules))
+
+    async def admin_add_schedule(self, args, query, headers, body):
+        self._admin(headers)
+        schedule_date, schedule_time, capacity = _require(body, "schedule_date", "schedule_time", "capacity")
+        if not isinstance(schedule_date, str) or not isinstance(schedule_time, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "schedule_date and schedule_time must be text")
+        if not isinstance(capacity, int) or isinstance(capacity, bool) or capacity <= 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "capacity must be a positive number")
+        duration_minutes = body.get("duration_minutes", slots.DEFAULT_DURATION)
+        _check_types(int, duration_minutes=duration_minutes)
+        _check_types(str, optional=True, appointment_type=body.get("appointment_type"))
+        try:
+            schedule_id = await self.pool.run(core.add_schedule, schedule_date, schedule_time, capacity,
+                                              duration_minutes, body.get("appointment_type"))
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc))
+        if schedule_id is None:
+            raise HTTPError(HTTPStatus.CONFLICT, "a schedule already exists at that date and time")
+        return HTTPStatus.CREATED, {"schedule_id": schedule_id}
+
+    async def admin_recurring_schedules(self, args, query, headers, body):
+        self._admin(headers)
+        fields = _require(body, "start_date", "end_date", "start_time", "end_time", "slot_minutes", "capacity")
+        _check_types(str, start_date=fields[0], end_date=fields[1], start_time=fields[2], end_time=fields[3],
+                     weekdays=body.get("weekdays", ""), holidays=body.get("holidays", ""))
+        _check_types(int, slot_minutes=fields[4], capacity=fields[5])
+        try:
+            slot_times = recurring.expand_slots(
+                slots.parse_date(fields[0]),
+                slots.parse_date(fields[1]),
+                recurring.parse_weekdays(body.get("weekdays", "")),
+                slots.parse_time(fields[2]),
+                slots.parse_time(fields[3]),
+                int(fields[4]),
+                recurring.parse_holidays(body.get("holidays", "")),
+            )
+            inserted, skipped = await self.pool.run(recurring.generate_schedules, slot_times, int(fields[5]), int(fields[4]))
+        except (TypeError, ValueError) as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc))
+        return HTTPStatus.CREATED, {"inserted": inserted, "skipped": skipped}
+
+    async def admin_delete_schedule(self, args, query, headers, body):
+        self._admin(headers)
+        if not await self.pool.run(core.delete_schedule, int(args[0])):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "no such schedule")
+        return HTTPStatus.OK, {}
+
+    #------------------Route one request to its handler----------------------
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, url.path)
+            if not match:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            try:
+                payload = json.loads(body) if body else {}
+                if not isinstance(payload, dict):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "request body must be a JSON object")
+                return await handler(match.groups(), dict(parse_qsl(url.query)), headers, payload)
+            except json.JSONDecodeError:
+                return HTTPStatus.BAD_REQUEST, {"error": "request body is not valid JSON"}
+            except HTTPError as exc:
+                return exc.status, {"error": exc.message}
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "method not allowed"}
+        return HTTPStatus.NOT_FOUND, {"error": "not found"}
+
+    #------------------Minimal HTTP/1.1 connection handling with keep-alive----------------------
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = await self.dispatch(method.upper(), target, headers, body)
+                    except Exception as exc:
+                        status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": type(exc).__name__}
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, path, workers):
+    pool = ConnectionPool(path, workers)
+    service = CareService(pool)
+    server = await asyncio.start_server(service.serve_client, host, port)
+    print(f"CARe service listening on http://{host}:{port} ({workers} database threads)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CARe HTTP/JSON service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default=booking.DB_PATH)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="database threads")
+    parser.add_argument("--metrics", help="turn on instrumentation and write histograms here (.prom or .json)")
+    parser.add_argument("--slow-ms", type=float, default=instrument.DEFAULT_SLOW_MS, help="slow-query log threshold")
+    parser.add_argument("--reminders", metavar="OUTBOX", help="also send appointment reminders, appending them to this file")
+    args = parser.parse_args()
+
+    if args.metrics:
+        instrument.enable(args.metrics, args.slow_ms)
+    else:
+        instrument.enable_from_env()
+
+    # Bring the database up to date once, before any worker connects
+    con = booking.connect(args.db)
+    migrations.migrate(con)
+    con.close()
+
+    # Run python reminders.py on its own instead to send through SMTP or from another host
+    dispatcher = reminders.Dispatcher(args.db, reminders.FileSender(args.reminders)).start() if args.reminders else None
+    try:
+        asyncio.run(serve(args.host, args.port, args.db, args.workers))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if dispatcher is not None:
+            dispatcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import argparse # For the command-line tool
+import collections # For merging counts
+import heapq # For merging time-ordered results
+import os # For site paths relative to the directory
+import sqlite3 # For directory conflicts
+import threading # For per-thread connections
+from concurrent.futures import ThreadPoolExecutor # For querying shards in parallel
+
+import booking # WAL-mode connections
+import core # The operations being routed
+import migrations # Versioned schema upgrades
+import passwords # Hashing before any database is touched
+
+#------------------Multi-clinic routing----------------------
+#   python sites.py add north clinics/north.db
+#   python sites.py find 09171234567
+#   python sites.py summary --date 2030-01-07
+#
+# Each clinic (site) keeps its patients, schedules and appointments in its own
+# CARe database, so bookings at one site never wait on another site's write lock.
+# A small directory database maps site names to their files and each phone
+# number to the site and patient_id it is registered under, so a patient can
+# log in without saying where they are registered. Only sign-ups and account
+# deletions write to the directory.
+#
+# Router.run(site, func, ...) calls any core function on the site's database.
+# fan_out runs one on every site in parallel, and the admin reports below merge
+# the results. The terminal menu and the HTTP service serve one database each;
+# run one per site with --db pointing at the site's file.
+
+DIRECTORY_PATH = "CARe.sites.db"
+
+
+def _setup_directory(con):
+    con.execute('''
+    CREATE TABLE IF NOT EXISTS sites (
+            site TEXT PRIMARY KEY,
+            path TEXT NOT NULL)
+    ''')
+    # patient_id stays NULL while a sign-up is claiming the phone number
+    con.execute('''
+    CREATE TABLE IF NOT EXISTS patient_directory (
+            phone_number TEXT PRIMARY KEY,
+            site TEXT NOT NULL,
+            patient_id INTEGER) WITHOUT ROWID
+    ''')
+    con.commit()
+
+
+class Router:
+    def __init__(self, directory=DIRECTORY_PATH, workers=None):
+        self.directory_path = directory
+        self.workers = workers
+        self.local = threading.local()
+        self.executor = None
+        self.lock = threading.Lock()
+        _setup_directory(self._directory())
+
+    #------------------Connections, one set per thread----------------------
+    def _directory(self):
+        con = getattr(self.local, "directory", None)
+        if con is None:
+            con = self.local.directory = booking.connect(self.directory_path)
+        return con
+
+    def sites(self):
+        return dict(self._directory().execute("SELECT site, path FROM sites ORDER BY site"))
+
+    def connection(self, site):
+        shards = getattr(self.local, "shards", None)
+        if shards is None:
+            shards = self.local.shards = {}
+        con = shards.get(site)
+        if con is None:
+            row = self._directory().execute("SELECT path FROM sites WHERE site = ?", (site,)).fetchone()
+            if row is None:
+                raise ValueError(f"unknown site {site!r}")
+            # Relative paths are relative to the directory file, wherever the process runs
+            con = booking.connect(os.path.join(os.path.dirname(os.path.abspath(self.directory_path)), row[0]))
+            migrations.migrate(con)
+            shards[site] = con
+        return con
+
+    # Registers a site, or moves it to a new file; creates and migrates the file
+    def add_site(self, site, path):
+        directory = self._directory()
+        directory.execute("INSERT INTO sites (site, path) VALUES (?, ?) ON CONFLICT (site) DO UPDATE SET path = excluded.path",
+                          (site, path))
+        directory.commit()
+        getattr(self.local, "shards", {}).pop(site, None)
+        self.connection(site)
+
+    # Calls func(connection of the site, *args), like ConnectionPool.run does for one database
+    def run(self, site, func, *args):
+        con = self.connection(site)
+        try:
+            return func(con, *args)
+        except BaseException:
+            if con.in_transaction:
+                con.rollback()
+            raise
+
+    # Returns {site: func(connection of the site, *args)}, run on every site at once
+    def fan_out(self, func, *args):
+        sites = list(self.sites())
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers or max(len(sites), 1),
+                                                   thread_name_prefix="care-site")
+        futures = {site: self.executor.submit(self.run, site, func, *args) for site in sites}
+        return {site: future.result() for site, future in futures.items()}
+
+    # Closes this thread's connections; the fan-out threads' go with their threads
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        for con in getattr(self.local, "shards", {}).values():
+            con.close()
+        self.local.shards = {}
+        directory = getattr(self.local, "directory", None)
+        if directory is not None:
+            directory.close()
+            self.local.directory = None
+
+    #------------------Patients across sites----------------------
+    # Returns (site, patient_id) for a registered phone number, or None
+    def find_patient(self, phone_number):
+        return self._directory().execute(
+            "SELECT site, patient_id FROM patient_directory WHERE phone_number = ? AND patient_id IS NOT NULL",
+            (phone_number,)
+        ).fetchone()
+
+    # Returns the new patient_id at the site, or None if the phone number is registered at any site
+    def signup(self, site, full_name, age, date_of_birth, address, phone_number, password):
+        password_hash = passwords.hash_password(password)
+        directory = self._directory()
+        # Claim the phone number first; the primary key settles races between sites
+        try:
+            directory.execute("INSERT INTO patient_directory (phone_number, site) VALUES (?, ?)", (phone_number, site))
+            directory.commit()
+        except sqlite3.IntegrityError:
+            directory.rollback()
+            return None
+
+        patient_id = None
+        try:
+            patient_id = self.run(site, core.add_patient, full_name, age, date_of_birth, address, phone_number, password_hash)
+        finally:
+            if patient_id is None:
+                directory.execute("DELETE FROM patient_directory WHERE phone_number = ? AND patient_id IS NULL", (phone_number,))
+            else:
+                directory.execute("UPDATE patient_directory SET patient_id = ? WHERE phone_number = ?", (patient_id, phone_number))
+            directory.commit()
+        return patient_id
+
+    # Returns (site, patient_id, full_name), or None if the credentials don't match
+    def login(self, phone_number, password):
+        entry = self.find_patient(phone_number)
+        if entry is None:
+            # Hash anyway, so an unknown number takes as long as a wrong password
+            passwords.verify_password(password, None)
+            return None
+        patient = self.run(entry[0], core.login, phone_number, password)
+        return (entry[0],) + tuple(patient) if patient else None
+
+    # Deletes the account at its site and its directory entry; returns True on success
+    def delete_account(self, site, patient_id, password):
+        patient = self.run(site, core.get_patient, patient_id)
+        if not patient or not self.run(site, core.delete_account, patient_id, password):
+            return False
+        directory = self._directory()
+        directory.execute("DELETE FROM patient_directory WHERE phone_number = ? AND site = ?", (patient[5], site))
+        directory.commit()
+        return True
+
+    # Rebuilds the phone directory from every site's patients; returns [(phone_number, sites)] registered twice
+    def rebuild_directory(self):
+        found = self.fan_out(lambda con: con.execute("SELECT phone_number, patient_id FROM patients").fetchall())
+        entries = {}
+        duplicates = collections.defaultdict(list)
+        for site, rows in sorted(found.items()):
+            for phone_number, patient_id in rows:
+                if phone_number in entries:
+                    duplicates[phone_number].append(site)
+                else:
+                    entries[phone_number] = (site, patient_id)
+        directory = self._directory()
+        directory.execute("BEGIN IMMEDIATE")
+        try:
+            directory.execute("DELETE FROM patient_directory")
+            directory.executemany("INSERT INTO patient_directory (phone_number, site, patient_id) VALUES (?, ?, ?)",
+                                  ((phone_number, site, patient_id) for phone_number, (site, patient_id) in entries.items()))
+            directory.commit()
+        except BaseException:
+            directory.rollback()
+            raise
+        return [(phone_number, [entries[phone_number][0]] + sites) for phone_number, sites in duplicates.items()]
+
+    #------------------Admin reports over every site----------------------
+    # Returns (status, count) summed over all sites
+    def status_counts(self):
+        totals = collections.Counter()
+        for rows in self.fan_out(core.status_counts).values():
+            for status, count in rows:
+                totals[status] += count
+        return sorted(totals.items())
+
+    # Returns ({site: count}, total) for one day
+    def date_appointment_count(self, date):
+        counts = self.fan_out(core.date_appointment_count, date)
+        return counts, sum(counts.values())
+
+    # Returns the first count open slots after `after` at any site, as (site, *slot) rows in start-time order
+    def next_open_slots(self, after, count=5, appointment_type=None):
+        per_site = self.fan_out(core.next_open_slots, after, count, appointment_type)
+        # Each site's rows are already ordered by starts_at (the last column)
+        merged = heapq.merge(*([(site,) + tuple(row) for row in rows] for site, rows in per_site.items()),
+                             key=lambda row: row[-1])
+        return list(merged)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage CARe sites and report across them")
+    parser.add_argument("--directory", default=DIRECTORY_PATH, help="site directory database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="register a site and its database file")
+    add.add_argument("site")
+    add.add_argument("path")
+    commands.add_parser("list", help="list the sites")
+    find = commands.add_parser("find", help="show where a phone number is registered")
+    find.add_argument("phone_number")
+    summary = commands.add_parser("summary", help="appointment totals over every site")
+    summary.add_argument("--date", help="also count the appointments on this day (YYYY-MM-DD)")
+    commands.add_parser("rebuild-directory", help="rebuild the phone directory from every site")
+    args = parser.parse_args()
+
+    router = Router(args.directory)
+    try:
+        if args.command == "add":
+            router.add_site(args.site, args.path)
+            print(f"+++++ Site {args.site} uses {args.path}. +++++")
+        elif args.command == "list":
+            for site, path in router.sites().items():
+                print(f"{site:<20}{path}")
+        elif args.command == "find":
+            entry = router.find_patient(args.phone_number)
+            print(f"Site {entry[0]}, patient {entry[1]}" if entry else "***** Phone number not registered. *****")
+        elif args.command == "summary":
+            for status, count in router.status_counts():
+                print(f"Total {status}: {count}")
+            if args.date:
+                counts, total = router.date_appointment_count(args.date)
+                for site, count in counts.items():
+                    print(f"{args.date} at {site}: {count}")
+                print(f"{args.date} at all sites: {total}")
+        elif args.command == "rebuild-directory":
+            for phone_number, sites in router.rebuild_directory():
+                print(f"***** {phone_number} is registered at {', '.join(sites)}; kept {sites[0]} *****")
+            print("+++++ Directory rebuilt. +++++")
+    finally:
+        router.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import calendar # For turning wall-clock times into integers
+import datetime # For parsing and formatting slot times
+
+#------------------Normalized slot times----------------------
+# Each schedule stores starts_at, its start as whole seconds since 1970-01-01 00:00
+# in the clinic's own wall-clock time (no time zone), plus duration_minutes.
+# Integers sort and range-seek correctly, unlike "HH:MM AM/PM" text where
+# "10:00 AM" comes before "9:00 AM". schedule_date and schedule_time are kept as
+# display text in one canonical format.
+
+DATE_FORMAT = "%Y-%m-%d"
+TIME_FORMAT = "%I:%M %p"
+DEFAULT_DURATION = 30  # minutes, for slots created without a length
+
+# Accepted spellings of a time, tried in order
+TIME_INPUT_FORMATS = ("%I:%M %p", "%I:%M%p", "%I %p", "%I%p", "%H:%M")
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+NEXT_OPEN_COLUMNS = ("schedule_id", "schedule_date", "schedule_time", "remaining", "appointment_type", "starts_at")
+
+NEXT_OPEN_SQL = """
+    SELECT schedule_id, schedule_date, schedule_time, capacity - booked_count AS remaining, appointment_type, starts_at
+    FROM admin_schedules
+    WHERE booked_count < capacity AND starts_at > ?
+    ORDER BY starts_at
+    LIMIT ?"""
+
+# Slots reserved for the type and slots open to any type, each an index range seek, merged
+NEXT_OPEN_FOR_TYPE_SQL = """
+    SELECT * FROM (
+        SELECT schedule_id, schedule_date, schedule_time, capacity - booked_count AS remaining, appointment_type, starts_at
+        FROM admin_schedules
+        WHERE booked_count < capacity AND appointment_type = ? AND starts_at > ?
+        ORDER BY starts_at
+        LIMIT ?)
+    UNION ALL
+    SELECT * FROM (
+        SELECT schedule_id, schedule_date, schedule_time, capacity - booked_count AS remaining, appointment_type, starts_at
+        FROM admin_schedules
+        WHERE booked_count < capacity AND appointment_type IS NULL AND starts_at > ?
+        ORDER BY starts_at
+        LIMIT ?)
+    ORDER BY starts_at
+    LIMIT ?"""
+
+
+def parse_date(text):
+    return datetime.datetime.strptime(text.strip(), DATE_FORMAT).date()
+
+
+def parse_time(text):
+    cleaned = " ".join(text.strip().upper().split())
+    for fmt in TIME_INPUT_FORMATS:
+        try:
+            return datetime.datetime.strptime(cleaned, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"time data {text!r} is not HH:MM AM/PM")
+
+
+def to_timestamp(moment):
+    return calendar.timegm(moment.timetuple())
+
+
+# The current wall-clock time on the same scale as starts_at
+def now_timestamp():
+    return to_timestamp(datetime.datetime.now())
+
+
+def from_timestamp(starts_at):
+    return _EPOCH + datetime.timedelta(seconds=starts_at)
+
+
+# "2030-01-07" means the start of that day; "2030-01-07 9:00 AM" a moment on it
+def parse_moment(text):
+    schedule_date, _, schedule_time = text.strip().partition(" ")
+    day = parse_date(schedule_date)
+    if not schedule_time.strip():
+        return datetime.datetime.combine(day, datetime.time())
+    return datetime.datetime.combine(day, parse_time(schedule_time))
+
+
+# Returns (starts_at, schedule_date, schedule_time) in canonical form; raises ValueError if unparseable
+def normalize(schedule_date, schedule_time):
+    moment = datetime.datetime.combine(parse_date(schedule_date), parse_time(schedule_time))
+    return to_timestamp(moment), moment.strftime(DATE_FORMAT), moment.strftime(TIME_FORMAT)
+
+
+# Like normalize, but returns None for text that isn't a date and time
+def try_normalize(schedule_date, schedule_time):
+    try:
+        return normalize(schedule_date or "", schedule_time or "")
+    except ValueError:
+        return None
+
+
+#------------------Next open slots after a given time----------------------
+# Returns up to count (schedule_id, schedule_date, schedule_time, remaining,
+# appointment_type, starts_at) rows starting after `after` (a datetime or a
+# starts_at integer). With appointment_type, only slots reserved for that type or
+# open to any type are returned.
+def next_open_slots(con, after, count=5, appointment_type=None):
+    if isinstance(after, datetime.datetime):
+        after = to_timestamp(after)
+    if appointment_type:
+        return con.execute(NEXT_OPEN_FOR_TYPE_SQL, (appointment_type, after, count, after, count, count)).fetchall()
+    return con.execute(NEXT_OPEN_SQL, (after, count)).fetchall()
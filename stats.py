@@ -0,0 +1,98 @@
+import argparse # For the check command's options
+import sys # For the exit status
+
+import booking # WAL-mode connections
+import migrations # Versioned schema upgrades
+
+#------------------Appointment statistics----------------------
+# appointment_stats holds how many appointments there are per status, per day,
+# per schedule and per patient. Triggers on appointments keep it current on every
+# insert, delete and update, whichever code path makes them, so each count here is
+# one primary-key lookup instead of a COUNT(*) or GROUP BY over appointments.
+#
+#   python stats.py            rebuild the counts from appointments and report any drift
+#   python stats.py --repair   ... and replace the maintained counts with the rebuilt ones
+
+# Dimension -> the appointments expression it counts by, as the triggers do
+DIMENSIONS = {
+    "status": "COALESCE(status, '')",
+    "date": "COALESCE(appointment_date, '')",
+    "schedule": "COALESCE(schedule_id, '')",
+    "patient": "COALESCE(patient_id, '')",
+}
+
+
+COUNT_SQL = "SELECT count FROM appointment_stats WHERE dimension = ? AND bucket = ?"
+COUNTS_SQL = "SELECT bucket, count FROM appointment_stats WHERE dimension = ? AND count > 0"
+
+
+# Returns the number of appointments in one bucket, e.g. count(con, "patient", 7)
+def count(con, dimension, bucket):
+    row = con.execute(COUNT_SQL, (dimension, bucket)).fetchone()
+    return row[0] if row else 0
+
+
+# Returns (bucket, count) for every non-empty bucket of a dimension
+def counts(con, dimension):
+    return con.execute(COUNTS_SQL, (dimension,)).fetchall()
+
+
+#------------------Consistency check----------------------
+# Counts every bucket again from appointments; returns {(dimension, bucket): count}
+def rebuild_expected(con):
+    expected = {}
+    for dimension, bucket in DIMENSIONS.items():
+        for value, total in con.execute(f"SELECT {bucket}, COUNT(*) FROM appointments GROUP BY {bucket}"):
+            expected[(dimension, value)] = total
+    return expected
+
+
+# Returns [(dimension, bucket, maintained, expected)] for every bucket that disagrees
+def check(con):
+    maintained = {(dimension, bucket): total for dimension, bucket, total
+                  in con.execute("SELECT dimension, bucket, count FROM appointment_stats WHERE count != 0")}
+    expected = rebuild_expected(con)
+    return [(dimension, bucket, maintained.get((dimension, bucket), 0), expected.get((dimension, bucket), 0))
+            for dimension, bucket in sorted(maintained.keys() | expected.keys(), key=repr)
+            if maintained.get((dimension, bucket), 0) != expected.get((dimension, bucket), 0)]
+
+
+# Replaces the maintained counts with ones rebuilt from appointments, in one transaction
+def repair(con):
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute("DELETE FROM appointment_stats")
+        con.executemany(
+            "INSERT INTO appointment_stats (dimension, bucket, count) VALUES (?, ?, ?)",
+            [(dimension, bucket, total) for (dimension, bucket), total in rebuild_expected(con).items()]
+        )
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check CARe's maintained appointment counts")
+    parser.add_argument("--db", default=booking.DB_PATH)
+    parser.add_argument("--repair", action="store_true", help="replace the maintained counts with rebuilt ones")
+    args = parser.parse_args()
+
+    con = booking.connect(args.db)
+    migrations.migrate(con)
+    differences = check(con)
+    for dimension, bucket, maintained, expected in differences:
+        print(f"***** {dimension} {bucket!r}: maintained {maintained}, actual {expected} *****")
+
+    if not differences:
+        print("+++++ Appointment counts are consistent. +++++")
+    elif args.repair:
+        repair(con)
+        print(f"+++++ Repaired {len(differences)} counts. +++++")
+    con.close()
+    if differences and not args.repair:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
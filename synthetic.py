@@ -0,0 +1,204 @@
+import argparse # For command-line options
+import array # For compact per-schedule seat counts
+import bisect # For weighted weekday picks
+import datetime # For the schedule calendar
+import itertools # For cumulative weights
+import math # For sizing the calendar
+import os # For replacing an existing file
+import random # For seeded data
+import sqlite3 # For database operations
+import time # For progress timing
+
+import booking # WAL-mode connections
+import migrations # Versioned schema upgrades
+import passwords # The shared password hash
+import reminders # Queueing reminders after the load
+import search # Rebuilding the search indexes after the load
+import slots # Integer start times
+import stats # Rebuilding the appointment counts after the load
+
+#------------------Synthetic CARe databases----------------------
+#   python synthetic.py bench.db --patients 1000000 --appointments 10000000
+#
+# Builds a fresh database of any size from a seed; the same seed and sizes always
+# give the same rows. Schedules run Monday to Friday from 8:00 AM to 5:00 PM, with
+# Mondays and mornings in highest demand, and enough days are generated to hold
+# every appointment with seats to spare. A few patients book much more often than
+# the rest. Appointments before --today are mostly COMPLETED and otherwise NO-SHOW;
+# later ones are Pending. Each is booked a few days to a few weeks ahead.
+#
+# Every patient's password is PASSWORD, stored as one shared hash so that
+# generating a million patients doesn't mean a million PBKDF2 runs.
+
+PASSWORD = "synthetic"
+CHUNK_SIZE = 50000
+
+OPENING = datetime.time(8, 0)
+CLOSING = datetime.time(17, 0)
+FILL_RATIO = 0.7   # booked seats / offered seats across the whole calendar
+
+# Monday to Friday
+WEEKDAY_WEIGHTS = [1.3, 1.1, 1.0, 0.9, 0.8]
+
+APPOINTMENT_TYPES = [("checkup", 50), ("vaccination", 20), ("follow-up", 15), ("lab work", 10), ("urgent care", 5)]
+COMPLETED_SHARE = 0.85   # of appointments before --today; the rest are NO-SHOW
+MEAN_LEAD_DAYS = 7       # average days between booking and the appointment
+
+FIRST_NAMES = ["Maria", "Jose", "Ana", "Juan", "Rosa", "Pedro", "Elena", "Carlos", "Luz", "Miguel"]
+LAST_NAMES = ["Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Flores", "Ramos", "Aquino"]
+
+
+def _chunks(rows, con, sql):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == CHUNK_SIZE:
+            con.executemany(sql, batch)
+            batch = []
+    if batch:
+        con.executemany(sql, batch)
+
+
+#------------------Patients----------------------
+def patient_rows(rng, patients, password_hash, year):
+    for patient_id in range(1, patients + 1):
+        age = rng.randint(1, 95)
+        born = datetime.date(year - age, rng.randint(1, 12), rng.randint(1, 28))
+        yield (patient_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", age, born.isoformat(),
+               f"{rng.randint(1, 999)} Street {rng.randint(1, 500)}", f"09{patient_id:09d}", password_hash)
+
+
+#------------------Schedules----------------------
+# Returns the list of working days and the slot times of one day
+def calendar(start, appointments, slot_minutes, capacity):
+    times = []
+    moment = datetime.datetime.combine(start, OPENING)
+    closing = datetime.datetime.combine(start, CLOSING)
+    while moment + datetime.timedelta(minutes=slot_minutes) <= closing:
+        times.append(moment.time())
+        moment += datetime.timedelta(minutes=slot_minutes)
+
+    needed = max(5, math.ceil(appointments / (len(times) * capacity * FILL_RATIO)))
+    days = []
+    day = start
+    while len(days) < needed:
+        if day.weekday() < 5:
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days, times
+
+
+def schedule_rows(days, times, capacity, slot_minutes):
+    schedule_id = 0
+    for day in days:
+        for slot_time in times:
+            schedule_id += 1
+            moment = datetime.datetime.combine(day, slot_time)
+            yield (schedule_id, moment.strftime(slots.DATE_FORMAT), moment.strftime(slots.TIME_FORMAT),
+                   slots.to_timestamp(moment), slot_minutes, capacity)
+
+
+#------------------Appointments----------------------
+def appointment_rows(rng, appointments, patients, days, times, capacity, today, booked):
+    day_weights = list(itertools.accumulate(WEEKDAY_WEIGHTS[day.weekday()] for day in days))
+    type_names = [name for name, _ in APPOINTMENT_TYPES]
+    type_weights = list(itertools.accumulate(weight for _, weight in APPOINTMENT_TYPES))
+    slots_per_day = len(times)
+
+    for _ in range(appointments):
+        # Pick a seat with Monday and morning skew; full slots send the patient elsewhere
+        while True:
+            day_index = bisect.bisect(day_weights, rng.random() * day_weights[-1])
+            slot_index = int(slots_per_day * rng.random() ** 1.5)
+            index = day_index * slots_per_day + slot_index
+            if booked[index] < capacity:
+                break
+        booked[index] += 1
+
+        day = days[day_index]
+        moment = datetime.datetime.combine(day, times[slot_index])
+        if day < today:
+            status = "COMPLETED" if rng.random() < COMPLETED_SHARE else "NO-SHOW"
+        else:
+            status = "Pending"
+        appointment_type = type_names[bisect.bisect(type_weights, rng.random() * type_weights[-1])]
+        # Squaring the draw makes low patient_ids the frequent visitors
+        patient_id = int(patients * rng.random() ** 2) + 1
+        # Most bookings are made a few days ahead, a few weeks ahead; never less than an hour
+        lead_seconds = max(3600, int(rng.expovariate(1 / MEAN_LEAD_DAYS) * 86400))
+        yield (patient_id, index + 1, appointment_type,
+               moment.strftime(slots.DATE_FORMAT), moment.strftime(slots.TIME_FORMAT), status,
+               slots.to_timestamp(moment) - lead_seconds)
+
+
+#------------------Build one database----------------------
+# Returns (patients, schedules, appointments) written
+def generate(path, patients, appointments, seed=1, start=datetime.date(2024, 1, 1), today=None,
+             slot_minutes=15, capacity=20, iterations=passwords.ITERATIONS):
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    con = sqlite3.connect(path)
+    migrations.migrate(con)
+    # Nothing else can see this file until we are done, so skip the fsyncs
+    con.execute("PRAGMA synchronous = OFF")
+
+    # The appointment_stats, search and reminder triggers would cost several writes per row;
+    # count, index and queue once at the end instead
+    triggers = con.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('appointments', 'patients')").fetchall()
+    for name, _ in triggers:
+        con.execute(f"DROP TRIGGER {name}")
+
+    days, times = calendar(start, appointments, slot_minutes, capacity)
+    today = today or days[len(days) // 2]
+    booked = array.array("I", bytes(4 * len(days) * len(times)))
+
+    _chunks(patient_rows(rng, patients, passwords.hash_password(PASSWORD, iterations), start.year), con,
+            "INSERT INTO patients (patient_id, full_name, age, date_of_birth, address, phone_number, password) VALUES (?, ?, ?, ?, ?, ?, ?)")
+    _chunks(schedule_rows(days, times, capacity, slot_minutes), con,
+            "INSERT INTO admin_schedules (schedule_id, schedule_date, schedule_time, starts_at, duration_minutes, capacity) VALUES (?, ?, ?, ?, ?, ?)")
+    _chunks(appointment_rows(rng, appointments, patients, days, times, capacity, today, booked), con,
+            "INSERT INTO appointments (patient_id, schedule_id, appointment_type, appointment_date, appointment_time, status, booked_at) VALUES (?, ?, ?, ?, ?, ?, ?)")
+    con.executemany("UPDATE admin_schedules SET booked_count = ? WHERE schedule_id = ?",
+                    ((count, index + 1) for index, count in enumerate(booked) if count))
+    con.commit()
+
+    for _, sql in triggers:
+        con.execute(sql)
+    con.commit()
+    stats.repair(con)
+    search.rebuild(con)
+    reminders.refill(con)
+    con.close()
+    # Leave the file in WAL mode like every other CARe database
+    booking.connect(path).close()
+    return patients, len(days) * len(times), appointments
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic CARe database")
+    parser.add_argument("path", help="database file to create (replaced if it exists)")
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--appointments", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=datetime.date(2024, 1, 1),
+                        help="first schedule day (YYYY-MM-DD)")
+    parser.add_argument("--today", type=datetime.date.fromisoformat,
+                        help="appointments before this day are mostly completed (default: middle of the calendar)")
+    parser.add_argument("--slot-minutes", type=int, default=15)
+    parser.add_argument("--capacity", type=int, default=20, help="seats per schedule")
+    parser.add_argument("--iterations", type=int, default=passwords.ITERATIONS, help="PBKDF2 iterations of the shared hash")
+    args = parser.parse_args()
+
+    if args.patients < 1 or args.appointments < 0:
+        parser.error("need at least one patient and no negative appointment count")
+
+    started = time.perf_counter()
+    patients, schedules, appointments = generate(args.path, args.patients, args.appointments, args.seed, args.start,
+                                                 args.today, args.slot_minutes, args.capacity, args.iterations)
+    print(f"+++++ {args.path}: {patients} patients, {schedules} schedules, {appointments} appointments "
+          f"in {time.perf_counter() - started:.1f}s +++++")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import argparse # For the import/export subcommands
+import csv # For CSV files
+import itertools # For cutting streams into chunks
+import json # For JSONL files and ID lists passed as one parameter
+import sqlite3 # For database errors
+import sys # For stdin/stdout
+
+import booking # WAL-mode connections
+import migrations # Versioned schema upgrades
+import slots # Parsing slot dates and times
+
+#------------------Bulk import and export----------------------
+#   python transfer.py export patients patients.csv
+#   python transfer.py import appointments appointments.jsonl --on-conflict skip
+#
+# Files are read and written one row at a time and imported in chunks of
+# CHUNK_SIZE rows, each chunk one executemany in one transaction, so memory stays
+# flat for files of any size. The format follows the file extension (.csv or
+# .jsonl); "-" means stdin/stdout and needs --format.
+#
+# IDs in the file are kept, so exports from one database import cleanly into
+# another; leave an ID blank to let the database assign one. Patients whose phone
+# number is already registered, or whose patient_id is taken, are skipped or
+# updated as a set by the UNIQUE constraints (ON CONFLICT), never looked up row by row.
+
+CHUNK_SIZE = 5000
+
+# Columns per table, with the converter applied to values read from a file
+TABLES = {
+    "patients": {
+        "table": "patients",
+        "columns": [("patient_id", int), ("full_name", str), ("age", int), ("date_of_birth", str),
+                    ("address", str), ("phone_number", str), ("password", str)],
+    },
+    "schedules": {
+        "table": "admin_schedules",
+        "columns": [("schedule_id", int), ("schedule_date", str), ("schedule_time", str), ("capacity", int),
+                    ("duration_minutes", int), ("appointment_type", str), ("booked_count", int), ("starts_at", int)],
+    },
+    "appointments": {
+        "table": "appointments",
+        "columns": [("appointment_id", int), ("patient_id", int), ("schedule_id", int), ("appointment_type", str),
+                    ("appointment_date", str), ("appointment_time", str), ("status", str), ("booked_at", int)],
+    },
+}
+
+# skip: keep the row already in the database; update: overwrite it with the imported values
+IMPORT_SQL = {
+    ("patients", "skip"): """
+        INSERT INTO patients (patient_id, full_name, age, date_of_birth, address, phone_number, password)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING""",
+    ("patients", "update"): """
+        INSERT INTO patients (patient_id, full_name, age, date_of_birth, address, phone_number, password)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (phone_number) DO UPDATE SET
+            full_name = excluded.full_name, age = excluded.age, date_of_birth = excluded.date_of_birth,
+            address = excluded.address, password = excluded.password
+        ON CONFLICT (patient_id) DO UPDATE SET
+            full_name = excluded.full_name, age = excluded.age, date_of_birth = excluded.date_of_birth,
+            address = excluded.address, phone_number = excluded.phone_number, password = excluded.password""",
+    # booked_count is derived from the appointments and starts_at from the date and time, so neither is imported
+    ("schedules", "skip"): f"""
+        INSERT INTO admin_schedules (schedule_id, schedule_date, schedule_time, capacity, duration_minutes, appointment_type, starts_at)
+        VALUES (?, ?, ?, ?, COALESCE(?, {slots.DEFAULT_DURATION}), ?, ?)
+        ON CONFLICT DO NOTHING""",
+    ("schedules", "update"): f"""
+        INSERT INTO admin_schedules (schedule_id, schedule_date, schedule_time, capacity, duration_minutes, appointment_type, starts_at)
+        VALUES (?, ?, ?, ?, COALESCE(?, {slots.DEFAULT_DURATION}), ?, ?)
+        ON CONFLICT (schedule_date, schedule_time) DO UPDATE SET
+            capacity = excluded.capacity, duration_minutes = excluded.duration_minutes,
+            appointment_type = excluded.appointment_type""",
+    ("appointments", "skip"): """
+        INSERT INTO appointments (appointment_id, patient_id, schedule_id, appointment_type, appointment_date, appointment_time, status, booked_at)
+        VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, 'Pending'), ?)
+        ON CONFLICT DO NOTHING""",
+    ("appointments", "update"): """
+        INSERT INTO appointments (appointment_id, patient_id, schedule_id, appointment_type, appointment_date, appointment_time, status, booked_at)
+        VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, 'Pending'), ?)
+        ON CONFLICT (appointment_id) DO UPDATE SET
+            patient_id = excluded.patient_id, schedule_id = excluded.schedule_id,
+            appointment_type = excluded.appointment_type, appointment_date = excluded.appointment_date,
+            appointment_time = excluded.appointment_time, status = excluded.status, booked_at = excluded.booked_at""",
+}
+
+# Recount the seats of every schedule a chunk of appointments touched; CANCELLED ones hold no seat
+RECOUNT_SQL = """
+    UPDATE admin_schedules
+    SET booked_count = (SELECT COUNT(*) FROM appointments WHERE schedule_id = ? AND status IS NOT 'CANCELLED')
+    WHERE schedule_id = ?"""
+# The schedules a chunk's appointments are on before an update moves them elsewhere
+PREVIOUS_SCHEDULES_SQL = """
+    SELECT DISTINCT schedule_id FROM appointments
+    WHERE appointment_id IN (SELECT value FROM json_each(?)) AND schedule_id IS NOT NULL"""
+
+
+def file_format(path, given):
+    if given:
+        return given
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"can't tell the format of {path!r}; pass --format csv or --format jsonl")
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+#------------------Readers: yield one dict per line----------------------
+def read_rows(stream, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+# Turns a file row into a parameter tuple; blanks and missing columns become NULL
+def to_params(row, columns):
+    params = []
+    for name, convert in columns:
+        value = row.get(name)
+        if value is None or value == "":
+            params.append(None)
+        else:
+            params.append(convert(value))
+    return tuple(params)
+
+
+# Rewrites a schedule's date and time in the canonical format and appends its starts_at
+def schedule_params(params):
+    starts_at, schedule_date, schedule_time = slots.normalize(params[1] or "", params[2] or "")
+    return (params[0], schedule_date, schedule_time, *params[3:], starts_at)
+
+
+#------------------Import one table----------------------
+# Returns (rows read, rows written); rows that hit a conflict in skip mode aren't written
+def import_rows(con, table, rows, on_conflict="skip", chunk_size=CHUNK_SIZE):
+    spec = TABLES[table]
+    columns = spec["columns"]
+    if table == "schedules":
+        columns = columns[:6]
+        params = (schedule_params(to_params(row, columns)) for row in rows)
+    else:
+        params = (to_params(row, columns) for row in rows)
+    sql = IMPORT_SQL[(table, on_conflict)]
+
+    read = 0
+    written = 0
+    for chunk in chunks(params, chunk_size):
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            schedule_ids = set()
+            if table == "appointments" and on_conflict == "update":
+                appointment_ids = [params[0] for params in chunk if params[0] is not None]
+                schedule_ids.update(row[0] for row in con.execute(PREVIOUS_SCHEDULES_SQL, (json.dumps(appointment_ids),)))
+            # rowcount leaves out what the stats, search and reminder triggers write
+            written += con.executemany(sql, chunk).rowcount
+            if table == "appointments":
+                schedule_ids.update(params[2] for params in chunk if params[2] is not None)
+                con.executemany(RECOUNT_SQL, [(schedule_id, schedule_id) for schedule_id in schedule_ids])
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+        read += len(chunk)
+    return read, written
+
+
+#------------------Export one table----------------------
+# Returns the number of rows written
+def export_rows(con, table, stream, fmt):
+    spec = TABLES[table]
+    names = [name for name, _ in spec["columns"]]
+    key = names[0]
+    # The cursor hands rows over one at a time instead of loading the whole table
+    cursor = con.execute(f"SELECT {', '.join(names)} FROM {spec['table']} ORDER BY {key}")
+
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(names)
+        for row in cursor:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in cursor:
+            stream.write(json.dumps(dict(zip(names, row))) + "\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import and export for CARe")
+    parser.add_argument("--db", default=booking.DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write a table to CSV or JSONL")
+    export_parser.add_argument("table", choices=sorted(TABLES))
+    export_parser.add_argument("path", help="output file, or - for stdout")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"])
+
+    import_parser = commands.add_parser("import", help="load a table from CSV or JSONL")
+    import_parser.add_argument("table", choices=sorted(TABLES))
+    import_parser.add_argument("path", help="input file, or - for stdin")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"])
+    import_parser.add_argument("--on-conflict", choices=["skip", "update"], default="skip")
+    import_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    args = parser.parse_args()
+    try:
+        fmt = file_format(args.path, args.format)
+    except ValueError as error:
+        parser.error(str(error))
+
+    con = booking.connect(args.db)
+    migrations.migrate(con)
+
+    if args.command == "export":
+        stream = sys.stdout if args.path == "-" else open(args.path, "w", newline="", encoding="utf-8")
+        with stream:
+            count = export_rows(con, args.table, stream, fmt)
+        print(f"+++++ Exported {count} {args.table}. +++++", file=sys.stderr)
+    else:
+        stream = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+        try:
+            with stream:
+                read, written = import_rows(con, args.table, read_rows(stream, fmt), args.on_conflict, args.chunk_size)
+        except (ValueError, sqlite3.IntegrityError) as error:
+            # Chunks committed before the bad row stay imported
+            sys.exit(f"***** Import stopped: {error} *****")
+        print(f"+++++ Imported {args.table}: {read} read, {written} written, {read - written} skipped. +++++", file=sys.stderr)
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
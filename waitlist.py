@@ -0,0 +1,108 @@
+import sqlite3 # For database errors
+
+import booking # The seat-claiming UPDATE
+import slots # Booking timestamps
+
+#------------------Waitlist for full schedules----------------------
+# Patients can queue for a schedule with no seats left. The queue is ordered by
+# priority (urgent care first) and then by waitlist_id, so ties are first come,
+# first served. idx_waitlist_next keeps every queue in that order, so finding
+# and removing the next waiter is an index seek however long the queue gets.
+#
+# fill_seats promotes waiters into appointments. It never commits: callers run it
+# inside the transaction that released the seat, so a freed seat is never visible
+# to anyone but the next waiter.
+
+URGENT = 0
+ROUTINE = 1
+
+# Appointment types that go ahead of routine ones, compared in lower case
+URGENT_TYPES = {"urgent", "urgent care", "emergency"}
+
+COLUMNS = ("waitlist_id", "schedule_id", "schedule_date", "schedule_time", "appointment_type", "position")
+
+NEXT_WAITER_SQL = """
+    SELECT waitlist_id, patient_id, appointment_type
+    FROM waitlist
+    WHERE schedule_id = ?
+    ORDER BY priority, waitlist_id
+    LIMIT 1"""
+FULL_SCHEDULE_SQL = "SELECT 1 FROM admin_schedules WHERE schedule_id = ? AND booked_count >= capacity"
+LEAVE_SQL = "DELETE FROM waitlist WHERE waitlist_id = ? AND patient_id = ?"
+PROMOTED_SQL = "DELETE FROM waitlist WHERE waitlist_id = ?"
+PATIENT_ENTRIES_SQL = """
+    SELECT w.waitlist_id, w.schedule_id, s.schedule_date, s.schedule_time, w.appointment_type,
+           1 + (SELECT COUNT(*) FROM waitlist x WHERE x.schedule_id = w.schedule_id AND x.priority < w.priority)
+             + (SELECT COUNT(*) FROM waitlist x WHERE x.schedule_id = w.schedule_id AND x.priority = w.priority
+                                                 AND x.waitlist_id < w.waitlist_id) AS position
+    FROM waitlist w
+    JOIN admin_schedules s ON w.schedule_id = s.schedule_id
+    WHERE w.patient_id = ?
+    ORDER BY s.starts_at"""
+
+
+def priority_for(appointment_type):
+    return URGENT if (appointment_type or "").strip().lower() in URGENT_TYPES else ROUTINE
+
+
+#------------------Join the queue of a full schedule----------------------
+# Returns the new waitlist_id, or None if the schedule doesn't exist, still has a
+# free seat, or the patient is already waiting for it
+def join(con, patient_id, schedule_id, appointment_type):
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        full = con.execute(FULL_SCHEDULE_SQL, (schedule_id,)).fetchone()
+        if not full:
+            con.rollback()
+            return None
+        waitlist_id = con.execute(
+            "INSERT INTO waitlist (schedule_id, patient_id, appointment_type, priority) VALUES (?, ?, ?, ?)",
+            (schedule_id, patient_id, appointment_type, priority_for(appointment_type))
+        ).lastrowid
+        con.commit()
+        return waitlist_id
+    except sqlite3.IntegrityError:
+        # The unique (patient_id, schedule_id) index: already in this queue
+        con.rollback()
+        return None
+    except BaseException:
+        con.rollback()
+        raise
+
+
+# Returns True if the patient's entry existed and was removed
+def leave(con, patient_id, waitlist_id):
+    deleted = con.execute(LEAVE_SQL, (waitlist_id, patient_id)).rowcount
+    con.commit()
+    return deleted == 1
+
+
+# Returns (waitlist_id, schedule_id, schedule_date, schedule_time, appointment_type, position) rows;
+# position 1 is next in line
+def patient_entries(con, patient_id):
+    return con.execute(PATIENT_ENTRIES_SQL, (patient_id,)).fetchall()
+
+
+#------------------Hand free seats to the next waiters (inside the caller's transaction)----------------------
+# Returns the appointment_ids created, in promotion order
+def fill_seats(con, schedule_id):
+    promoted = []
+    while True:
+        waiter = con.execute(NEXT_WAITER_SQL, (schedule_id,)).fetchone()
+        if waiter is None:
+            break
+        claimed = con.execute(booking.CLAIM_SEAT_SQL, (schedule_id,)).rowcount
+        if claimed != 1:
+            break
+
+        waitlist_id, patient_id, appointment_type = waiter
+        schedule_date, schedule_time = con.execute(
+            "SELECT schedule_date, schedule_time FROM admin_schedules WHERE schedule_id = ?",
+            (schedule_id,)
+        ).fetchone()
+        promoted.append(con.execute(
+            "INSERT INTO appointments (patient_id, schedule_id, appointment_type, appointment_date, appointment_time, booked_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (patient_id, schedule_id, appointment_type, schedule_date, schedule_time, slots.now_timestamp())
+        ).lastrowid)
+        con.execute(PROMOTED_SQL, (waitlist_id,))
+    return promoted